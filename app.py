@@ -1,30 +1,149 @@
+import functools
 import os
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from src.retriever import Retriever
-import weaviate
-from langchain_community.vectorstores import Weaviate
-from langchain_openai import OpenAIEmbeddings
-from src.generation import Generation
 from src.logger import Logger
+from src.pipeline import Pipeline, PipelineRegistry
+from src.reranker import Reranker
+from src.streaming import stream_answer
+from src.answer_cache import AnswerCache, backend_from_env
+from src.sufficiency import classifier_from_env
+from src.context_assembly import ContextAssembler
+# Bare imports: the pipeline modules and src/async_app.py use these modules, not src.tracing / src.documents
+import tracing
+from documents import DocumentRegistry, IngestionQueue, DocumentNotFound, DocumentNotReady, describe
+from jobs import JobQueue
+from src.warmup import Warmup
 
+# weaviate, langchain and the PDF parser are imported by the functions that use them, so importing this
+# module stays fast (see benchmarks/import_time.py); clients are created on first use
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "weaviate")
 
-auth_config = weaviate.AuthApiKey(api_key=os.environ.get("WEAVIATE_API_KEY"))
-embedding = OpenAIEmbeddings(api_key=os.environ.get("OPENAI_API_KEY"))
-weaviate_client =  weaviate.Client(
-        url=os.environ.get("WEAVIATE_URL"),
-        auth_client_secret=auth_config,
-        )
-
-attributes = {
-            'client': weaviate_client,
-            'index_name': "RaptorContractdocx",
-            'embedding': embedding,
-            'text_key': 'text',
-            'by_text': False
-        }
-new_weaviate_instance = Weaviate(**attributes)
-instance = new_weaviate_instance
-log = Logger('../logs/question_answer.log')
+
+@functools.lru_cache(maxsize=None)
+def get_embedding():
+    """Shared OpenAI embeddings of queries and chunks."""
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings(api_key=os.environ.get("OPENAI_API_KEY"))
+
+
+@functools.lru_cache(maxsize=None)
+def get_weaviate_client():
+    """Shared Weaviate client, connected on first use (None for the local backend)."""
+    if VECTOR_BACKEND == "local":
+        return None
+    import weaviate
+    auth_config = weaviate.AuthApiKey(api_key=os.environ.get("WEAVIATE_API_KEY"))
+    return weaviate.Client(
+            url=os.environ.get("WEAVIATE_URL"),
+            auth_client_secret=auth_config,
+            )
+
+
+def vector_store(index_name):
+    """Vector store of one document's index (Weaviate class or local index directory)."""
+    if VECTOR_BACKEND == "local":
+        from src.vector_index import LocalVectorIndex, DEFAULT_INDEX_DIR
+        # In-process index built by Database(..., backend='local'); no network round trip per query
+        return LocalVectorIndex(os.path.join(DEFAULT_INDEX_DIR, index_name), get_embedding())
+    from langchain_community.vectorstores import Weaviate
+    from ingestion import CHUNK_PROPERTIES
+    attributes = {
+                'client': get_weaviate_client(),
+                'index_name': index_name,
+                'embedding': get_embedding(),
+                'text_key': 'text',
+                # Returned as metadata, for the source/chunk adjacency merge and filters
+                'attributes': CHUNK_PROPERTIES,
+                'by_text': False
+            }
+    return Weaviate(**attributes)
+
+
+@functools.lru_cache(maxsize=None)
+def contract_store():
+    """Vector store of the bundled contract (RaptorContractdocx)."""
+    return vector_store("RaptorContractdocx")
+
+
+log = Logger('question_answer.log')
+
+CONTRACT_PATH = "../data/Raptor Contract.docx.pdf"
+EVAL_PROMPT_PATH = '../src/prompts/generic-evaluation-prompt.txt'
+MODEL_NAME = "gpt-3.5-turbo"
+
+# RERANK_BACKEND=onnx runs the int8 ONNX export of the cross-encoder (src/onnx_reranker.py) with RERANK_THREADS threads
+reranker = Reranker(
+    batch_size=int(os.environ.get("RERANK_BATCH_SIZE", 32)),
+    num_workers=int(os.environ.get("RERANK_WORKERS", 1)),
+    backend=os.environ.get("RERANK_BACKEND", "torch"),
+    num_threads=int(os.environ["RERANK_THREADS"]) if os.environ.get("RERANK_THREADS") else None,
+)
+# SUFFICIENCY_MODE=local decides confident rerank scores without the LLM (thresholds from src/sufficiency.py)
+sufficiency = classifier_from_env()
+# Retrieved passages are deduplicated, merged and packed into CONTEXT_TOKEN_BUDGET tokens before answering
+context_assembler = ContextAssembler(model_name=MODEL_NAME, max_tokens=int(os.environ.get("CONTEXT_TOKEN_BUDGET", 1500)))
+
+
+def build_pipeline(file_path, eval_path, model_name):
+    """
+    Build the retriever and generator for a document.
+
+    The retriever already owns a Generation instance, so it is reused for
+    answering instead of creating another set of OpenAI clients.
+    """
+    # Uploaded documents have their own index; the bundled contract keeps RaptorContractdocx
+    record = documents.by_path(file_path)
+    store = vector_store(record['index_name']) if record is not None else contract_store()
+    retriever = Retriever(file_path=file_path, eval_path=eval_path, weviate_instance=store, model_name=model_name, reranker=reranker,
+                          keyword_mode=os.environ.get("KEYWORD_MODE", "llm"),
+                          keyword_confidence=float(os.environ.get("KEYWORD_CONFIDENCE", 0.5)),
+                          sufficiency=sufficiency, context_assembler=context_assembler)
+    return Pipeline(retriever=retriever, generation=retriever.generation)
+
+
+def ingest_document(record, job):
+    """Parse an uploaded document (filling the document cache) and index its chunks in its own class."""
+    from src.documentloader import PDFProcessor
+    from src.database import Database
+
+    job.progress('parsing')
+    processor = PDFProcessor(record['path'])
+    with job.resource('parse'):
+        chunks = processor.process_pdf()
+    if not chunks:
+        raise ValueError(f"No text could be extracted from {record['file_name']}")
+    job.progress('embedding', 0, len(chunks))
+    database = Database(get_weaviate_client(), get_embedding(), record['path'], backend=VECTOR_BACKEND, class_name=record['index_name'])
+    # Page and section are stored with every chunk so searches can be filtered by them
+    metadatas = [{'page': chunk['page'], 'section': chunk['section'] or '', 'heading': chunk['heading'] or ''} for chunk in processor.chunks]
+    with job.resource('embed'):
+        return database.upload_to_weaviate(chunks, progress=lambda written, total: job.progress(done=written, total=total), metadatas=metadatas)
+
+
+documents = DocumentRegistry()
+# Uploads are parsed and embedded by a persistent job queue; parsing is CPU-bound and embedding waits on the API,
+# so each has its own limit and one document can be embedded while the next is parsed
+jobs = JobQueue(workers=int(os.environ.get("JOB_WORKERS", 4)),
+                limits={'parse': int(os.environ.get("PARSE_CONCURRENCY", os.cpu_count() or 1)),
+                        'embed': int(os.environ.get("EMBED_CONCURRENCY", 2))})
+ingestion = IngestionQueue(documents, ingest_document, jobs)
+# Idle documents beyond MAX_PIPELINES give up their parsed text and keyword index (least recently used first)
+pipelines = PipelineRegistry(build_pipeline, max_pipelines=int(os.environ.get("MAX_PIPELINES", 64)))
+answer_cache = AnswerCache(
+    backend=backend_from_env(),
+    embed=lambda text: get_embedding().embed_query(text),
+    ttl=float(os.environ.get("ANSWER_CACHE_TTL", 24 * 3600)),
+    similarity_threshold=float(os.environ.get("ANSWER_CACHE_SIMILARITY", 0.95)),
+)
+# Models, clients and the bundled contract's pipeline are loaded in the background; /ready reports when they are
+warmup = Warmup({
+    'reranker': lambda: reranker.model,
+    'tokenizer': lambda: context_assembler.tokenizer,
+    'embeddings': get_embedding,
+    'vector_store': contract_store,
+    'pipeline': lambda: pipelines.get(CONTRACT_PATH, EVAL_PROMPT_PATH, MODEL_NAME),
+})
 
 app = Flask(__name__)
 
@@ -40,12 +159,43 @@ def upload_pdf():
     if file.filename == '' or not file.filename.endswith('.pdf'):
         return "Invalid file", 400
 
-    # Save the uploaded file to a desired location
-    file.save('path/to/save/' + file.filename)
+    # Store the file under its content hash and index it in the background
+    record, created = documents.register(file.filename, file.read(), tenant=request.headers.get('X-Tenant-ID'))
+    if created:
+        ingestion.submit(record['doc_id'])
+    record = documents.get(record['doc_id'], record['tenant'])
+    return jsonify(describe(record)), 202 if created else 200
+
 
-    # Optionally, you can perform further processing on the PDF file
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    # Status, current step and chunks indexed so far of a background job
+    job = jobs.get(job_id, request.headers.get('X-Tenant-ID'))
+    if job is None:
+        return jsonify({'error': f"Unknown job: {job_id}"}), 404
+    return jsonify(job)
 
-    return "File uploaded successfully", 200
+
+@app.route('/documents/<doc_id>', methods=['GET'])
+def document_status(doc_id):
+    record = documents.get(doc_id, request.headers.get('X-Tenant-ID'))
+    if record is None:
+        return jsonify({'error': f"Unknown document: {doc_id}"}), 404
+    return jsonify(describe(record))
+
+
+def document_path():
+    """File of the document named by ?doc_id=; questions without one go to the bundled contract."""
+    doc_id = request.args.get('doc_id')
+    if not doc_id:
+        return CONTRACT_PATH
+    return documents.route(doc_id, request.headers.get('X-Tenant-ID'))['path']
+
+
+def routing_error(e):
+    if isinstance(e, DocumentNotReady):
+        return jsonify({'error': str(e), **describe(e.record)}), 409
+    return jsonify({'error': f"Unknown document: {e.args[0]}"}), 404
 
 
 @app.route('/process_text', methods=['GET'])
@@ -56,23 +206,74 @@ def process_text():
         
         input_text = request.args.get('text', '')
        
-        file_path = '../src/prompts/generic-evaluation-prompt.txt'
-        r = Retriever(file_path="../data/Raptor Contract.docx.pdf",eval_path=file_path,weviate_instance=instance, model_name="gpt-3.5-turbo")
-        context = r.retrieve_query(input_text)
-        
-        geneation = Generation("gpt-3.5-turbo")
-        
-        answer = geneation.generate_answer(context=context,question=input_text)
+        pipeline = pipelines.get(document_path(), EVAL_PROMPT_PATH, MODEL_NAME)
+
+        def answer_question():
+            context = pipeline.retriever.retrieve_query(input_text)
+            return pipeline.generation.generate_answer(context=context, question=input_text)
+
+        with tracing.trace('process_text') as request_trace:
+            answer = answer_cache.get_or_compute(input_text, pipeline.retriever.document.key, MODEL_NAME, answer_question)
+        tracing.save_trace(request_trace)
+
+        result = {'result': answer}
+        # ?trace=1 returns the per-stage spans of this request
+        if request.args.get('trace') == '1':
+            result['trace'] = request_trace.to_dict()
+        return jsonify(result)
 
-        return jsonify({'result': answer})
+    except (DocumentNotFound, DocumentNotReady) as e:
+        return routing_error(e)
 
     except Exception as e:
         # Handle any exceptions and return an error response
         error_message = f"An error occurred: {str(e)}"
         return jsonify({'error': error_message})
 
+
+@app.route('/process_text/stream', methods=['GET'])
+def process_text_stream():
+    # Same pipeline as /process_text, streamed to the client as Server-Sent Events
+    input_text = request.args.get('text', '')
+    try:
+        pipeline = pipelines.get(document_path(), EVAL_PROMPT_PATH, MODEL_NAME)
+    except (DocumentNotFound, DocumentNotReady) as e:
+        return routing_error(e)
+    events = stream_answer(pipeline.retriever, pipeline.generation, input_text)
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@app.route('/pipeline_stats', methods=['GET'])
+def pipeline_stats():
+    # Cold (build) and warm (cached) lookup timings of the pipeline registry
+    return jsonify({**pipelines.stats(), 'answer_cache': answer_cache.stats()})
+
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    # Readiness probe; the first call starts the warm-up when the server was not started through __main__
+    warmup.start()
+    status = warmup.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    # Per-stage latency histograms, token and candidate counters in Prometheus text format
+    return Response(tracing.metrics.render(), content_type=tracing.CONTENT_TYPE)
+
 if __name__ == '__main__':
-    app.run(debug=True)
+    debug = True
+    # With debug on, Werkzeug's reloader runs this file twice: a parent that only watches the sources and the child
+    # (WERKZEUG_RUN_MAIN=true) that serves; models and job workers belong in the serving process only
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warmup.start()
+        ingestion.resume()
+    app.run(debug=debug)
 
 
 if __name__ == '__main__':
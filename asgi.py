@@ -0,0 +1,5 @@
+from app import pipelines, answer_cache, documents, ingestion, jobs, warmup, CONTRACT_PATH, EVAL_PROMPT_PATH, MODEL_NAME
+from src.async_app import create_async_app
+
+# Async serving mode: hypercorn asgi:app --bind 127.0.0.1:5000
+app = create_async_app(pipelines, answer_cache, CONTRACT_PATH, EVAL_PROMPT_PATH, MODEL_NAME, documents=documents, ingestion=ingestion, jobs=jobs, warmup=warmup)
@@ -0,0 +1,132 @@
+"""Import-time benchmark of the API process, with a budget CI can enforce.
+
+Usage:
+    python benchmarks/import_time.py [--modules app generation] [--repeat 5] [--output run.json]
+    python benchmarks/import_time.py --budget 1.5
+
+Every module is imported --repeat times, each in a fresh interpreter with
+src/ on the path (as the app runs), and the median wall time of the import is
+reported with the slowest dependencies seen by `python -X importtime`.
+
+Heavy dependencies (torch, sentence-transformers, transformers, weaviate,
+langchain, openai, unstructured, tiktoken) are only to be imported on first use.
+With --budget, a module whose median import takes longer than the budget, or
+that imports one of them, is listed and the script exits with status 1.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+SRC_DIR = os.path.join(REPO_DIR, 'src')
+
+HEAVY = ['torch', 'sentence_transformers', 'transformers', 'weaviate', 'langchain', 'langchain_core',
+         'langchain_community', 'langchain_openai', 'openai', 'unstructured', 'tiktoken']
+
+# Run in the child interpreter: time the import and list the heavy modules it pulled in
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'heavy': sorted(name for name in {heavy!r} if name in sys.modules)}}))
+"""
+
+
+def child_env() -> dict:
+    """Environment of the child interpreters: src/ on the path and no real credentials needed."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [SRC_DIR, env.get('PYTHONPATH')]))
+    env.setdefault('OPENAI_API_KEY', 'import-time-benchmark')
+    return env
+
+
+def time_import(module: str) -> dict:
+    """Import a module in a fresh interpreter; returns its import seconds and the heavy modules loaded."""
+    result = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY)], cwd=REPO_DIR, env=child_env(),
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def direct_imports(code: str) -> dict:
+    """Cumulative milliseconds of every top-level import made while running code, from -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=REPO_DIR, env=child_env(),
+                            capture_output=True, text=True)
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nesting is two spaces per level; level 1 are the direct imports
+        if cumulative_us.strip().isdigit() and len(name) - len(name.lstrip()) == 3:
+            cumulative[name.strip()] = int(cumulative_us) / 1000
+    return cumulative
+
+
+def slowest_imports(module: str, count: int) -> list:
+    """
+    Return the dependencies of a module with the highest cumulative import time.
+
+    Parameters:
+        module (str): Module to import.
+        count (int): Number of dependencies to return.
+
+    Returns:
+        list: (name, milliseconds) of its direct dependencies, slowest first; modules
+            the interpreter imports at start-up are left out.
+    """
+    startup = direct_imports('pass')
+    cumulative = {name: ms for name, ms in direct_imports(f"import {module}").items() if name not in startup}
+    return sorted(cumulative.items(), key=lambda item: -item[1])[:count]
+
+
+def measure(module: str, repeat: int, top: int) -> dict:
+    """Median, min and max import seconds of a module over repeat fresh interpreters."""
+    runs = [time_import(module) for _ in range(repeat)]
+    seconds = sorted(run['seconds'] for run in runs)
+    return {
+        'module': module,
+        'median_seconds': statistics.median(seconds),
+        'min_seconds': seconds[0],
+        'max_seconds': seconds[-1],
+        'heavy_imports': runs[-1]['heavy'],
+        'slowest_ms': dict(slowest_imports(module, top)),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure how long importing the API modules takes.")
+    parser.add_argument('--modules', nargs='+', default=['app', 'generation'], help='Modules to import (src/ is on the path)')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per module')
+    parser.add_argument('--top', type=int, default=8, help='Slowest dependencies reported per module')
+    parser.add_argument('--budget', type=float, default=None, help='Fail when a median import takes longer (seconds)')
+    parser.add_argument('--output', default=None, help='Write the results as JSON')
+    args = parser.parse_args()
+
+    results = {'python': sys.version.split()[0], 'modules': [measure(module, args.repeat, args.top) for module in args.modules]}
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.budget is None:
+        return 0
+    failures = []
+    for result in results['modules']:
+        if result['median_seconds'] > args.budget:
+            failures.append(f"import {result['module']}: {result['median_seconds']:.2f}s > budget {args.budget:.2f}s")
+        if result['heavy_imports']:
+            failures.append(f"import {result['module']} loads {', '.join(result['heavy_imports'])} eagerly")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Compare local and LLM keyword extraction on latency and retrieval recall.
+
+Usage:
+    python benchmarks/keyword_extraction.py --document "data/Raptor Contract.docx.pdf" [--llm]
+
+The questions default to benchmarks/questions.jsonl (the Ragas.main sample set).
+Recall is the share of ground-truth content words found in the top-k paragraphs
+matched by the extracted keyword, averaged over questions whose ground truth has
+content words.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC_DIR)
+
+from keyword_index import KeywordIndex, tokenize
+from keyword_extractor import LocalKeywordExtractor, STOPWORDS
+
+
+def load_paragraphs(path):
+    """Return the blank-line paragraphs of a PDF (through the document cache) or a text file."""
+    if path.endswith('.pdf'):
+        from document_cache import DocumentCache
+        from langchain_community.document_loaders import UnstructuredPDFLoader
+        return DocumentCache().load(path, UnstructuredPDFLoader).paragraphs
+    with open(path, 'r') as file:
+        return file.read().split("\n\n")
+
+
+def load_questions(path):
+    with open(path, 'r') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def recall(paragraphs, ground_truth):
+    """Share of ground-truth content words present in the paragraphs, or None if it has none."""
+    expected = {token for token in tokenize(ground_truth) if token not in STOPWORDS}
+    if not expected:
+        return None
+    found = set(tokenize(" ".join(paragraphs)))
+    return len(expected & found) / len(expected)
+
+
+def run(name, extract, index, questions, top_k):
+    latencies, recalls, rows = [], [], []
+    for item in questions:
+        start = time.perf_counter()
+        keyword = extract(item['question'])
+        latencies.append(time.perf_counter() - start)
+        matched = index.matching_paragraphs(keyword, limit=top_k) if keyword else []
+        score = recall(matched, item['ground_truth'])
+        if score is not None:
+            recalls.append(score)
+        rows.append({'question': item['question'], 'keyword': keyword, 'matches': len(matched), 'recall': score})
+    return {
+        'mode': name,
+        'mean_latency_ms': statistics.mean(latencies) * 1000,
+        'max_latency_ms': max(latencies) * 1000,
+        'mean_recall': statistics.mean(recalls) if recalls else None,
+        'questions': rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--document', required=True, help='Contract PDF or plain-text file')
+    parser.add_argument('--questions', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'questions.jsonl'))
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--threshold', type=float, default=0.5, help='Local confidence below which hybrid mode asks the LLM')
+    parser.add_argument('--llm', action='store_true', help='Also measure the LLM extractor (needs OPENAI_API_KEY)')
+    parser.add_argument('--model', default='gpt-3.5-turbo')
+    parser.add_argument('--output', help='Write the results as JSON to this path')
+    args = parser.parse_args()
+
+    index = KeywordIndex(load_paragraphs(args.document))
+    questions = load_questions(args.questions)
+    extractor = LocalKeywordExtractor(index)
+
+    results = [run('local', lambda question: extractor.extract(question)[0], index, questions, args.top_k)]
+
+    if args.llm:
+        from generation import Generation
+        generation = Generation(args.model)
+        prompt = generation.prompts.get('keywords')
+
+        def llm(question):
+            return generation.get_keyword(prompt, question)
+
+        def hybrid(question):
+            keyword, confidence = extractor.extract(question)
+            return keyword if keyword is not None and confidence >= args.threshold else llm(question)
+
+        results.append(run('llm', llm, index, questions, args.top_k))
+        results.append(run('hybrid', hybrid, index, questions, args.top_k))
+
+    for result in results:
+        recall_text = 'n/a' if result['mean_recall'] is None else f"{result['mean_recall']:.2f}"
+        print(f"{result['mode']:>7}: mean {result['mean_latency_ms']:8.2f} ms  max {result['max_latency_ms']:8.2f} ms  recall@{args.top_k} {recall_text}")
+        for row in result['questions']:
+            print(f"         {row['keyword']!r:30} matches={row['matches']:<3} {row['question'][:60]}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""Load test of the async (ASGI) API against local stub services.
+
+Usage:
+    python benchmarks/load_test.py [--concurrency 1 8 32 64] [--requests 128] [--delay 0.2]
+
+The app from src/async_app.py is served by Hypercorn in this process. OpenAI is
+replaced by benchmarks/stubs.StubOpenAIServer (every chat call sleeps --delay
+seconds), the vector store by a LocalVectorIndex over a synthetic contract and
+the cross-encoder by StubCrossEncoder, so no outside service is needed.
+
+For every concurrency level the harness sends --requests distinct questions to
+/process_text and reports throughput, latency percentiles, the peak number of
+requests the server had open, the peak number of OpenAI calls in flight and
+the threads of the event loop's executor (bounded, not one per request).
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'src')
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import httpx
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+from stubs import StubOpenAIServer, HashEmbeddings, StubCrossEncoder, TOPICS, synthetic_contract
+
+
+def build_app(workdir: str, paragraphs: int, keyword_mode: str):
+    """Build the ASGI app over a synthetic contract and stubbed services."""
+    from document_cache import DocumentCache
+    from vector_index import LocalVectorIndex
+    from reranker import Reranker
+    from retriever import Retriever
+    from pipeline import Pipeline, PipelineRegistry
+    from answer_cache import AnswerCache, MemoryBackend
+    from async_app import create_async_app
+
+    contract_path = os.path.join(workdir, 'contract.pdf')
+    pages = synthetic_contract(paragraphs)
+    with open(contract_path, 'w') as file:
+        file.write("\n\n".join(pages))
+    document_cache = DocumentCache(os.path.join(workdir, 'documents'))
+    document = document_cache.put(contract_path, pages)
+
+    index = LocalVectorIndex.from_texts(document.paragraphs, HashEmbeddings(), directory=os.path.join(workdir, 'index'))
+    reranker = Reranker(model=StubCrossEncoder())
+
+    def factory(file_path, eval_path, model_name):
+        retriever = Retriever(file_path=file_path, eval_path=eval_path, weviate_instance=index, model_name=model_name,
+                              document_cache=document_cache, reranker=reranker, keyword_mode=keyword_mode)
+        return Pipeline(retriever=retriever, generation=retriever.generation)
+
+    eval_path = os.path.join(SRC_DIR, 'prompts', 'generic-evaluation-prompt.txt')
+    return create_async_app(PipelineRegistry(factory), AnswerCache(backend=MemoryBackend()), contract_path, eval_path, 'gpt-3.5-turbo')
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """Serve an ASGI app with Hypercorn on its own event loop thread."""
+
+    def __init__(self, app, port: int):
+        self.app = app
+        self.port = port
+        self._loop = None
+        self._stop = None
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        async def main():
+            self._loop = asyncio.get_running_loop()
+            self._stop = asyncio.Event()
+            config = Config()
+            config.bind = [f"127.0.0.1:{self.port}"]
+            config.accesslog = None
+            config.backlog = 1024
+            self._loop.call_soon(self._started.set)
+            await serve(self.app, config, shutdown_trigger=self._stop.wait)
+        asyncio.run(main())
+
+    def executor_threads(self) -> int:
+        return sum(1 for thread in threading.enumerate() if thread.name.startswith('asyncio'))
+
+    def __enter__(self):
+        self._thread.start()
+        self._started.wait()
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join(timeout=10)
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get('/pipeline_stats')
+            if response.status_code == 200 and response.json().get('pipelines'):
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+
+async def run_level(client, server, stub, concurrency: int, requests: int, offset: int) -> dict:
+    """Send requests distinct questions with at most concurrency in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+    in_flight = peak = threads = 0
+
+    async def one(i):
+        nonlocal errors, in_flight, peak, threads
+        question = f"What is the {TOPICS[i % len(TOPICS)]} in request {offset + i}?"
+        async with semaphore:
+            in_flight += 1
+            peak = max(peak, in_flight)
+            start = time.perf_counter()
+            try:
+                response = await client.get('/process_text', params={'text': question})
+                if response.status_code != 200 or 'error' in response.json():
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+            threads = max(threads, server.executor_threads())
+            in_flight -= 1
+
+    stub.reset()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    seconds = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': errors,
+        'seconds': seconds,
+        'requests_per_second': requests / seconds,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000,
+        'peak_open_requests': peak,
+        'peak_openai_in_flight': stub.max_in_flight,
+        'openai_calls': stub.requests,
+        'executor_threads': threads,
+    }
+
+
+async def run(args, server, stub):
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{server.port}", limits=limits, timeout=120) as client:
+        await wait_ready(client)
+        results, offset = [], 0
+        for concurrency in args.concurrency:
+            requests = max(args.requests, concurrency)
+            results.append(await run_level(client, server, stub, concurrency, requests, offset))
+            offset += requests
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64])
+    parser.add_argument('--requests', type=int, default=128, help='Requests per concurrency level (at least the level)')
+    parser.add_argument('--delay', type=float, default=0.2, help='Seconds every stubbed chat completion takes')
+    parser.add_argument('--paragraphs', type=int, default=400, help='Paragraphs in the synthetic contract')
+    parser.add_argument('--keyword-mode', choices=['llm', 'local'], default='llm')
+    parser.add_argument('--output', help='Write the results as JSON to this path')
+    args = parser.parse_args()
+
+    with StubOpenAIServer(delay=args.delay) as stub, tempfile.TemporaryDirectory() as workdir:
+        os.environ['OPENAI_API_KEY'] = 'stub'
+        os.environ['OPENAI_BASE_URL'] = stub.base_url
+        app = build_app(workdir, args.paragraphs, args.keyword_mode)
+        with BackgroundServer(app, free_port()) as server:
+            results = asyncio.run(run(args, server, stub))
+
+    print(f"{'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'open':>5} {'openai':>7} {'threads':>8} {'errors':>7}")
+    for row in results:
+        print(f"{row['concurrency']:>5} {row['requests_per_second']:>8.1f} {row['p50_ms']:>8.0f} {row['p95_ms']:>8.0f} "
+              f"{row['peak_open_requests']:>5} {row['peak_openai_in_flight']:>7} {row['executor_threads']:>8} {row['errors']:>7}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'delay': args.delay, 'keyword_mode': args.keyword_mode, 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""End-to-end benchmark of Retriever.retrieve_query -> Generation.generate_answer.
+
+Usage:
+    python benchmarks/pipeline_benchmark.py [--sizes 100 400 1600] [--queries 50] [--reranker torch] [--output run.json]
+    python benchmarks/pipeline_benchmark.py --output new.json --compare baseline.json [--tolerance 0.15]
+
+Everything outside the process is a deterministic local stub: the OpenAI chat
+and embeddings APIs are served by benchmarks/stubs.StubOpenAIServer (every chat
+call sleeps --delay seconds, 0 by default so only the pipeline's own work is
+measured), Weaviate by StubWeaviate (the query is embedded through the stubbed
+embeddings API) and tiktoken by StubTokenizer. The cross-encoder is the real
+one (--reranker torch or onnx, loaded once before the first size), so reranking
+is measured; --reranker stub swaps in StubCrossEncoder. The corpus is a
+synthetic contract of each --sizes paragraphs.
+
+For every size the harness answers --queries distinct questions, --concurrency
+at a time, and reports p50/p95/p99 latency, throughput, the process's peak RSS
+(a high-water mark, so it never drops between sizes), cross-encoder pairs scored
+per query, OpenAI calls per query and the median duration of every traced stage.
+
+With --compare, latency percentiles, pairs and calls per query above the
+baseline by more than --tolerance, or throughput below it by more than
+--tolerance, are listed and the script exits with status 1. A baseline recorded
+with a different configuration (sizes, queries, concurrency, delay, keyword
+mode, local sufficiency or reranker) is refused with status 2 before running.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'src')
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from stubs import StubOpenAIServer, StubWeaviate, StubCrossEncoder, StubTokenizer, TOPICS, synthetic_contract
+
+# Metric -> True when a higher value is a regression
+COMPARED = {'p50_ms': True, 'p95_ms': True, 'p99_ms': True, 'queries_per_second': False,
+            'pairs_scored_per_query': True, 'openai_calls_per_query': True}
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def stage_durations(span: dict, durations: dict):
+    """Add the duration of every span below a trace to durations[name]."""
+    for child in span['children']:
+        durations.setdefault(child['name'], []).append(child['duration_ms'])
+        stage_durations(child, durations)
+
+
+def build_pipeline(workdir: str, paragraphs: int, stub, keyword_mode: str, cross_encoder, sufficiency=None):
+    """Build a retriever and its generation over a synthetic contract and stubbed services.
+
+    Every size gets its own Reranker, so its score cache starts empty, around the
+    cross-encoder loaded once.
+    """
+    from langchain_openai import OpenAIEmbeddings
+    from context_assembly import ContextAssembler
+    from document_cache import DocumentCache
+    from reranker import Reranker
+    from retriever import Retriever
+
+    contract_path = os.path.join(workdir, f'contract-{paragraphs}.pdf')
+    pages = synthetic_contract(paragraphs)
+    with open(contract_path, 'w') as file:
+        file.write("\n\n".join(pages))
+    document_cache = DocumentCache(os.path.join(workdir, 'documents'))
+    document = document_cache.put(contract_path, pages)
+
+    embedding = OpenAIEmbeddings(api_key='stub', base_url=stub.base_url, check_embedding_ctx_length=False)
+    store = StubWeaviate(document.paragraphs, embedding)
+    reranker = Reranker(model=cross_encoder)
+    retriever = Retriever(file_path=contract_path, eval_path=os.path.join(SRC_DIR, 'prompts', 'generic-evaluation-prompt.txt'),
+                          weviate_instance=store, model_name='gpt-3.5-turbo', document_cache=document_cache,
+                          reranker=reranker, keyword_mode=keyword_mode, sufficiency=sufficiency,
+                          context_assembler=ContextAssembler(tokenizer=StubTokenizer()))
+    return retriever, retriever.generation
+
+
+def run_size(paragraphs: int, args, stub, workdir: str, cross_encoder) -> dict:
+    """Answer args.queries distinct questions over a contract of the given size."""
+    import tracing
+    from sufficiency import SufficiencyClassifier
+
+    sufficiency = SufficiencyClassifier(*args.local_sufficiency) if args.local_sufficiency else None
+    retriever, generation = build_pipeline(workdir, paragraphs, stub, args.keyword_mode, cross_encoder, sufficiency)
+    questions = [f"What is the {TOPICS[i % len(TOPICS)]} set out in clause {i % paragraphs + 1}?" for i in range(args.queries)]
+
+    def answer(question):
+        with tracing.trace('benchmark') as request_trace:
+            start = time.perf_counter()
+            context = retriever.retrieve_query(question)
+            generation.generate_answer(context=context, question=question)
+            latency = time.perf_counter() - start
+        return latency, request_trace.to_dict()
+
+    # One warm-up query so client and pool setup are not measured
+    answer(questions[0])
+    stub.reset()
+    pairs_before = retriever.reranker.pairs_scored
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(answer, questions))
+    seconds = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    durations = {}
+    for _, request_trace in results:
+        stage_durations(request_trace, durations)
+    return {
+        'paragraphs': paragraphs,
+        'queries': len(questions),
+        'seconds': seconds,
+        'queries_per_second': len(questions) / seconds,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_rss_mb': peak_rss_mb(),
+        'pairs_scored_per_query': (retriever.reranker.pairs_scored - pairs_before) / len(questions),
+        'openai_calls_per_query': stub.requests / len(questions),
+        'stage_p50_ms': {name: statistics.median(values) for name, values in sorted(durations.items())},
+    }
+
+
+def config_differences(config: dict, baseline: dict) -> list:
+    """
+    List the settings of this run that differ from those a baseline was recorded with.
+
+    Returns:
+        list: (setting, baseline value, value of this run) per difference; a setting
+            missing from the baseline counts as different.
+    """
+    recorded = baseline.get('config', {})
+    missing = object()
+    return [(key, recorded.get(key), value) for key, value in config.items() if recorded.get(key, missing) != value]
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """
+    List the metrics that regressed against a baseline run.
+
+    Returns:
+        list: (paragraphs, metric, baseline value, new value) per regression.
+    """
+    previous = {row['paragraphs']: row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        old = previous.get(row['paragraphs'])
+        if old is None:
+            continue
+        for metric, higher_is_worse in COMPARED.items():
+            if metric not in old or not old[metric]:
+                continue
+            change = (row[metric] - old[metric]) / old[metric]
+            if (change if higher_is_worse else -change) > tolerance:
+                regressions.append((row['paragraphs'], metric, old[metric], row[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 400, 1600], help='Paragraphs of each synthetic contract')
+    parser.add_argument('--queries', type=int, default=50, help='Questions per contract size')
+    parser.add_argument('--concurrency', type=int, default=1, help='Questions answered at a time')
+    parser.add_argument('--delay', type=float, default=0.0, help='Seconds every stubbed chat completion takes')
+    parser.add_argument('--keyword-mode', choices=['llm', 'local'], default='llm')
+    parser.add_argument('--local-sufficiency', type=float, nargs=2, metavar=('LOW', 'HIGH'),
+                        help='Decide sufficiency from rerank scores outside LOW..HIGH without the LLM')
+    parser.add_argument('--reranker', choices=['torch', 'onnx', 'stub'], default='torch',
+                        help='Cross-encoder backend; stub scores by token overlap (0-1) and measures no model')
+    parser.add_argument('--output', help='Write the results as JSON to this path')
+    parser.add_argument('--compare', help='Baseline JSON of an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative change before a metric counts as a regression')
+    args = parser.parse_args()
+    config = {key: getattr(args, key) for key in ('sizes', 'queries', 'concurrency', 'delay', 'keyword_mode', 'local_sufficiency', 'reranker')}
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        differences = config_differences(config, baseline)
+        for key, old, new in differences:
+            print(f"{args.compare} was recorded with {key}={old!r}, this run uses {new!r}", file=sys.stderr)
+        if differences:
+            sys.exit(2)
+
+    if args.reranker == 'stub':
+        cross_encoder = StubCrossEncoder()
+    else:
+        from reranker import load_cross_encoder
+        cross_encoder = load_cross_encoder(backend=args.reranker)
+
+    with StubOpenAIServer(delay=args.delay, embedding_delay=0.0) as stub, tempfile.TemporaryDirectory() as workdir:
+        os.environ['OPENAI_API_KEY'] = 'stub'
+        os.environ['OPENAI_BASE_URL'] = stub.base_url
+        results = [run_size(paragraphs, args, stub, workdir, cross_encoder) for paragraphs in args.sizes]
+
+    print(f"{'paras':>6} {'q/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rss MiB':>8} {'pairs/q':>8} {'calls/q':>8}")
+    for row in results:
+        print(f"{row['paragraphs']:>6} {row['queries_per_second']:>7.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+              f"{row['peak_rss_mb']:>8.0f} {row['pairs_scored_per_query']:>8.1f} {row['openai_calls_per_query']:>8.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'config': config, 'python': platform.python_version(), 'created': time.time(), 'results': results}, file, indent=2)
+
+    if args.compare:
+        regressions = compare(results, baseline, args.tolerance)
+        for paragraphs, metric, old, new in regressions:
+            print(f"REGRESSION {paragraphs} paragraphs: {metric} {old:.2f} -> {new:.2f}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Cross-encoder throughput in (query, passage) pairs per second, PyTorch against int8 ONNX.
+
+Usage:
+    python benchmarks/reranker_throughput.py [--backends torch onnx] [--threads 1 4] [--pairs 512] [--batch-size 32]
+
+The ONNX backend needs onnxruntime and an export (cd src && python onnx_reranker.py).
+Every backend and thread count is measured in a fresh process, so the reported
+peak RSS is that of one loaded model. Pairs are questions against paragraphs of
+the synthetic contract of benchmarks/stubs.py; one warm-up batch is not timed.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'src')
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from stubs import TOPICS, synthetic_contract
+from pipeline_benchmark import peak_rss_mb
+
+
+def benchmark_pairs(count: int) -> list:
+    """Questions about every topic paired with contract paragraphs."""
+    paragraphs = [paragraph for page in synthetic_contract(count) for paragraph in page.split("\n\n")]
+    return [[f"What is the {TOPICS[i % len(TOPICS)]}?", paragraphs[i]] for i in range(count)]
+
+
+def measure(backend: str, threads: int, pairs: list, batch_size: int, repeat: int) -> dict:
+    """Load one backend in this process and time repeat passes over the pairs."""
+    from reranker import load_cross_encoder
+
+    if backend == 'torch':
+        import torch
+        torch.set_num_threads(threads)
+    start = time.perf_counter()
+    model = load_cross_encoder(backend=backend, num_threads=threads if backend == 'onnx' else None)
+    load_seconds = time.perf_counter() - start
+    model.predict(pairs[:batch_size], batch_size=batch_size, show_progress_bar=False)
+
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict(pairs, batch_size=batch_size, show_progress_bar=False)
+        seconds.append(time.perf_counter() - start)
+    return {
+        'backend': backend,
+        'threads': threads,
+        'pairs': len(pairs),
+        'batch_size': batch_size,
+        'pairs_per_second': len(pairs) / statistics.median(seconds),
+        'load_seconds': load_seconds,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', choices=['torch', 'onnx'], default=['torch', 'onnx'])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, os.cpu_count() or 1], help='Thread counts to measure')
+    parser.add_argument('--pairs', type=int, default=512, help='Pairs scored per pass')
+    parser.add_argument('--batch-size', type=int, default=32, help='Pairs per forward pass')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed passes; the median is reported')
+    parser.add_argument('--output', help='Write the results as JSON to this path')
+    args = parser.parse_args()
+
+    pairs = benchmark_pairs(args.pairs)
+    results = []
+    for backend in args.backends:
+        for threads in dict.fromkeys(args.threads):
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                results.append(executor.submit(measure, backend, threads, pairs, args.batch_size, args.repeat).result())
+
+    print(f"{'backend':>8} {'threads':>8} {'pairs/s':>9} {'load s':>7} {'rss MiB':>8}")
+    for row in results:
+        print(f"{row['backend']:>8} {row['threads']:>8} {row['pairs_per_second']:>9.1f} {row['load_seconds']:>7.2f} {row['peak_rss_mb']:>8.0f}")
+
+    if args.output:
+        config = {key: getattr(args, key) for key in ('backends', 'threads', 'pairs', 'batch_size', 'repeat')}
+        with open(args.output, 'w') as file:
+            json.dump({'config': config, 'python': platform.python_version(), 'created': time.time(), 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
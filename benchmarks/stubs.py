@@ -0,0 +1,251 @@
+"""Local stand-ins for the outside services used by the pipeline benchmarks.
+
+StubOpenAIServer answers the chat-completions and embeddings endpoints of the
+OpenAI API after a configurable delay, HashEmbeddings embeds text without any
+service, StubWeaviate replaces the Weaviate vector store, StubCrossEncoder
+replaces the sentence-transformers model, StubTokenizer replaces tiktoken in
+context assembly and synthetic_contract builds a contract-like corpus of any size.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+TOKEN = re.compile(r"[a-z0-9]+")
+TOPICS = ["escrow amount", "purchase price", "governing law", "termination notice", "indemnification cap",
+          "closing date", "non-compete period", "confidentiality obligations", "representations and warranties",
+          "dispute resolution", "assignment of rights", "payment schedule"]
+
+
+def synthetic_contract(paragraphs: int) -> list:
+    """
+    Build contract-like pages of blank-line separated paragraphs.
+
+    Parameters:
+        paragraphs (int): Number of paragraphs (20 per page).
+
+    Returns:
+        list: Page texts.
+    """
+    texts = [f"Section {i + 1}. The {TOPICS[i % len(TOPICS)]} of this agreement is set out in clause {i + 1}. "
+             f"The parties agree that the {TOPICS[(i * 7) % len(TOPICS)]} applies to the buyer and the seller."
+             for i in range(paragraphs)]
+    return ["\n\n".join(texts[start:start + 20]) for start in range(0, len(texts), 20)]
+
+
+def hash_vector(text: str, dimension: int = 256) -> list:
+    """
+    Embed text as a normalised bag of hashed tokens, so similar texts get similar vectors.
+
+    Parameters:
+        text (str): Text to embed.
+        dimension (int): Vector size.
+
+    Returns:
+        list: Unit vector.
+    """
+    vector = np.zeros(dimension, dtype=np.float32)
+    for token in TOKEN.findall(text.lower()):
+        vector[int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=4).digest(), 'little') % dimension] += 1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+class HashEmbeddings:
+    """LangChain-compatible embeddings computed locally with hash_vector."""
+
+    def __init__(self, dimension: int = 256):
+        self.dimension = dimension
+
+    def embed_documents(self, texts):
+        return [hash_vector(text, self.dimension) for text in texts]
+
+    def embed_query(self, text):
+        return hash_vector(text, self.dimension)
+
+
+class StubWeaviate:
+    """In-memory stand-in for the LangChain Weaviate store with by_text=False.
+
+    Like Weaviate, the query is embedded with the store's embeddings (one
+    embeddings API call) and the nearest passages by cosine similarity are
+    returned; the search itself is exact.
+    """
+
+    def __init__(self, texts: list, embedding):
+        from langchain_core.documents import Document
+        self.embedding = embedding
+        self.documents = [Document(page_content=text) for text in texts]
+        vectors = np.asarray(embedding.embed_documents(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors / np.where(norms == 0, 1, norms)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs):
+        vector = np.asarray(self.embedding.embed_query(query), dtype=np.float32)
+        scores = self.vectors @ (vector / (np.linalg.norm(vector) or 1))
+        order = np.argsort(-scores, kind='stable')[:k]
+        return [self.documents[i] for i in order]
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs):
+        return await asyncio.to_thread(self.similarity_search, query, k)
+
+
+class StubCrossEncoder:
+    """Cross-encoder stand-in scoring a pair by the share of query tokens in the passage."""
+
+    def predict(self, pairs, batch_size=32, **kwargs):
+        scores = []
+        for query, passage in pairs:
+            query_tokens = set(TOKEN.findall(query.lower()))
+            passage_tokens = set(TOKEN.findall(passage.lower()))
+            scores.append(len(query_tokens & passage_tokens) / (len(query_tokens) or 1))
+        return np.asarray(scores, dtype=np.float32)
+
+
+class StubTokenizer:
+    """tiktoken stand-in counting every whitespace separated word as one token, so no encoding is downloaded."""
+
+    def encode(self, text: str) -> list:
+        return text.split()
+
+    def decode(self, tokens: list) -> str:
+        return ' '.join(tokens)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class StubOpenAIServer:
+    """OpenAI chat-completions and embeddings endpoints served from a local thread.
+
+    Chat requests are answered after `delay` seconds: sufficiency prompts get
+    'true' with a confident logprob, keyword prompts get the longest word of the
+    question and any other prompt gets `answer`, streamed when requested.
+    """
+
+    def __init__(self, delay: float = 0.2, embedding_delay: float = 0.02, answer: str = "The escrow amount is $1,000,000.", dimension: int = 256):
+        self.delay = delay
+        self.embedding_delay = embedding_delay
+        self.answer = answer
+        self.dimension = dimension
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.max_in_flight = self.in_flight
+
+    def reply(self, content: str) -> str:
+        if 'the boolean true or false' in content:
+            return 'true'
+        if 'good keyword' in content:
+            question = content.split('the following question:')[-1].split('Give me')[0]
+            return max(TOKEN.findall(question.lower()) or ['contract'], key=len)
+        return self.answer
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; without this, Nagle and
+                # delayed ACKs add ~40 ms to every keep-alive response
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stub._lock:
+                    stub.requests += 1
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    if self.path.endswith('/embeddings'):
+                        time.sleep(stub.embedding_delay)
+                        inputs = body['input'] if isinstance(body['input'], list) else [body['input']]
+                        self._json({
+                            "object": "list",
+                            "model": body.get('model', 'text-embedding-ada-002'),
+                            "data": [{"object": "embedding", "index": i, "embedding": hash_vector(str(text), stub.dimension)} for i, text in enumerate(inputs)],
+                            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+                        })
+                        return
+                    time.sleep(stub.delay)
+                    answer = stub.reply(body['messages'][-1]['content'])
+                    if body.get('stream'):
+                        self._stream(body, answer)
+                    else:
+                        self._json(self._completion(body, answer))
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def _completion(self, body, answer):
+                return {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": body.get('model', 'gpt-3.5-turbo'),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": answer},
+                        "logprobs": {"content": [{"token": answer, "logprob": -0.001, "bytes": None,
+                                                  "top_logprobs": [{"token": answer, "logprob": -0.001, "bytes": None}]}]},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": len(body['messages'][-1]['content']) // 4, "completion_tokens": len(answer) // 4 + 1,
+                              "total_tokens": len(body['messages'][-1]['content']) // 4 + len(answer) // 4 + 1},
+                }
+
+            def _json(self, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, body, answer):
+                self.close_connection = True
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                for token in re.findall(r"\S+\s*", answer):
+                    chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 0, "model": body.get('model', 'gpt-3.5-turbo'),
+                             "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        return Handler
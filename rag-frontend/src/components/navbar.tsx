@@ -1,6 +1,7 @@
 import React, { useState, useRef, useEffect } from 'react';
 
 interface Message {
+  id: number;
   sender: string;
   message: string;
 }
@@ -9,15 +10,55 @@ const ChatComponent: React.FC = () => {
   const [userInput, setUserInput] = useState<string>('');
   const [conversation, setConversation] = useState<Message[]>([]);
   const chatContainerRef = useRef<HTMLDivElement>(null);
+  const nextMessageId = useRef<number>(0);
 
   const handleInputChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     setUserInput(e.target.value);
   };
 
+  // New messages are prepended, so a stream updates its answer by id rather than by position
+  const updateAnswer = (answerId: number, update: (message: string) => string) => {
+    setConversation((previous) =>
+      previous.map((item) => (item.id === answerId ? { ...item, message: update(item.message) } : item)),
+    );
+  };
+
+  const streamAnswer = (question: string, answerId: number) => {
+    // Server-Sent Events: progress while retrieving, then the answer token by token
+    const source = new EventSource(`/process_text/stream?text=${encodeURIComponent(question)}`);
+    let receivedToken = false;
+
+    source.addEventListener('progress', (event) => {
+      const { stage } = JSON.parse((event as MessageEvent).data);
+      if (!receivedToken) {
+        updateAnswer(answerId, () => `Working on it (${stage.replace('_', ' ')})...`);
+      }
+    });
+    source.addEventListener('token', (event) => {
+      const { token } = JSON.parse((event as MessageEvent).data);
+      const firstToken = !receivedToken;
+      receivedToken = true;
+      updateAnswer(answerId, (message) => (firstToken ? token : message + token));
+    });
+    source.addEventListener('done', () => source.close());
+    source.addEventListener('error', (event) => {
+      const data = (event as MessageEvent).data;
+      updateAnswer(answerId, () => (data ? JSON.parse(data).error : 'The connection to the server was lost.'));
+      source.close();
+    });
+  };
+
   const handleSendClick = () => {
     if (userInput.trim() !== '') {
-      // Add user message to the conversation
-      setConversation([{ sender: 'user', message: userInput }, ...conversation]);
+      // Add user message and a placeholder for the streamed answer to the conversation
+      const questionId = nextMessageId.current++;
+      const answerId = nextMessageId.current++;
+      setConversation((previous) => [
+        { id: answerId, sender: 'assistant', message: 'Working on it...' },
+        { id: questionId, sender: 'user', message: userInput },
+        ...previous,
+      ]);
+      streamAnswer(userInput, answerId);
       // Clear the input field
       setUserInput('');
     }
@@ -38,9 +79,9 @@ const ChatComponent: React.FC = () => {
         ref={chatContainerRef}
         style={{ maxHeight: '70vh', overflowY: 'hidden', paddingBottom: '50px' }}
       >
-        {conversation.map((item, index) => (
+        {conversation.map((item) => (
           <div
-            key={index}
+            key={item.id}
             className={`mb-2 ${item.sender === 'user' ? 'text-end' : 'text-start'}`}
           >
             <span className={`badge bg-${item.sender === 'user' ? 'primary' : 'secondary'}`}>
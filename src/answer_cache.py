@@ -0,0 +1,507 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from singleflight import SingleFlight
+
+
+class MemoryBackend:
+    """In-process LRU store with per-entry expiry."""
+
+    # Entries die with the process, so AnswerCache keeps its similarity index in memory only
+    persistent = False
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        Initialize the MemoryBackend instance.
+
+        Parameters:
+            max_entries (int): Entries kept before the least recently used is evicted.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """
+        Return the value stored under a key.
+
+        Parameters:
+            key (str): Cache key.
+
+        Returns:
+            Stored value, or None when it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float = None):
+        """
+        Store a value under a key.
+
+        Parameters:
+            key (str): Cache key.
+            value: JSON serialisable value.
+            ttl (float): Seconds until the value expires (default never).
+        """
+        with self._lock:
+            self._entries[key] = (time.time() + ttl if ttl else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class FileBackend:
+    """One JSON file per entry; survives restarts and can be shared by local workers."""
+
+    def __init__(self, directory: str, max_entries: int = 10000):
+        """
+        Initialize the FileBackend instance.
+
+        Parameters:
+            directory (str): Directory holding the entries.
+            max_entries (int): Entries kept before the least recently used are evicted.
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str):
+        """
+        Return the value stored under a key.
+
+        Parameters:
+            key (str): Cache key.
+
+        Returns:
+            Stored value, or None when it is missing or expired.
+        """
+        path = os.path.join(self.directory, key + '.json')
+        try:
+            with open(path, 'r') as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if entry['expires_at'] is not None and entry['expires_at'] <= time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        os.utime(path)
+        return entry['value']
+
+    def set(self, key: str, value, ttl: float = None):
+        """
+        Store a value under a key.
+
+        Parameters:
+            key (str): Cache key.
+            value: JSON serialisable value.
+            ttl (float): Seconds until the value expires (default never).
+        """
+        path = os.path.join(self.directory, key + '.json')
+        with self._lock:
+            with open(path + '.tmp', 'w') as file:
+                json.dump({'expires_at': time.time() + ttl if ttl else None, 'value': value}, file)
+            os.replace(path + '.tmp', path)
+            entries = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.json')]
+            if len(entries) > self.max_entries:
+                entries.sort(key=os.path.getmtime)
+                for stale in entries[:len(entries) - self.max_entries]:
+                    os.remove(stale)
+
+
+class RedisBackend:
+    """Store for any Redis-compatible client exposing get(name) and set(name, value, ex=...)."""
+
+    def __init__(self, client, prefix: str = 'answer-cache:'):
+        """
+        Initialize the RedisBackend instance.
+
+        Eviction beyond the TTL is left to the server's maxmemory policy.
+
+        Parameters:
+            client: Redis-compatible client.
+            prefix (str): Prefix of every key.
+        """
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str):
+        """
+        Return the value stored under a key.
+
+        Parameters:
+            key (str): Cache key.
+
+        Returns:
+            Stored value, or None when it is missing or expired.
+        """
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value, ttl: float = None):
+        """
+        Store a value under a key.
+
+        Parameters:
+            key (str): Cache key.
+            value: JSON serialisable value.
+            ttl (float): Seconds until the value expires (default never).
+        """
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(ttl) if ttl else None)
+
+
+def backend_from_env():
+    """
+    Build the backend selected by ANSWER_CACHE_BACKEND ('memory', 'file' or 'redis').
+
+    Returns:
+        Backend instance.
+    """
+    backend = os.environ.get("ANSWER_CACHE_BACKEND", "memory")
+    if backend == "file":
+        default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cache', 'answers')
+        return FileBackend(os.environ.get("ANSWER_CACHE_DIR", default_dir))
+    if backend == "redis":
+        import redis
+        return RedisBackend(redis.Redis.from_url(os.environ["REDIS_URL"]))
+    return MemoryBackend()
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question for exact matching.
+
+    Parameters:
+        question (str): User question.
+
+    Returns:
+        str: Lower-cased question with collapsed whitespace and no trailing punctuation.
+    """
+    return re.sub(r'\s+', ' ', question).strip().lower().rstrip('?.! ')
+
+
+class AnswerCache:
+    """Two-level answer cache: exact normalized question first, then embedding similarity.
+
+    Misses are coalesced: concurrent requests for the same normalized question,
+    document and model wait for the one computation in flight and share its answer.
+
+    The similarity index of every document and model is also stored in a
+    persistent backend (File, Redis), next to the answers. It is reloaded and
+    merged at most every index_refresh seconds, so semantic hits survive a
+    restart and are shared between workers.
+    """
+
+    def __init__(self, backend=None, embed=None, ttl: float = 24 * 3600, similarity_threshold: float = 0.95, max_semantic_entries: int = 1024,
+                 flights: SingleFlight = None, index_refresh: float = 30.0):
+        """
+        Initialize the AnswerCache instance.
+
+        Parameters:
+            backend: Store with get(key) and set(key, value, ttl) (default MemoryBackend()).
+            embed (callable): Returns the embedding of a question; the semantic level is
+                disabled when it is None.
+            ttl (float): Seconds an answer stays valid.
+            similarity_threshold (float): Minimum cosine similarity for a semantic hit.
+            max_semantic_entries (int): Questions kept per document and model in the
+                in-memory similarity index.
+            flights (SingleFlight): Coalesces identical computations in flight (default a new one).
+            index_refresh (float): Seconds after which the similarity index of a document
+                and model is reloaded from a persistent backend.
+        """
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.embed = embed
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.max_semantic_entries = max_semantic_entries
+        self.flights = flights if flights is not None else SingleFlight()
+        self.index_refresh = index_refresh
+        self.persist_index = getattr(self.backend, 'persistent', True)
+        self.hits_exact = 0
+        self.hits_semantic = 0
+        self.misses = 0
+        self._index = {}
+        self._index_loaded = {}
+        self._lock = threading.Lock()
+
+    def key(self, question: str, document_hash: str, model: str) -> str:
+        """
+        Compute the exact-match key of a question.
+
+        Parameters:
+            question (str): User question.
+            document_hash (str): Hash of the document the question is about.
+            model (str): Name of the answering model.
+
+        Returns:
+            str: Cache key.
+        """
+        raw = "\x1f".join([normalize_question(question), document_hash, model])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get_or_compute(self, question: str, document_hash: str, model: str, compute):
+        """
+        Return the cached answer for a question, computing and storing it on a miss.
+
+        Parameters:
+            question (str): User question.
+            document_hash (str): Hash of the document the question is about.
+            model (str): Name of the answering model.
+            compute (callable): Produces the answer on a miss.
+
+        Returns:
+            Answer from the cache or from compute().
+        """
+        return self.flights.do(self.key(question, document_hash, model), self._get_or_compute, question, document_hash, model, compute)
+
+    def _get_or_compute(self, question: str, document_hash: str, model: str, compute):
+        answer, embedding = self._lookup(question, document_hash, model)
+        if answer is not None:
+            return answer
+        answer = compute()
+        self.set(question, document_hash, model, answer, embedding=embedding)
+        return answer
+
+    async def aget_or_compute(self, question: str, document_hash: str, model: str, compute):
+        """
+        Async version of get_or_compute. Lookups and stores call the embedding model
+        and the backend synchronously, so they run in a worker thread.
+
+        Parameters:
+            question (str): User question.
+            document_hash (str): Hash of the document the question is about.
+            model (str): Name of the answering model.
+            compute (callable): Coroutine function producing the answer on a miss.
+
+        Returns:
+            Answer from the cache or from compute().
+        """
+        return await self.flights.ado(self.key(question, document_hash, model), self._aget_or_compute, question, document_hash, model, compute)
+
+    async def _aget_or_compute(self, question: str, document_hash: str, model: str, compute):
+        answer, embedding = await asyncio.to_thread(self._lookup, question, document_hash, model)
+        if answer is not None:
+            return answer
+        answer = await compute()
+        await asyncio.to_thread(self.set, question, document_hash, model, answer, embedding)
+        return answer
+
+    def get(self, question: str, document_hash: str, model: str):
+        """
+        Return the cached answer for a question.
+
+        Parameters:
+            question (str): User question.
+            document_hash (str): Hash of the document the question is about.
+            model (str): Name of the answering model.
+
+        Returns:
+            Cached answer, or None on a miss.
+        """
+        return self._lookup(question, document_hash, model)[0]
+
+    def set(self, question: str, document_hash: str, model: str, answer, embedding=None):
+        """
+        Store the answer to a question.
+
+        Parameters:
+            question (str): User question.
+            document_hash (str): Hash of the document the question is about.
+            model (str): Name of the answering model.
+            answer: JSON serialisable answer.
+            embedding: Embedding of the question (default computes it when semantic matching is enabled).
+        """
+        key = self.key(question, document_hash, model)
+        self.backend.set(key, answer, self.ttl)
+        if self.embed is None:
+            return
+        if embedding is None:
+            embedding = self._unit(self.embed(question))
+
+        if self.persist_index:
+            # Merge what other workers stored since the last load, so their questions are not overwritten
+            self._load_index(document_hash, model)
+        with self._lock:
+            keys, vectors = self._index.get((document_hash, model), ([], np.empty((0, len(embedding)), dtype=np.float32)))
+            if key in keys:
+                position = keys.index(key)
+                keys = keys[:position] + keys[position + 1:]
+                vectors = np.delete(vectors, position, axis=0)
+            keys = (keys + [key])[-self.max_semantic_entries:]
+            vectors = np.vstack([vectors, embedding[None, :]])[-self.max_semantic_entries:]
+            self._index[(document_hash, model)] = (keys, vectors)
+        if self.persist_index:
+            self._save_index(document_hash, model)
+
+    def stats(self) -> dict:
+        """
+        Report hit and miss counters.
+
+        Returns:
+            dict: Exact hits, semantic hits, misses, hit rate and requests that
+                waited for an identical request in flight.
+        """
+        total = self.hits_exact + self.hits_semantic + self.misses
+        return {
+            'hits_exact': self.hits_exact,
+            'hits_semantic': self.hits_semantic,
+            'misses': self.misses,
+            'hit_rate': (self.hits_exact + self.hits_semantic) / total if total else 0.0,
+            'coalesced': self.flights.coalesced,
+        }
+
+    def _lookup(self, question: str, document_hash: str, model: str):
+        """
+        Look a question up in both levels.
+
+        Parameters:
+            question (str): User question.
+            document_hash (str): Hash of the document the question is about.
+            model (str): Name of the answering model.
+
+        Returns:
+            tuple: (answer or None, question embedding or None) so a miss can
+                store the embedding without computing it twice.
+        """
+        answer = self.backend.get(self.key(question, document_hash, model))
+        if answer is not None:
+            with self._lock:
+                self.hits_exact += 1
+            return answer, None
+
+        embedding = None
+        if self.embed is not None:
+            embedding = self._unit(self.embed(question))
+            if self.persist_index:
+                with self._lock:
+                    stale = time.monotonic() - self._index_loaded.get((document_hash, model), -np.inf) > self.index_refresh
+                if stale:
+                    self._load_index(document_hash, model)
+            with self._lock:
+                keys, vectors = self._index.get((document_hash, model), ([], None))
+            if keys:
+                similarities = vectors @ embedding
+                expired = []
+                # Most similar first; a candidate whose answer expired or was evicted falls through to the next
+                for position in np.argsort(-similarities):
+                    if similarities[position] < self.similarity_threshold:
+                        break
+                    answer = self.backend.get(keys[position])
+                    if answer is not None:
+                        break
+                    expired.append(keys[position])
+                if expired:
+                    self._prune(document_hash, model, expired)
+                if answer is not None:
+                    with self._lock:
+                        self.hits_semantic += 1
+                    return answer, embedding
+
+        with self._lock:
+            self.misses += 1
+        return None, embedding
+
+    def _index_key(self, document_hash: str, model: str) -> str:
+        """
+        Compute the backend key of the similarity index of a document and model.
+
+        Parameters:
+            document_hash (str): Hash of the document.
+            model (str): Name of the answering model.
+
+        Returns:
+            str: Cache key.
+        """
+        return hashlib.sha256("\x1f".join(['semantic-index', document_hash, model]).encode('utf-8')).hexdigest()
+
+    def _load_index(self, document_hash: str, model: str):
+        """
+        Merge the similarity index stored in the backend into the in-memory one.
+
+        Stored questions come first; questions only known to this process are
+        kept after them, up to max_semantic_entries.
+
+        Parameters:
+            document_hash (str): Hash of the document.
+            model (str): Name of the answering model.
+        """
+        stored = self.backend.get(self._index_key(document_hash, model))
+        with self._lock:
+            self._index_loaded[(document_hash, model)] = time.monotonic()
+            if not stored or not stored['keys']:
+                return
+            stored_vectors = np.frombuffer(base64.b64decode(stored['vectors']), dtype=np.float32).reshape(len(stored['keys']), -1)
+            keys, vectors = self._index.get((document_hash, model), ([], stored_vectors[:0]))
+            stored_keys = set(stored['keys'])
+            local = [position for position, key in enumerate(keys) if key not in stored_keys]
+            merged_keys = (stored['keys'] + [keys[position] for position in local])[-self.max_semantic_entries:]
+            merged_vectors = np.vstack([stored_vectors, vectors[local]])[-self.max_semantic_entries:]
+            self._index[(document_hash, model)] = (merged_keys, merged_vectors)
+
+    def _save_index(self, document_hash: str, model: str):
+        """
+        Store the in-memory similarity index of a document and model in the backend.
+
+        Parameters:
+            document_hash (str): Hash of the document.
+            model (str): Name of the answering model.
+        """
+        with self._lock:
+            keys, vectors = self._index.get((document_hash, model), ([], None))
+        if vectors is None:
+            return
+        self.backend.set(self._index_key(document_hash, model), {
+            'keys': keys,
+            'vectors': base64.b64encode(np.ascontiguousarray(vectors, dtype=np.float32).tobytes()).decode('ascii'),
+        }, self.ttl)
+
+    def _prune(self, document_hash: str, model: str, expired: list):
+        """
+        Remove keys whose answers are no longer in the backend from the similarity index.
+
+        Parameters:
+            document_hash (str): Hash of the document the questions are about.
+            model (str): Name of the answering model.
+            expired (list): Keys to remove.
+        """
+        with self._lock:
+            entry = self._index.get((document_hash, model))
+            if entry is None:
+                return
+            keys, vectors = entry
+            keep = [position for position, key in enumerate(keys) if key not in expired]
+            self._index[(document_hash, model)] = ([keys[position] for position in keep], vectors[keep])
+        if self.persist_index:
+            self._save_index(document_hash, model)
+
+    def _unit(self, vector) -> np.ndarray:
+        """
+        Normalize an embedding to unit length.
+
+        Parameters:
+            vector: Embedding.
+
+        Returns:
+            np.ndarray: float32 unit vector.
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
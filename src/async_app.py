@@ -0,0 +1,146 @@
+import asyncio
+from quart import Quart, request, jsonify
+from streaming import astream_answer
+from documents import DocumentNotFound, DocumentNotReady, describe
+import tracing
+
+
+def create_async_app(pipelines, answer_cache, contract_path: str, eval_path: str, model_name: str,
+                     documents=None, ingestion=None, jobs=None, warmup=None) -> Quart:
+    """
+    Build the ASGI version of the question answering API.
+
+    The routes match app.py, but every handler is a coroutine: OpenAI calls are
+    awaited on one event loop, so a single process serves many concurrent
+    questions without holding a worker thread per request.
+
+    Parameters:
+        pipelines (PipelineRegistry): Registry of document pipelines.
+        answer_cache (AnswerCache): Cache of final answers.
+        contract_path (str): Path to the contract PDF.
+        eval_path (str): Path to the evaluation prompt.
+        model_name (str): Name of the answering model.
+        documents (DocumentRegistry): Uploaded documents, addressed with ?doc_id= (default only the contract).
+        ingestion (IngestionQueue): Background ingestion of uploads (default uploads are disabled).
+        jobs (JobQueue): Background jobs reported by /jobs/<job_id> (default none).
+        warmup (Warmup): Start-up steps run before /ready reports ready (default only the
+            contract's pipeline is built, and /ready is always ready).
+
+    Returns:
+        Quart: ASGI application, e.g. served with `hypercorn asgi:app`.
+    """
+    app = Quart(__name__)
+
+    def document_path():
+        # Questions without doc_id go to the bundled contract
+        doc_id = request.args.get('doc_id')
+        if not doc_id:
+            return contract_path
+        if documents is None:
+            raise DocumentNotFound(doc_id)
+        return documents.route(doc_id, request.headers.get('X-Tenant-ID'))['path']
+
+    def routing_error(e):
+        if isinstance(e, DocumentNotReady):
+            return jsonify({'error': str(e), **describe(e.record)}), 409
+        return jsonify({'error': f"Unknown document: {e.args[0]}"}), 404
+
+    async def get_pipeline():
+        # A cold lookup parses the document and loads models, so it stays off the event loop
+        return await asyncio.to_thread(pipelines.get, document_path(), eval_path, model_name)
+
+    @app.before_serving
+    async def warm():
+        if warmup is not None:
+            warmup.start()
+        else:
+            pipelines.warm(contract_path, eval_path, model_name)
+        if ingestion is not None:
+            await asyncio.to_thread(ingestion.resume)
+
+    @app.route('/upload_pdf', methods=['POST'])
+    async def upload_pdf():
+        if documents is None or ingestion is None:
+            return "Uploads are not enabled", 404
+        files = await request.files
+        if 'file' not in files:
+            return "No file part in the request", 400
+        file = files['file']
+        if file.filename == '' or not file.filename.endswith('.pdf'):
+            return "Invalid file", 400
+
+        record, created = await asyncio.to_thread(documents.register, file.filename, file.read(), request.headers.get('X-Tenant-ID'))
+        if created:
+            await asyncio.to_thread(ingestion.submit, record['doc_id'])
+        record = documents.get(record['doc_id'], record['tenant'])
+        return jsonify(describe(record)), 202 if created else 200
+
+    @app.route('/documents/<doc_id>', methods=['GET'])
+    async def document_status(doc_id):
+        record = documents.get(doc_id, request.headers.get('X-Tenant-ID')) if documents is not None else None
+        if record is None:
+            return jsonify({'error': f"Unknown document: {doc_id}"}), 404
+        return jsonify(describe(record))
+
+    @app.route('/jobs/<job_id>', methods=['GET'])
+    async def job_status(job_id):
+        job = await asyncio.to_thread(jobs.get, job_id, request.headers.get('X-Tenant-ID')) if jobs is not None else None
+        if job is None:
+            return jsonify({'error': f"Unknown job: {job_id}"}), 404
+        return jsonify(job)
+
+    @app.route('/process_text', methods=['GET'])
+    async def process_text():
+        try:
+            input_text = request.args.get('text', '')
+            pipeline = await get_pipeline()
+
+            async def answer_question():
+                context = await pipeline.retriever.aretrieve_query(input_text)
+                return await pipeline.generation.agenerate_answer(context=context, question=input_text)
+
+            with tracing.trace('process_text') as request_trace:
+                answer = await answer_cache.aget_or_compute(input_text, pipeline.retriever.document.key, model_name, answer_question)
+            await asyncio.to_thread(tracing.save_trace, request_trace)
+
+            result = {'result': answer}
+            if request.args.get('trace') == '1':
+                result['trace'] = request_trace.to_dict()
+            return jsonify(result)
+
+        except (DocumentNotFound, DocumentNotReady) as e:
+            return routing_error(e)
+
+        except Exception as e:
+            error_message = f"An error occurred: {str(e)}"
+            return jsonify({'error': error_message})
+
+    @app.route('/process_text/stream', methods=['GET'])
+    async def process_text_stream():
+        input_text = request.args.get('text', '')
+        try:
+            pipeline = await get_pipeline()
+        except (DocumentNotFound, DocumentNotReady) as e:
+            return routing_error(e)
+        events = astream_answer(pipeline.retriever, pipeline.generation, input_text)
+        response = app.response_class(events, mimetype='text/event-stream',
+                                      headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        response.timeout = None
+        return response
+
+    @app.route('/pipeline_stats', methods=['GET'])
+    async def pipeline_stats():
+        return jsonify({**pipelines.stats(), 'answer_cache': answer_cache.stats()})
+
+    @app.route('/ready', methods=['GET'])
+    async def ready():
+        if warmup is None:
+            return jsonify({'ready': True, 'steps': {}})
+        status = warmup.status()
+        return jsonify(status), 200 if status['ready'] else 503
+
+    @app.route('/metrics', methods=['GET'])
+    async def metrics():
+        return tracing.metrics.render(), 200, {'Content-Type': tracing.CONTENT_TYPE}
+
+    return app
@@ -0,0 +1,226 @@
+import functools
+import re
+import numpy as np
+
+DEFAULT_TOKENIZER = 'sentence-transformers/all-mpnet-base-v2'
+
+# Boundary levels: a chunk never spans a level 1 boundary; lower levels are preferred split points
+SECTION, SUBSECTION, CLAUSE, PARAGRAPH = 1, 2, 3, 4
+
+_ARTICLE = re.compile(r"(?:ARTICLE|Article|SECTION|Section)\s+(?P<number>[0-9]+(?:\.[0-9]+)*|[IVXLC]+)\b[.:]?\s*(?P<title>[^\n]*)")
+# "7." or "2.1"; a bare "30" is mostly a wrapped line starting with an amount
+_NUMBERED = re.compile(r"(?P<number>[0-9]+(?:\.[0-9]+)+|[0-9]+(?=\.))\.?\s+(?P<title>[A-Z][^\n]*)")
+_HEADING = re.compile(r"[A-Z][A-Z0-9 ,;&'\-]{3,}")
+_ITEM = re.compile(r"\((?:[a-z]{1,3}|[0-9]{1,2})\)\s+\S")
+_DEFINITION = re.compile(r"[\"“](?P<term>[A-Z][^\"”\n]{0,80})[\"”]\s+(?:shall\s+)?(?:mean|means|has the meaning|shall have the meaning)")
+_LINE = re.compile(r"[^\n]*(?:\n|$)")
+_SENTENCE_END = ('.', ':', '!', '?')
+
+
+class HuggingFaceOffsets:
+    """Character offsets of every token of a text from a Hugging Face fast tokenizer."""
+
+    def __init__(self, model_name: str = DEFAULT_TOKENIZER):
+        """
+        Initialize the HuggingFaceOffsets instance; the tokenizer is loaded on first use.
+
+        Parameters:
+            model_name (str): Tokenizer of the embedding model, so chunk sizes match its limit.
+        """
+        self.model_name = model_name
+
+    @functools.cached_property
+    def tokenizer(self):
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(self.model_name, use_fast=True)
+
+    def __call__(self, text: str) -> np.ndarray:
+        """
+        Tokenize text once.
+
+        Parameters:
+            text (str): Document text.
+
+        Returns:
+            np.ndarray: (tokens, 2) array of start and end character offsets.
+        """
+        encoding = self.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+        return np.asarray(encoding['offset_mapping'], dtype=np.int64).reshape(-1, 2)
+
+
+class StructureChunker:
+    """Single-pass chunker that splits a contract on its structure.
+
+    The document is tokenized once. Every later decision uses the arrays of
+    token start and end offsets, so token counts of any character range are
+    two binary searches. Units start at article and section headings,
+    numbered subsections, list items, definitions and paragraphs. They are
+    packed into chunks of at most max_tokens, and a chunk never crosses a
+    section heading. A unit that is too long on its own is cut into token
+    windows that overlap by overlap_tokens.
+    """
+
+    def __init__(self, max_tokens: int = 256, overlap_tokens: int = 32, tokenizer=None):
+        """
+        Initialize the StructureChunker instance.
+
+        Parameters:
+            max_tokens (int): Tokens per chunk at most.
+            overlap_tokens (int): Tokens repeated between the windows of an oversized unit.
+            tokenizer (callable): Called as tokenizer(text); returns a (tokens, 2) array of
+                character offsets (default HuggingFaceOffsets of DEFAULT_TOKENIZER).
+        """
+        if overlap_tokens >= max_tokens:
+            raise ValueError(f"overlap_tokens {overlap_tokens} must be below max_tokens {max_tokens}")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.tokenizer = tokenizer if tokenizer is not None else HuggingFaceOffsets()
+
+    def chunk(self, pages: list) -> list:
+        """
+        Split the pages of a document into chunks.
+
+        Parameters:
+            pages (list): Page texts; a form feed inside a page also starts a new page.
+
+        Returns:
+            list: Chunks as dicts with text, start and end (character offsets in the pages
+                joined by blank lines), tokens, page (1-based), section, heading and defines
+                (terms defined in the chunk).
+        """
+        text = "\n\n".join(pages)
+        page_starts = self._page_starts(pages, text)
+        offsets = self.tokenizer(text)
+        token_starts, token_ends = offsets[:, 0], offsets[:, 1]
+
+        chunks = []
+        for unit_start, unit_end, section, heading in self._pack(self._units(text), token_starts, token_ends):
+            first, last = np.searchsorted(token_ends, unit_start, side='right'), np.searchsorted(token_starts, unit_end, side='left')
+            for start, end in self._windows(unit_start, unit_end, first, last, token_starts, token_ends):
+                raw = text[start:end]
+                chunk_text = raw.strip()
+                if not chunk_text:
+                    continue
+                start += len(raw) - len(raw.lstrip())
+                chunks.append({
+                    'text': chunk_text,
+                    'start': int(start),
+                    'end': int(start + len(chunk_text)),
+                    'tokens': int(np.searchsorted(token_starts, start + len(chunk_text), side='left') - np.searchsorted(token_ends, start, side='right')),
+                    'page': int(np.searchsorted(page_starts, start, side='right')) + 1,
+                    'section': section,
+                    'heading': heading,
+                    'defines': [match.group('term') for match in _DEFINITION.finditer(chunk_text)],
+                })
+        return chunks
+
+    def _units(self, text: str) -> list:
+        """
+        Split text at structural boundaries.
+
+        Returns:
+            list: (start, end, level, section number, heading) per unit; section and
+                heading are those of the enclosing section.
+        """
+        boundaries = [(0, PARAGRAPH, None, None)]
+        blank, at_break = False, True
+        for match in _LINE.finditer(text):
+            line = match.group().strip()
+            start = match.start() + (len(match.group()) - len(match.group().lstrip()))
+            if not line:
+                blank = True
+                if match.end() == len(text):
+                    break
+                continue
+            level, number, title = self._classify(line, blank, blank or at_break)
+            if level is not None:
+                boundaries.append((start, level, number, title))
+            blank = False
+            # PDF text is hard-wrapped: the next line continues this one unless it ended a sentence or a heading
+            at_break = line.endswith(_SENTENCE_END) or level == SECTION
+
+        units, section, heading = [], None, None
+        for (start, level, number, title), following in zip(boundaries, boundaries[1:] + [(len(text),)]):
+            if level == SECTION:
+                section, heading = number, title
+            elif level == SUBSECTION:
+                section, heading = number, title or heading
+            if start < following[0]:
+                units.append((start, following[0], level, section, heading))
+        return units
+
+    def _classify(self, line: str, after_blank: bool, at_break: bool) -> tuple:
+        """
+        Return (level, section number, heading) of a line that starts a unit, or (None, None, None).
+
+        Numbered headings are only accepted at_break: at the start, after a blank
+        line, a sentence or a heading, never on a wrapped line inside a paragraph.
+        """
+        match = _ARTICLE.match(line)
+        if match:
+            return SECTION, match.group('number'), match.group('title').strip() or None
+        match = _NUMBERED.match(line) if at_break else None
+        if match:
+            number = match.group('number')
+            # "1." is an article; "2.1" a subsection
+            level = SECTION if '.' not in number else SUBSECTION
+            return level, number, match.group('title').split('.')[0].strip()[:80]
+        if _HEADING.fullmatch(line) and len(line) <= 80:
+            return SECTION, None, line.title()
+        if _ITEM.match(line) or _DEFINITION.match(line):
+            return CLAUSE, None, None
+        if after_blank:
+            return PARAGRAPH, None, None
+        return None, None, None
+
+    def _pack(self, units: list, token_starts: np.ndarray, token_ends: np.ndarray):
+        """
+        Merge consecutive units into spans of at most max_tokens within one section.
+
+        Yields:
+            tuple: (start, end, section, heading) of every span.
+        """
+        span = None
+        for start, end, level, section, heading in units:
+            tokens = int(np.searchsorted(token_starts, end, side='left') - np.searchsorted(token_ends, start, side='right'))
+            if span is not None and level > SECTION and span[3] + tokens <= self.max_tokens:
+                span[1], span[3] = end, span[3] + tokens
+                continue
+            if span is not None:
+                yield span[0], span[1], span[4], span[5]
+            span = [start, end, level, tokens, section, heading]
+        if span is not None:
+            yield span[0], span[1], span[4], span[5]
+
+    def _windows(self, start: int, end: int, first: int, last: int, token_starts: np.ndarray, token_ends: np.ndarray):
+        """
+        Cut a span into overlapping windows of max_tokens tokens.
+
+        Parameters:
+            start (int): Character offset of the span.
+            end (int): Character end of the span.
+            first (int): Index of the first token in the span.
+            last (int): Index after the last token in the span.
+
+        Yields:
+            tuple: (start, end) character offsets of every window.
+        """
+        if last - first <= self.max_tokens:
+            yield start, end
+            return
+        step = self.max_tokens - self.overlap_tokens
+        for window in range(first, last, step):
+            window_end = min(window + self.max_tokens, last)
+            yield (start if window == first else int(token_starts[window])), (end if window_end == last else int(token_ends[window_end - 1]))
+            if window_end == last:
+                break
+
+    def _page_starts(self, pages: list, text: str) -> np.ndarray:
+        """Character offset at which every page after the first starts, including form feeds."""
+        starts, position = [], 0
+        for index, page in enumerate(pages):
+            if index:
+                starts.append(position)
+            starts.extend(position + match.end() for match in re.finditer('\f', page))
+            position += len(page) + 2
+        return np.asarray(starts, dtype=np.int64)
@@ -0,0 +1,174 @@
+import asyncio
+import contextlib
+import os
+import threading
+
+DEFAULT_TIMEOUT = float(os.environ.get("OPENAI_TIMEOUT", 60.0))
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get("OPENAI_CONNECT_TIMEOUT", 5.0))
+DEFAULT_MAX_RETRIES = int(os.environ.get("OPENAI_MAX_RETRIES", 3))
+DEFAULT_MAX_CONNECTIONS = int(os.environ.get("OPENAI_MAX_CONNECTIONS", 256))
+POOL_SHARD_SIZE = 16
+
+_lock = threading.Lock()
+_clients = {}
+_async_pools = {}
+
+
+def _timeout(timeout: float = None) -> 'httpx.Timeout':
+    """
+    Build the request timeout of the shared clients.
+
+    Parameters:
+        timeout (float): Total seconds per request (default OPENAI_TIMEOUT).
+
+    Returns:
+        httpx.Timeout: Timeout with a short connect phase.
+    """
+    import httpx
+    return httpx.Timeout(DEFAULT_TIMEOUT if timeout is None else timeout, connect=DEFAULT_CONNECT_TIMEOUT)
+
+
+def openai_client(api_key: str = None, base_url: str = None, timeout: float = None, max_retries: int = None,
+                  max_connections: int = DEFAULT_MAX_CONNECTIONS) -> 'OpenAI':
+    """
+    Return the process-wide OpenAI client for a configuration.
+
+    All callers share one keep-alive connection pool, so requests after the first
+    skip the TCP and TLS handshakes. Failed requests (connection errors, 408, 409,
+    429 and 5xx) are retried by the SDK with exponential backoff and jitter,
+    honouring Retry-After.
+
+    Parameters:
+        api_key (str): API key (default OPENAI_API_KEY).
+        base_url (str): API base URL (default OPENAI_BASE_URL or the public API).
+        timeout (float): Seconds per request (default OPENAI_TIMEOUT).
+        max_retries (int): Retries per request (default OPENAI_MAX_RETRIES).
+        max_connections (int): Size of the connection pool.
+
+    Returns:
+        OpenAI: Shared client.
+    """
+    api_key = api_key if api_key is not None else os.environ["OPENAI_API_KEY"]
+    max_retries = DEFAULT_MAX_RETRIES if max_retries is None else max_retries
+    key = (api_key, base_url, timeout, max_retries, max_connections)
+    with _lock:
+        client = _clients.get(key)
+        if client is None or client.is_closed():
+            # httpx and openai are imported with the first client, not with this module
+            import httpx
+            from openai import OpenAI
+            limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            client = _clients[key] = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=max_retries,
+                timeout=_timeout(timeout),
+                http_client=httpx.Client(limits=limits, timeout=_timeout(timeout)),
+            )
+        return client
+
+
+def async_openai_pool(client: 'OpenAI', max_connections: int = DEFAULT_MAX_CONNECTIONS) -> 'AsyncOpenAIPool':
+    """
+    Return the process-wide async pool matching a sync client's key, URL, timeout and retries.
+
+    Parameters:
+        client (OpenAI): Sync client whose settings the async clients copy.
+        max_connections (int): OpenAI calls in flight per event loop.
+
+    Returns:
+        AsyncOpenAIPool: Shared pool.
+    """
+    key = (client.api_key, str(client.base_url), repr(client.timeout), client.max_retries, max_connections)
+    with _lock:
+        pool = _async_pools.get(key)
+        if pool is None:
+            pool = _async_pools[key] = AsyncOpenAIPool(client.api_key, str(client.base_url), client.timeout, client.max_retries, max_connections)
+        return pool
+
+
+class AsyncOpenAIPool:
+    """AsyncOpenAI clients sharing max_connections keep-alive connections per event loop.
+
+    Connections are split over clients of at most POOL_SHARD_SIZE connections,
+    added as load grows: httpx rescans its whole pool on every request state
+    change, which turns CPU bound with one large pool under high concurrency.
+    Calls wait for a slot before reaching a client, so no pool queues.
+    """
+
+    def __init__(self, api_key: str, base_url: str, timeout, max_retries: int, max_connections: int = DEFAULT_MAX_CONNECTIONS):
+        """
+        Initialize the AsyncOpenAIPool instance.
+
+        Parameters:
+            api_key (str): API key.
+            base_url (str): API base URL.
+            timeout: Request timeout (float or httpx.Timeout).
+            max_retries (int): Retries per request, with exponential backoff.
+            max_connections (int): OpenAI calls in flight per event loop.
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        self._loops = {}
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """
+        Wait for a free connection and yield the least busy client of the running loop.
+
+        Yields:
+            AsyncOpenAI: Client with a free pooled connection.
+        """
+        clients, in_flight, slots = self._state()
+        async with slots:
+            shard = min(range(len(clients)), key=in_flight.__getitem__)
+            if in_flight[shard] >= POOL_SHARD_SIZE:
+                self._add_client(clients, in_flight)
+                shard = len(clients) - 1
+            in_flight[shard] += 1
+            try:
+                yield clients[shard]
+            finally:
+                in_flight[shard] -= 1
+
+    def _state(self) -> tuple:
+        """
+        Return the clients, their in-flight counts and the request slots of the running loop.
+
+        Connections belong to the loop that opened them, so state is kept per loop.
+
+        Returns:
+            tuple: (list of AsyncOpenAI, list of in-flight counts, asyncio.Semaphore).
+        """
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None:
+            for closed in [other for other in self._loops if other.is_closed()]:
+                del self._loops[closed]
+            state = self._loops[loop] = ([], [], asyncio.Semaphore(self.max_connections))
+            self._add_client(state[0], state[1])
+        return state
+
+    def _add_client(self, clients: list, in_flight: list):
+        """
+        Add a pool shard.
+
+        Parameters:
+            clients (list): Clients of the running loop.
+            in_flight (list): In-flight count of every client.
+        """
+        import httpx
+        from openai import AsyncOpenAI
+        size = min(POOL_SHARD_SIZE, self.max_connections - POOL_SHARD_SIZE * len(clients))
+        limits = httpx.Limits(max_connections=size, max_keepalive_connections=size)
+        clients.append(AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            max_retries=self.max_retries,
+            timeout=self.timeout,
+            http_client=httpx.AsyncClient(limits=limits, timeout=self.timeout),
+        ))
+        in_flight.append(0)
@@ -0,0 +1,184 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from tracing import propagate
+
+
+def enough_true(results: list, resolved: list, stop_after: int) -> bool:
+    """
+    Check whether the resolved ranked prefix already holds stop_after 'true' results.
+
+    Parameters:
+        results (list): Classifications so far.
+        resolved (list): Whether each classification is final.
+        stop_after (int): Required number of 'true' results.
+
+    Returns:
+        bool: True when the remaining checks cannot change the output.
+    """
+    count = 0
+    for result, is_resolved in zip(results, resolved):
+        if not is_resolved:
+            return False
+        if result == 'true':
+            count += 1
+            if count >= stop_after:
+                return True
+    return False
+
+
+class ConcurrentEvaluator:
+    """Run sufficiency checks for one query concurrently on a bounded thread pool."""
+
+    def __init__(self, evaluate, max_concurrency: int = 6, timeout: float = 15.0):
+        """
+        Initialize the ConcurrentEvaluator instance.
+
+        Parameters:
+            evaluate (callable): Called as evaluate(query, passage) and must return
+                'true' or 'false'.
+            max_concurrency (int): Maximum number of checks in flight.
+            timeout (float): Seconds a single check may run before it counts as 'false'.
+        """
+        self.evaluate = evaluate
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    def classify(self, query: str, passages: list, stop_after: int = None) -> list:
+        """
+        Classify passages for a query.
+
+        Results are aligned with the input, so the ranked order is kept no matter
+        which call finishes first. With stop_after, remaining checks are cancelled
+        as soon as the first stop_after 'true' passages in ranked order are known.
+
+        Parameters:
+            query (str): User question.
+            passages (list): Passage texts, best ranked first.
+            stop_after (int): Number of 'true' passages after which to stop (default evaluate all).
+
+        Returns:
+            list: 'true' or 'false' per passage, or None for checks skipped by stop_after.
+        """
+        results = [None] * len(passages)
+        if not passages:
+            return results
+
+        started = {}
+        lock = threading.Lock()
+
+        def run(index):
+            with lock:
+                started[index] = time.monotonic()
+            return self.evaluate(query, passages[index])
+
+        run = propagate(run)
+        futures = {self._executor.submit(run, index): index for index in range(len(passages))}
+        pending = set(futures)
+        resolved = [False] * len(passages)
+
+        while pending:
+            done, pending = wait(pending, timeout=self._poll_interval(started, lock), return_when=FIRST_COMPLETED)
+            for future in done:
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception:
+                    results[index] = 'false'
+                resolved[index] = True
+                with lock:
+                    started.pop(index, None)
+
+            now = time.monotonic()
+            with lock:
+                expired = {future for future in pending if futures[future] in started and now - started[futures[future]] >= self.timeout}
+            for future in expired:
+                results[futures[future]] = 'false'
+                resolved[futures[future]] = True
+                with lock:
+                    started.pop(futures[future], None)
+            pending -= expired
+
+            if stop_after is not None and enough_true(results, resolved, stop_after):
+                for future in pending:
+                    future.cancel()
+                break
+
+        return results
+
+    def _poll_interval(self, started: dict, lock: threading.Lock) -> float:
+        """
+        Return how long to wait before the next running check can time out.
+
+        Parameters:
+            started (dict): Start time of every running check.
+            lock (threading.Lock): Lock guarding started.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        with lock:
+            if not started:
+                return min(self.timeout, 0.05)
+            oldest = min(started.values())
+        return max(0.01, oldest + self.timeout - time.monotonic())
+
+
+class AsyncConcurrentEvaluator:
+    """Run async sufficiency checks for one query concurrently on the event loop."""
+
+    def __init__(self, evaluate, max_concurrency: int = 6, timeout: float = 15.0):
+        """
+        Initialize the AsyncConcurrentEvaluator instance.
+
+        Parameters:
+            evaluate (callable): Coroutine function called as evaluate(query, passage)
+                that must return 'true' or 'false'.
+            max_concurrency (int): Maximum number of checks in flight per query.
+            timeout (float): Seconds a single check may run before it counts as 'false'.
+        """
+        self.evaluate = evaluate
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+
+    async def classify(self, query: str, passages: list, stop_after: int = None) -> list:
+        """
+        Classify passages for a query; same contract as ConcurrentEvaluator.classify.
+
+        Parameters:
+            query (str): User question.
+            passages (list): Passage texts, best ranked first.
+            stop_after (int): Number of 'true' passages after which to stop (default evaluate all).
+
+        Returns:
+            list: 'true' or 'false' per passage, or None for checks skipped by stop_after.
+        """
+        results = [None] * len(passages)
+        if not passages:
+            return results
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(index):
+            async with semaphore:
+                try:
+                    return index, await asyncio.wait_for(self.evaluate(query, passages[index]), self.timeout)
+                except Exception:
+                    return index, 'false'
+
+        tasks = [asyncio.ensure_future(run(index)) for index in range(len(passages))]
+        resolved = [False] * len(passages)
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, result = await next_done
+                results[index] = result
+                resolved[index] = True
+                if stop_after is not None and enough_true(results, resolved, stop_after):
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+        return results
+
@@ -0,0 +1,253 @@
+import functools
+import re
+import zlib
+import numpy as np
+import tracing
+
+SEPARATOR = "\n\n"
+DEFAULT_MAX_TOKENS = 1500
+
+# Universal hashing modulo a Mersenne prime; a * x stays below 2**62, so uint64 never overflows
+_PRIME = (1 << 31) - 1
+_WORD = re.compile(r"\w+")
+_SPACE = re.compile(r"\s+")
+
+
+class MinHasher:
+    """MinHash signatures of word shingles, estimating the Jaccard similarity of two passages."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        """
+        Initialize the MinHasher instance.
+
+        Parameters:
+            num_perm (int): Hash functions per signature; more are slower but more precise.
+            shingle_size (int): Words per shingle.
+            seed (int): Seed of the hash functions, so signatures are reproducible.
+        """
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, _PRIME, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, _PRIME, size=num_perm).astype(np.uint64)
+        self.shingle_size = shingle_size
+
+    def shingles(self, text: str) -> set:
+        """
+        Return the word shingles of a text; texts shorter than a shingle are one shingle.
+
+        Parameters:
+            text (str): Passage text.
+
+        Returns:
+            set: Space joined, lower-cased runs of shingle_size words.
+        """
+        words = _WORD.findall(text.lower())
+        if len(words) <= self.shingle_size:
+            return {' '.join(words)}
+        return {' '.join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Compute the MinHash signature of a text.
+
+        Parameters:
+            text (str): Passage text.
+
+        Returns:
+            np.ndarray: Minimum hash per hash function.
+        """
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) % _PRIME for shingle in self.shingles(text)), dtype=np.uint64)
+        return ((np.outer(hashes, self.a) + self.b) % _PRIME).min(axis=0)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return float(np.mean(first == second))
+
+
+class ContextAssembler:
+    """Turn retrieved passages into the context of the answer prompt.
+
+    Passages are normalized, near-duplicates (and passages contained in a
+    better ranked one) are dropped, chunks that overlap or follow each other
+    in the document are merged, and the best ranked passages are packed into
+    a token budget counted with the answering model's tokenizer.
+    """
+
+    def __init__(self, model_name: str = 'gpt-3.5-turbo', max_tokens: int = DEFAULT_MAX_TOKENS, similarity_threshold: float = 0.8,
+                 min_overlap: int = 20, tokenizer=None, hasher: MinHasher = None):
+        """
+        Initialize the ContextAssembler instance.
+
+        Parameters:
+            model_name (str): Model whose tokenizer counts the budget.
+            max_tokens (int): Token budget of the context.
+            similarity_threshold (float): Estimated Jaccard similarity above which a lower
+                ranked passage is a duplicate.
+            min_overlap (int): Characters one chunk's end must share with the next chunk's
+                start to be merged with it.
+            tokenizer: Object with encode(text) and decode(tokens) (default the tiktoken
+                encoding of model_name, loaded on first use).
+            hasher (MinHasher): Signatures used for near-duplicate detection.
+        """
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        self.similarity_threshold = similarity_threshold
+        self.min_overlap = min_overlap
+        self._tokenizer = tokenizer
+        self.hasher = hasher if hasher is not None else MinHasher()
+
+    @functools.cached_property
+    def tokenizer(self):
+        if self._tokenizer is not None:
+            return self._tokenizer
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(self.model_name)
+        except KeyError:
+            return tiktoken.get_encoding('cl100k_base')
+
+    def count_tokens(self, text: str) -> int:
+        """Number of tokens of text for the answering model."""
+        return len(self.tokenizer.encode(text))
+
+    def assemble(self, context) -> list:
+        """
+        Select the passages sent to the answering model.
+
+        Parameters:
+            context (list): Output of Retriever.retrieve_query, best ranked first: strings,
+                LangChain documents, or one-item lists of either.
+
+        Returns:
+            list: Passage texts, best ranked first, within max_tokens when joined with SEPARATOR.
+        """
+        with tracing.span('context_assembly') as stage:
+            passages = self.normalize(context)
+            unique = self.deduplicate(passages)
+            merged = self.merge_adjacent(unique)
+            packed, tokens = self.pack(merged)
+            stage.set(passages_in=len(passages), duplicates=len(passages) - len(unique), merged=len(unique) - len(merged),
+                      passages=len(packed), dropped=len(merged) - len(packed), tokens=tokens)
+        return packed
+
+    def normalize(self, context) -> list:
+        """
+        Flatten retrieved context and collapse whitespace.
+
+        Parameters:
+            context (list): Retrieved passages, best ranked first.
+
+        Returns:
+            list: Passages as dicts with text, source and the first and last chunk position
+                (None unless the passage is a document with 'source' and 'chunk' metadata).
+        """
+        passages = []
+        for item in context:
+            for passage in (item if isinstance(item, list) else [item]):
+                text = _SPACE.sub(' ', getattr(passage, 'page_content', passage)).strip()
+                if not text:
+                    continue
+                metadata = getattr(passage, 'metadata', None) or {}
+                chunk = metadata.get('chunk')
+                passages.append({'text': text, 'source': metadata.get('source'), 'first': chunk, 'last': chunk})
+        return passages
+
+    def deduplicate(self, passages: list) -> list:
+        """
+        Drop passages that repeat or are contained in a better ranked passage.
+
+        Parameters:
+            passages (list): Normalized passages, best ranked first.
+
+        Returns:
+            list: The kept passages in the same order.
+        """
+        kept, signatures = [], []
+        for passage in passages:
+            if any(passage['text'] in other['text'] for other in kept):
+                continue
+            signature = self.hasher.signature(passage['text'])
+            if any(self.hasher.similarity(signature, other) >= self.similarity_threshold for other in signatures):
+                continue
+            kept.append(passage)
+            signatures.append(signature)
+        return kept
+
+    def merge_adjacent(self, passages: list) -> list:
+        """
+        Merge chunks that overlap or are consecutive chunks of the same source.
+
+        The merged passage takes the rank of the better ranked chunk.
+
+        Parameters:
+            passages (list): Deduplicated passages, best ranked first.
+
+        Returns:
+            list: Passages with every mergeable pair joined.
+        """
+        passages = [dict(passage) for passage in passages]
+        merged = True
+        while merged:
+            merged = False
+            for i, first in enumerate(passages):
+                for j in range(i + 1, len(passages)):
+                    joined = self._join(first, passages[j]) or self._join(passages[j], first)
+                    if joined is not None:
+                        passages[i] = joined
+                        del passages[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        return passages
+
+    def pack(self, passages: list) -> tuple:
+        """
+        Keep the best ranked passages that fit the token budget.
+
+        A passage that does not fit is skipped, so a shorter lower ranked one may
+        still be used. If not even the best passage fits it is truncated.
+
+        Parameters:
+            passages (list): Merged passages, best ranked first.
+
+        Returns:
+            tuple: (passage texts, tokens of the joined context).
+        """
+        separator = self.count_tokens(SEPARATOR)
+        packed, used = [], 0
+        for passage in passages:
+            cost = self.count_tokens(passage['text']) + (separator if packed else 0)
+            if used + cost <= self.max_tokens:
+                packed.append(passage['text'])
+                used += cost
+        if not packed and passages:
+            tokens = self.tokenizer.encode(passages[0]['text'])[:self.max_tokens]
+            packed, used = [self.tokenizer.decode(tokens)], len(tokens)
+        return packed, used
+
+    def _join(self, first: dict, second: dict):
+        """Return first followed by second if they overlap or are consecutive chunks, else None."""
+        if first['source'] is not None and first['source'] == second['source'] and first['last'] is not None \
+                and second['first'] == first['last'] + 1:
+            overlap = self._overlap(first['text'], second['text'])
+            return {**first, 'text': first['text'] + (second['text'][overlap:] if overlap else ' ' + second['text']), 'last': second['last']}
+        overlap = self._overlap(first['text'], second['text'])
+        if overlap >= self.min_overlap:
+            last = second['last'] if first['source'] == second['source'] else first['last']
+            return {**first, 'text': first['text'] + second['text'][overlap:], 'last': last}
+        return None
+
+    def _overlap(self, first: str, second: str) -> int:
+        """Length of the longest suffix of first that is a prefix of second, at least min_overlap long."""
+        if len(first) < self.min_overlap or len(second) < self.min_overlap:
+            return 0
+        probe = second[:self.min_overlap]
+        start = max(0, len(first) - len(second))
+        while True:
+            start = first.find(probe, start)
+            if start == -1:
+                return 0
+            if second.startswith(first[start:]):
+                return len(first) - start
+            start += 1
@@ -1,30 +1,44 @@
 import os
-from langchain_community.vectorstores import Weaviate
 from typing import Dict
+from ingestion import IngestionPipeline, index_name, CHUNK_PROPERTIES
+from embedding_store import EmbeddingStore, DEFAULT_STORE_DIR, open_store
+from vector_index import LocalVectorIndex, DEFAULT_INDEX_DIR
 
 class Database:
     
-    def __init__(self, weaviate_client, embeddings, file_path):
+    def __init__(self, weaviate_client, embeddings, file_path, backend: str = 'weaviate', index_dir: str = DEFAULT_INDEX_DIR,
+                 class_name: str = None):
         """
         Initializes the Database instance.
 
         Parameters:
-            weaviate_client: Weaviate client instance.
-            embeddings: Embeddings used for the Weaviate instance.
+            weaviate_client: Weaviate client instance (unused by the local backend).
+            embeddings: Embeddings used for the vector store.
             file_path: Path to the file being processed.
+            backend (str): 'weaviate' for the hosted index or 'local' for an
+                in-process LocalVectorIndex persisted under index_dir.
+            index_dir (str): Root directory of local indexes.
+            class_name (str): Index (Weaviate class) name (default derived from the file name).
         """
-        file_name_without_extension, file_extension = os.path.splitext(os.path.basename(file_path))
-        file_name_without_extension = file_name_without_extension.replace('.', ' ')
-        new_file_name = file_name_without_extension.replace(' ', '')
-        
-        attributes = {
-            'client': weaviate_client,
-            'index_name': new_file_name,
-            'embedding': embeddings,
-            'text_key': 'text',
-            'by_text': False
-        }
-        self.new_weaviate_instance = Weaviate(**attributes)
+        new_file_name = class_name or index_name(file_path)
+
+        if backend == 'local':
+            self.vector_store = LocalVectorIndex(os.path.join(index_dir, new_file_name), embeddings)
+        elif backend == 'weaviate':
+            from langchain_community.vectorstores import Weaviate
+            attributes = {
+                'client': weaviate_client,
+                'index_name': new_file_name,
+                'embedding': embeddings,
+                'text_key': 'text',
+                'attributes': CHUNK_PROPERTIES,
+                'by_text': False
+            }
+            self.vector_store = Weaviate(**attributes)
+        else:
+            raise ValueError(f"Unknown vector backend: {backend}")
+        self.new_weaviate_instance = self.vector_store
+        self.backend = backend
         self.file_path = new_file_name
         self.weaviate_client = weaviate_client
         self.embedding = embeddings
@@ -50,32 +64,89 @@ class Database:
             ],
         }
         
-    def upload_to_weaviate(self, token_split_texts):
+    def upload_to_weaviate(self, token_split_texts, batch_size: int = 64, embedding_concurrency: int = 4, progress=None, metadatas: list = None):
         """
         Uploads tokenized text data to the Weaviate database.
 
+        The upload is incremental: vectors of unchanged chunks come from the local
+        embedding store, only new or changed chunks are upserted and chunks that
+        disappeared from the document are deleted. Writes use the Weaviate batch
+        API and the class is only created if it does not exist yet.
+
+        Parameters:
+            token_split_texts (list): A list of tokenized text data.
+            batch_size (int): Chunks per embedding request and Weaviate batch.
+            embedding_concurrency (int): Embedding requests in flight.
+            progress (callable): Called as progress(written, total) as new chunks are written.
+            metadatas (list): Properties stored with every chunk, e.g. page and section, so
+                searches can filter on them (default none).
+
+        Returns:
+            dict: Statistics of the upload.
+        """
+        model_name = getattr(self.embedding, 'model', type(self.embedding).__name__)
+        if self.backend == 'local':
+            return self.upload_to_local_index(token_split_texts, open_store(model_name), progress, metadatas)
+        pipeline = IngestionPipeline(
+            self.weaviate_client,
+            self.embedding,
+            batch_size=batch_size,
+            embedding_concurrency=embedding_concurrency,
+            embedding_store=open_store(model_name),
+            manifest_path=os.path.join(DEFAULT_STORE_DIR, 'manifest.json'),
+        )
+        return pipeline.sync(self.file_path, self.file_path, token_split_texts, progress, metadatas)
+
+    def upload_to_local_index(self, token_split_texts, embedding_store: EmbeddingStore, progress=None, metadatas: list = None) -> dict:
+        """
+        Brings the local index in line with the document's current chunks and saves it.
+
+        Like the Weaviate sync, chunks that disappeared are removed and every chunk
+        stores its position in the document. The index is rebuilt whenever the
+        chunks or their properties changed; vectors of unchanged chunks come from
+        the embedding store, so only new chunks are embedded.
+
         Parameters:
             token_split_texts (list): A list of tokenized text data.
+            embedding_store (EmbeddingStore): Store reused for already embedded chunks.
+            progress (callable): Called as progress(added, total) once the chunks are added.
+            metadatas (list): Properties stored with every chunk (default none).
+
+        Returns:
+            dict: Number of chunks added, sent to the embedding model, unchanged and deleted.
         """
-        file_name_without_extension, file_extension = os.path.splitext(os.path.basename(self.file_path))
-        file_name_without_extension = file_name_without_extension.replace('.', ' ')
-        new_file_name = file_name_without_extension.replace(' ', '')
-        self.weaviate_client.schema.create_class(self._default_schema(os.path.basename(new_file_name), "text"))
-        Weaviate.from_texts(texts=token_split_texts, client=self.weaviate_client, embedding=self.embedding, index_name=os.path.basename(new_file_name))
+        properties = {}
+        for text, extra in zip(token_split_texts, metadatas if metadatas is not None else [{}] * len(token_split_texts)):
+            properties.setdefault(text, extra)
+        texts = list(properties)
+        metadatas = [{'source': self.file_path, 'chunk': position, **properties[text]} for position, text in enumerate(texts)]
+
+        present = set(self.vector_store.texts)
+        added = [text for text in texts if text not in present]
+        deleted = len(present - properties.keys())
+        embedded = 0
+        if texts != self.vector_store.texts or metadatas != self.vector_store.metadatas:
+            vectors, embedded = embedding_store.embed(texts, self.embedding.embed_documents)
+            self.vector_store.clear()
+            self.vector_store.add_texts(texts, metadatas, vectors=vectors)
+            self.vector_store.save()
+        if progress is not None:
+            progress(len(added), len(added))
+        return {'chunks': len(added), 'embedded': embedded, 'unchanged': len(texts) - len(added), 'deleted': deleted}
 
     
     def retrieve(self, query: str, k: int = 5):
         """
-        Retrieves similar items from the Weaviate database.
+        Retrieves similar items from the vector store.
 
         Parameters:
             query (str): Query text for similarity search.
             k (int): Number of items to retrieve (default is 5).
 
         Returns:
-            dict: Similar items retrieved from the Weaviate database.
+            dict: Similar items retrieved from the vector store.
         """
-        return self.new_weaviate_instance.similarity_search(query=query, k=k)
+        return self.vector_store.similarity_search(query=query, k=k)
     
     def retriever(self):
-        return self.new_weaviate_instance.as_retriever()
+        return self.vector_store.as_retriever()
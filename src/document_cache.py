@@ -0,0 +1,324 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cache', 'documents')
+DEFAULT_LOADER_SETTINGS = {'loader': 'UnstructuredPDFLoader', 'mode': 'single'}
+
+
+def _settings_digest(settings: dict) -> str:
+    """
+    Hash a settings dictionary independently of key order.
+
+    Parameters:
+        settings (dict): JSON serialisable settings.
+
+    Returns:
+        str: Hex digest of the settings.
+    """
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class ParsedDocument:
+    """Memory-mapped view of one cached, parsed document.
+
+    Every section (pages, paragraphs, chunks) is stored as a single UTF-8 blob
+    plus an int64 array of byte offsets, so a section is read with two mmaps
+    and decoded lazily.
+    """
+
+    def __init__(self, path: str, key: str):
+        """
+        Initialize the ParsedDocument instance.
+
+        Parameters:
+            path (str): Directory of the cache entry.
+            key (str): Cache key of the entry.
+        """
+        self.path = path
+        self.key = key
+        self._sections = {}
+
+    @property
+    def pages(self) -> list:
+        """Text of every page returned by the loader."""
+        return self._section('pages')
+
+    @property
+    def paragraphs(self) -> list:
+        """Page text split on blank lines, as used for keyword matching."""
+        return self._section('paragraphs')
+
+    def chunks(self, chunk_settings: dict):
+        """
+        Return the cached chunks produced with the given splitter settings.
+
+        Parameters:
+            chunk_settings (dict): Settings of the text splitters.
+
+        Returns:
+            list | None: Cached chunks, or None if they were never stored.
+        """
+        return self._section('chunks-' + _settings_digest(chunk_settings)[:16])
+
+    def chunk_metadata(self, chunk_settings: dict):
+        """
+        Return the metadata stored with the chunks of the given settings.
+
+        Parameters:
+            chunk_settings (dict): Settings of the text splitters.
+
+        Returns:
+            list | None: One dict per chunk, or None if no metadata was stored.
+        """
+        section = self._section('chunks-' + _settings_digest(chunk_settings)[:16] + '-metadata')
+        return [json.loads(metadata) for metadata in section] if section is not None else None
+
+    def store_chunks(self, chunks: list, chunk_settings: dict, metadata: list = None):
+        """
+        Add chunks produced with the given splitter settings to the entry.
+
+        Parameters:
+            chunks (list): Chunk texts.
+            chunk_settings (dict): Settings of the text splitters.
+            metadata (list): JSON serialisable dict per chunk (default none).
+        """
+        name = 'chunks-' + _settings_digest(chunk_settings)[:16]
+        if metadata is not None:
+            # Written first: the chunks section marks the entry complete
+            write_section(self.path, name + '-metadata', [json.dumps(item) for item in metadata])
+        write_section(self.path, name, chunks)
+        self._sections[name] = list(chunks)
+
+    def _section(self, name: str):
+        """
+        Read a section from disk, caching the decoded list.
+
+        Parameters:
+            name (str): Section name.
+
+        Returns:
+            list | None: Section strings, or None if missing or incomplete.
+        """
+        if name in self._sections:
+            return self._sections[name]
+        section = read_section(self.path, name)
+        if section is not None:
+            self._sections[name] = section
+        return section
+
+
+def write_section(directory: str, name: str, texts: list):
+    """
+    Atomically write a list of strings as a blob and an offsets array.
+
+    Parameters:
+        directory (str): Directory of the cache entry.
+        name (str): Section name.
+        texts (list): Strings to store.
+    """
+    encoded = [text.encode('utf-8') for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(chunk) for chunk in encoded], dtype=np.int64)
+
+    blob_path = os.path.join(directory, name + '.bin')
+    offsets_path = os.path.join(directory, name + '.npy')
+    with open(blob_path + '.tmp', 'wb') as file:
+        file.write(b''.join(encoded))
+    with open(offsets_path + '.tmp', 'wb') as file:
+        np.save(file, offsets)
+    # The offsets are replaced last; readers check them against the blob size.
+    os.replace(blob_path + '.tmp', blob_path)
+    os.replace(offsets_path + '.tmp', offsets_path)
+
+
+def read_section(directory: str, name: str):
+    """
+    Read a list of strings written by write_section.
+
+    Parameters:
+        directory (str): Directory of the cache entry.
+        name (str): Section name.
+
+    Returns:
+        list | None: Stored strings, or None if missing or incomplete.
+    """
+    blob_path = os.path.join(directory, name + '.bin')
+    offsets_path = os.path.join(directory, name + '.npy')
+    if not (os.path.exists(blob_path) and os.path.exists(offsets_path)):
+        return None
+
+    offsets = np.load(offsets_path, mmap_mode='r')
+    size = os.path.getsize(blob_path)
+    if len(offsets) == 0 or int(offsets[-1]) != size:
+        return None
+    if size == 0:
+        return [''] * (len(offsets) - 1)
+
+    with open(blob_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as blob:
+        return [blob[int(offsets[i]):int(offsets[i + 1])].decode('utf-8') for i in range(len(offsets) - 1)]
+
+
+class DocumentCache:
+    """Persistent cache of parsed documents keyed by file content and loader settings."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize the DocumentCache instance.
+
+        Parameters:
+            cache_dir (str): Directory holding the cache entries.
+            max_bytes (int): Total size above which least recently used entries are evicted.
+        """
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._file_digests = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, file_path: str, settings: dict = None) -> str:
+        """
+        Compute the cache key of a file.
+
+        The content hash is remembered per (path, mtime, size), so an unchanged
+        file is not re-read; any modification produces a new key.
+
+        Parameters:
+            file_path (str): Path to the document.
+            settings (dict): Loader settings (default DEFAULT_LOADER_SETTINGS).
+
+        Returns:
+            str: Cache key.
+        """
+        settings = DEFAULT_LOADER_SETTINGS if settings is None else settings
+        stat = os.stat(file_path)
+        signature = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+
+        digest = self._file_digests.get(signature)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(file_path, 'rb') as file:
+                for block in iter(lambda: file.read(1024 * 1024), b''):
+                    sha.update(block)
+            digest = sha.hexdigest()
+            self._file_digests[signature] = digest
+
+        return hashlib.sha256((digest + _settings_digest(settings)).encode('utf-8')).hexdigest()
+
+    def get(self, file_path: str, settings: dict = None):
+        """
+        Return the cached parse of a file.
+
+        Parameters:
+            file_path (str): Path to the document.
+            settings (dict): Loader settings.
+
+        Returns:
+            ParsedDocument | None: Cached document, or None on a miss.
+        """
+        key = self.key(file_path, settings)
+        path = os.path.join(self.cache_dir, key)
+        if not os.path.isdir(path):
+            return None
+        document = ParsedDocument(path, key)
+        if document.pages is None:
+            return None
+        os.utime(path)
+        return document
+
+    def put(self, file_path: str, pages: list, settings: dict = None) -> ParsedDocument:
+        """
+        Store the parsed pages of a file.
+
+        Parameters:
+            file_path (str): Path to the document.
+            pages (list): Page texts returned by the loader.
+            settings (dict): Loader settings.
+
+        Returns:
+            ParsedDocument: The stored document.
+        """
+        key = self.key(file_path, settings)
+        path = os.path.join(self.cache_dir, key)
+        paragraphs = "\n\n".join(pages).split("\n\n")
+
+        with self._lock:
+            staging = tempfile.mkdtemp(dir=self.cache_dir, prefix='.staging-')
+            try:
+                write_section(staging, 'pages', pages)
+                write_section(staging, 'paragraphs', paragraphs)
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                os.replace(staging, path)
+            except Exception:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            self._evict(keep=key)
+
+        return ParsedDocument(path, key)
+
+    def load(self, file_path: str, loader_factory, settings: dict = None) -> ParsedDocument:
+        """
+        Return the cached parse of a file, parsing and storing it on a miss.
+
+        Parameters:
+            file_path (str): Path to the document.
+            loader_factory (callable): Called as loader_factory(file_path) and
+                must return an object with a load() method yielding documents.
+            settings (dict): Loader settings.
+
+        Returns:
+            ParsedDocument: Cached document.
+        """
+        document = self.get(file_path, settings)
+        if document is not None:
+            return document
+        pages = [doc.page_content for doc in loader_factory(file_path).load()]
+        return self.put(file_path, pages, settings)
+
+    def size(self) -> int:
+        """
+        Return the total size of all cache entries in bytes.
+
+        Returns:
+            int: Cache size.
+        """
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self) -> list:
+        """
+        List cache entries.
+
+        Returns:
+            list: (key, last used timestamp, size in bytes) tuples.
+        """
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, key)
+            if key.startswith('.') or not os.path.isdir(path):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+            entries.append((key, os.path.getmtime(path), size))
+        return entries
+
+    def _evict(self, keep: str):
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+
+        Parameters:
+            keep (str): Key that must not be evicted.
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for key, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+            total -= size
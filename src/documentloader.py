@@ -1,29 +1,51 @@
+import functools
 from logger import Logger
-from langchain_community.document_loaders import UnstructuredPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter, SentenceTransformersTokenTextSplitter
+from document_cache import DocumentCache
+from chunker import StructureChunker, HuggingFaceOffsets, DEFAULT_TOKENIZER
+
+CHUNK_SETTINGS = {
+    'chunker': 'structure',
+    'max_tokens': 256,
+    'overlap_tokens': 32,
+    'tokenizer': DEFAULT_TOKENIZER,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _tokenizer(model_name):
+    # One tokenizer per process, shared by every PDFProcessor
+    return HuggingFaceOffsets(model_name)
+
 
 class PDFProcessor:
-    def __init__(self, file_path, log_file_name="pdf_processor.log"):
+    def __init__(self, file_path, log_file_name="pdf_processor.log", document_cache=None):
         """
         Initialize the PDFProcessor with the specified file path.
 
         Parameters:
         - file_path (str): Path to the PDF file.
         - log_file_name (str): Name of the log file.
+        - document_cache (DocumentCache): Cache of parsed documents (default DocumentCache()).
         """
         self.logger = Logger(log_file_name).get_app_logger()
-        self.loader = UnstructuredPDFLoader(file_path)
+        self.file_path = file_path
+        self.document_cache = document_cache if document_cache is not None else DocumentCache()
+        self.document = None
         self.data = None
         self.pdf_texts = None
-        self.character_split_texts = None
         self.token_split_texts = None
+        self.chunks = None
 
     def load_pdf_data(self):
         """
         Load data from the PDF using the specified loader.
         """
         try:
-            self.data = self.loader.load()
+            # unstructured is only imported when a document has to be parsed
+            from langchain_community.document_loaders import UnstructuredPDFLoader
+            from langchain_core.documents import Document
+            self.document = self.document_cache.load(self.file_path, UnstructuredPDFLoader)
+            self.data = [Document(page_content=page) for page in self.document.pages]
             self.logger.info("PDF data loaded successfully.")
         except Exception as e:
             self.logger.error(f"Error loading PDF data: {e}")
@@ -42,23 +64,29 @@ class PDFProcessor:
 
     def split_text(self):
         """
-        Split the text into chunks using RecursiveCharacterTextSplitter and SentenceTransformersTokenTextSplitter.
+        Split the text into chunks on contract structure with StructureChunker.
+
+        The document is tokenized once with the embedding model's tokenizer; every
+        chunk keeps its page and section in self.chunks.
         """
         try:
-            character_splitter = RecursiveCharacterTextSplitter(
-                separators=["\n\n", "\n", ". ", " ", ""],
-                chunk_size=350,
-                chunk_overlap=100
-            )
-            self.character_split_texts = character_splitter.split_text('\n\n'.join(self.pdf_texts))
-            self.logger.info(f"Text split using character splitter. Total chunks: {len(self.character_split_texts)}")
+            cached_chunks = self.document.chunks(CHUNK_SETTINGS) if self.document is not None else None
+            cached_metadata = self.document.chunk_metadata(CHUNK_SETTINGS) if cached_chunks is not None else None
+            if cached_metadata is not None:
+                self.token_split_texts = cached_chunks
+                self.chunks = [{'text': text, **metadata} for text, metadata in zip(cached_chunks, cached_metadata)]
+                self.logger.info(f"Token split texts loaded from cache. Total chunks: {len(self.token_split_texts)}")
+                return
 
-            token_splitter = SentenceTransformersTokenTextSplitter(chunk_overlap=50, tokens_per_chunk=256)
-            self.token_split_texts = []
-            for text in self.character_split_texts:
-                self.token_split_texts += token_splitter.split_text(text)
+            chunker = StructureChunker(CHUNK_SETTINGS['max_tokens'], CHUNK_SETTINGS['overlap_tokens'], _tokenizer(CHUNK_SETTINGS['tokenizer']))
+            pages = self.document.pages if self.document is not None else ['\n\n'.join(self.pdf_texts)]
+            self.chunks = chunker.chunk(pages)
+            self.token_split_texts = [chunk['text'] for chunk in self.chunks]
 
-            self.logger.info(f"Text split using token splitter. Total chunks: {len(self.token_split_texts)}")
+            self.logger.info(f"Text split on contract structure. Total chunks: {len(self.token_split_texts)}")
+            if self.document is not None:
+                self.document.store_chunks(self.token_split_texts, CHUNK_SETTINGS,
+                                           [{key: value for key, value in chunk.items() if key != 'text'} for chunk in self.chunks])
         except Exception as e:
             self.logger.error(f"Error in text splitting: {e}")
 
@@ -0,0 +1,298 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from jobs import QUEUED as JOB_QUEUED, RUNNING as JOB_RUNNING
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_REGISTRY_PATH = os.path.join(REPO_DIR, 'cache', 'documents.json')
+DEFAULT_UPLOAD_DIR = os.path.join(REPO_DIR, 'data', 'uploads')
+
+QUEUED, INGESTING, READY, FAILED = 'queued', 'ingesting', 'ready', 'failed'
+
+
+class DocumentNotFound(KeyError):
+    """No document with this id is visible to the caller."""
+
+
+class DocumentNotReady(RuntimeError):
+    """The document exists but its ingestion has not finished."""
+
+    def __init__(self, record: dict):
+        super().__init__(f"Document {record['doc_id']} is {record['status']}")
+        self.record = record
+
+
+def describe(record: dict) -> dict:
+    """
+    Return the fields of a record that are shown to API clients.
+
+    Parameters:
+        record (dict): Registry record.
+
+    Returns:
+        dict: doc_id, file_name, status, error, job_id, created and updated.
+    """
+    return {key: record.get(key) for key in ('doc_id', 'file_name', 'status', 'error', 'job_id', 'created', 'updated')}
+
+
+class DocumentRegistry:
+    """Uploaded documents by id, persisted as JSON.
+
+    A document id is the content hash of the file within its tenant, so
+    uploading the same file twice returns the existing document. Every
+    document gets its own vector index class, named from its id.
+    """
+
+    def __init__(self, path: str = DEFAULT_REGISTRY_PATH, upload_dir: str = DEFAULT_UPLOAD_DIR):
+        """
+        Initialize the DocumentRegistry instance and load the stored records.
+
+        Parameters:
+            path (str): JSON file of the records.
+            upload_dir (str): Directory the uploaded files are written to.
+        """
+        self.path = path
+        self.upload_dir = upload_dir
+        self._lock = threading.Lock()
+        self._records = {}
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                self._records = json.load(file)
+        self._by_path = {record['path']: doc_id for doc_id, record in self._records.items()}
+
+    def register(self, file_name: str, data: bytes, tenant: str = None) -> tuple:
+        """
+        Store an uploaded file and record it, or return the existing record of identical content.
+
+        Parameters:
+            file_name (str): Original file name.
+            data (bytes): File content.
+            tenant (str): Owner of the document (default shared).
+
+        Returns:
+            tuple: (record with doc_id, file_name, path, index_name, tenant, status and error,
+                True when the file is new or its earlier ingestion failed and it needs ingesting).
+        """
+        digest = hashlib.sha256((tenant or '').encode('utf-8') + b'\0' + data).hexdigest()
+        doc_id = digest[:16]
+        with self._lock:
+            record = self._records.get(doc_id)
+            if record is not None and record['status'] != FAILED:
+                return dict(record), False
+
+            os.makedirs(self.upload_dir, exist_ok=True)
+            path = os.path.join(self.upload_dir, f"{doc_id}.pdf")
+            with open(path + '.tmp', 'wb') as file:
+                file.write(data)
+            os.replace(path + '.tmp', path)
+
+            now = time.time()
+            record = self._records[doc_id] = {
+                'doc_id': doc_id,
+                'file_name': os.path.basename(file_name),
+                'path': path,
+                # Weaviate class names must start with an upper-case letter
+                'index_name': f"Doc{doc_id}",
+                'tenant': tenant,
+                'status': QUEUED,
+                'error': None,
+                'job_id': None,
+                'created': now,
+                'updated': now,
+            }
+            self._by_path[path] = doc_id
+            self._save()
+            return dict(record), True
+
+    def get(self, doc_id: str, tenant: str = None):
+        """
+        Return a record visible to a tenant.
+
+        Parameters:
+            doc_id (str): Document id.
+            tenant (str): Caller's tenant; documents of other tenants are not visible.
+
+        Returns:
+            dict | None: Copy of the record.
+        """
+        with self._lock:
+            record = self._records.get(doc_id)
+            if record is None or (record['tenant'] is not None and record['tenant'] != tenant):
+                return None
+            return dict(record)
+
+    def find(self, doc_id: str):
+        """
+        Return a record whatever its tenant, for background work.
+
+        Parameters:
+            doc_id (str): Document id.
+
+        Returns:
+            dict | None: Copy of the record.
+        """
+        with self._lock:
+            record = self._records.get(doc_id)
+            return dict(record) if record is not None else None
+
+    def by_path(self, path: str):
+        """
+        Return the record of a stored file.
+
+        Parameters:
+            path (str): Path returned in a record.
+
+        Returns:
+            dict | None: Copy of the record.
+        """
+        with self._lock:
+            doc_id = self._by_path.get(path)
+            return dict(self._records[doc_id]) if doc_id is not None else None
+
+    def route(self, doc_id: str, tenant: str = None) -> dict:
+        """
+        Return the record a query about doc_id is answered from.
+
+        Parameters:
+            doc_id (str): Document id.
+            tenant (str): Caller's tenant.
+
+        Returns:
+            dict: Record of a ready document.
+
+        Raises:
+            DocumentNotFound: No such document for this tenant.
+            DocumentNotReady: Ingestion is queued, running or failed.
+        """
+        record = self.get(doc_id, tenant)
+        if record is None:
+            raise DocumentNotFound(doc_id)
+        if record['status'] != READY:
+            raise DocumentNotReady(record)
+        return record
+
+    def records(self, tenant: str = None, status: str = None, all_tenants: bool = False) -> list:
+        """
+        List the records visible to a tenant.
+
+        Parameters:
+            tenant (str): Caller's tenant.
+            status (str): Only records with this status (default all).
+            all_tenants (bool): Include every tenant's records.
+
+        Returns:
+            list: Copies of the records, oldest first.
+        """
+        with self._lock:
+            records = [dict(record) for record in self._records.values()
+                       if (all_tenants or record['tenant'] is None or record['tenant'] == tenant) and status in (None, record['status'])]
+        return sorted(records, key=lambda record: record['created'])
+
+    def set_status(self, doc_id: str, status: str, error: str = None):
+        """
+        Update the ingestion status of a document.
+
+        Parameters:
+            doc_id (str): Document id.
+            status (str): 'queued', 'ingesting', 'ready' or 'failed'.
+            error (str): Failure message.
+        """
+        with self._lock:
+            record = self._records[doc_id]
+            record.update(status=status, error=error, updated=time.time())
+            self._save()
+
+    def set_job(self, doc_id: str, job_id: str):
+        """
+        Record the ingestion job of a document.
+
+        Parameters:
+            doc_id (str): Document id.
+            job_id (str): Job id in the JobQueue.
+        """
+        with self._lock:
+            self._records[doc_id]['job_id'] = job_id
+            self._save()
+
+    def _save(self):
+        """Atomically write the records; called with the lock held."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path + '.tmp', 'w') as file:
+            json.dump(self._records, file)
+        os.replace(self.path + '.tmp', self.path)
+
+
+class IngestionQueue:
+    """Ingestion of uploaded documents as background jobs of a JobQueue.
+
+    The document status follows its job: 'ingesting' while the job runs,
+    then 'ready' or 'failed'. The job also reports the step and the number
+    of chunks indexed so far.
+    """
+
+    KIND = 'ingest'
+
+    def __init__(self, documents: DocumentRegistry, ingest, jobs):
+        """
+        Initialize the IngestionQueue instance and register its job handler.
+
+        Parameters:
+            documents (DocumentRegistry): Registry whose statuses are updated.
+            ingest (callable): Called as ingest(record, job) in a job worker; parses and indexes the
+                document, reporting progress and taking resource slots through job (see jobs.Job).
+            jobs (JobQueue): Queue the ingestion jobs run on.
+        """
+        self.documents = documents
+        self.ingest = ingest
+        self.jobs = jobs
+        jobs.register(self.KIND, self._run)
+
+    def submit(self, doc_id: str) -> dict:
+        """
+        Queue a document for ingestion.
+
+        Parameters:
+            doc_id (str): Id of a registered document.
+
+        Returns:
+            dict: The ingestion job.
+        """
+        # Set before submitting, as a worker may pick the job up right away
+        self.documents.set_status(doc_id, QUEUED)
+        job = self.jobs.submit(self.KIND, {'doc_id': doc_id}, tenant=self.documents.find(doc_id)['tenant'])
+        self.documents.set_job(doc_id, job['job_id'])
+        return job
+
+    def resume(self) -> int:
+        """
+        Run the ingestion jobs left by a previous process, and queue unfinished documents that have no job.
+
+        Returns:
+            int: Number of documents that will be ingested.
+        """
+        self.jobs.recover()
+        pending = [record for status in (INGESTING, QUEUED) for record in self.documents.records(status=status, all_tenants=True)]
+        for record in pending:
+            job = self.jobs.find(record['job_id']) if record.get('job_id') else None
+            if job is None or job['status'] not in (JOB_QUEUED, JOB_RUNNING):
+                self.submit(record['doc_id'])
+        return len(pending)
+
+    def join(self, timeout: float = None) -> bool:
+        """Wait until every queued document is processed."""
+        return self.jobs.join(timeout)
+
+    def _run(self, job):
+        """Ingest the document of a job."""
+        doc_id = job.payload['doc_id']
+        record = self.documents.find(doc_id)
+        self.documents.set_status(doc_id, INGESTING)
+        try:
+            result = self.ingest(record, job)
+        except Exception as e:
+            self.documents.set_status(doc_id, FAILED, error=str(e))
+            raise
+        self.documents.set_status(doc_id, READY)
+        return result
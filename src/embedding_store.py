@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import numpy as np
+from file_lock import file_lock
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cache', 'embeddings')
+KEY_BYTES = 32
+
+# One store per model and directory, shared by every upload of this process
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(model_name: str, directory: str = DEFAULT_STORE_DIR) -> 'EmbeddingStore':
+    """
+    Return the store of an embedding model shared by the whole process.
+
+    Parameters:
+        model_name (str): Name of the embedding model.
+        directory (str): Root directory of the store.
+
+    Returns:
+        EmbeddingStore: The same instance for every call with the same model and directory.
+    """
+    key = (model_name, os.path.abspath(directory))
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = EmbeddingStore(model_name, directory)
+        return _stores[key]
+
+
+class EmbeddingStore:
+    """Append-only, content-addressed store of chunk embeddings for one embedding model.
+
+    Keys are raw SHA-256 digests of (model, text) appended to keys.bin; vectors
+    are float32 rows appended to vectors.f32 and read through np.memmap.
+    Appends hold an exclusive lock on the store's lock file and lookups a shared
+    one; both first index the rows other instances or processes appended, so
+    every instance sees the same rows. Use open_store() within one process.
+    """
+
+    def __init__(self, model_name: str, directory: str = DEFAULT_STORE_DIR):
+        """
+        Initialize the EmbeddingStore instance.
+
+        Parameters:
+            model_name (str): Name of the embedding model; vectors of other models are kept apart.
+            directory (str): Root directory of the store.
+        """
+        self.model_name = model_name
+        self.directory = os.path.join(directory, re.sub(r'[^A-Za-z0-9_.-]', '_', model_name))
+        self.keys_path = os.path.join(self.directory, 'keys.bin')
+        self.vectors_path = os.path.join(self.directory, 'vectors.f32')
+        self.meta_path = os.path.join(self.directory, 'meta.json')
+        self.lock_path = os.path.join(self.directory, 'store.lock')
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._count = 0
+        self._vectors = None
+        self.dimension = None
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, file_lock(self.lock_path):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def key(self, text: str) -> bytes:
+        """
+        Return the content address of a chunk.
+
+        Parameters:
+            text (str): Chunk text.
+
+        Returns:
+            bytes: SHA-256 digest of the model name and text.
+        """
+        return hashlib.sha256(f"{self.model_name}\x1f{text}".encode('utf-8')).digest()
+
+    def get_many(self, texts: list) -> list:
+        """
+        Look up stored vectors.
+
+        Parameters:
+            texts (list): Chunk texts.
+
+        Returns:
+            list: float32 vector per text, or None where it is not stored.
+        """
+        with self._lock, file_lock(self.lock_path, shared=True):
+            self._refresh()
+            return [None if row is None else np.array(self._vectors[row]) for row in (self._rows.get(self.key(text)) for text in texts)]
+
+    def put_many(self, texts: list, vectors: list):
+        """
+        Store vectors for texts not stored yet.
+
+        Parameters:
+            texts (list): Chunk texts.
+            vectors (list): One vector per text.
+        """
+        with self._lock, file_lock(self.lock_path):
+            self._refresh()
+            new_keys, new_vectors, seen = [], [], set()
+            for text, vector in zip(texts, vectors):
+                key = self.key(text)
+                if key in self._rows or key in seen:
+                    continue
+                seen.add(key)
+                new_keys.append(key)
+                new_vectors.append(vector)
+            if not new_keys:
+                return
+
+            matrix = np.asarray(new_vectors, dtype=np.float32)
+            if self.dimension is None:
+                self.dimension = matrix.shape[1]
+                with open(self.meta_path, 'w') as file:
+                    json.dump({'model': self.model_name, 'dimension': self.dimension}, file)
+            # Vectors are appended before keys so a key never points past the vector file
+            with open(self.vectors_path, 'ab') as file:
+                file.write(matrix.tobytes())
+            with open(self.keys_path, 'ab') as file:
+                file.write(b''.join(new_keys))
+            self._refresh()
+
+    def embed(self, texts: list, embed_documents) -> tuple:
+        """
+        Return vectors for texts, embedding only those not stored yet.
+
+        Parameters:
+            texts (list): Chunk texts.
+            embed_documents (callable): Embeds a list of texts, e.g. OpenAIEmbeddings.embed_documents.
+
+        Returns:
+            tuple: (list of vectors aligned with texts, number of texts that were embedded).
+        """
+        vectors = self.get_many(texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            self.put_many(missing, embed_documents(missing))
+            fresh = dict(zip(missing, self.get_many(missing)))
+            vectors = [fresh[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return vectors, len(missing)
+
+    def _load(self):
+        """
+        Drop a partially written tail and index the stored rows; the exclusive file lock is held.
+        """
+        if os.path.exists(self.meta_path) and os.path.exists(self.keys_path):
+            with open(self.meta_path, 'r') as file:
+                row_bytes = json.load(file)['dimension'] * 4
+            count = min(os.path.getsize(self.keys_path) // KEY_BYTES, os.path.getsize(self.vectors_path) // row_bytes)
+            # Appends hold the same lock, so a tail is only left by an interrupted one
+            os.truncate(self.keys_path, count * KEY_BYTES)
+            os.truncate(self.vectors_path, count * row_bytes)
+        self._refresh()
+
+    def _refresh(self):
+        """
+        Index the rows appended since the last refresh and map the vector file; the file lock is held.
+        """
+        if self.dimension is None:
+            if not os.path.exists(self.meta_path):
+                return
+            with open(self.meta_path, 'r') as file:
+                self.dimension = json.load(file)['dimension']
+        if not os.path.exists(self.keys_path):
+            return
+
+        count = min(os.path.getsize(self.keys_path) // KEY_BYTES, os.path.getsize(self.vectors_path) // (self.dimension * 4))
+        if count == self._count:
+            return
+        with open(self.keys_path, 'rb') as file:
+            file.seek(self._count * KEY_BYTES)
+            keys = file.read((count - self._count) * KEY_BYTES)
+        for offset in range(count - self._count):
+            self._rows.setdefault(keys[offset * KEY_BYTES:(offset + 1) * KEY_BYTES], self._count + offset)
+        self._count = count
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(count, self.dimension))
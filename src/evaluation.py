@@ -1,18 +1,28 @@
 import numpy as np
-from sentence_transformers import CrossEncoder
 from generation import Generation
+from reranker import Reranker
+from prompt_registry import PromptTemplate
+from singleflight import SingleFlight
+import tracing
 
 class Evaluation:
     
-    def __init__(self):
+    def __init__(self, generator: Generation = None, reranker: Reranker = None):
         """
         Initialize the Evaluation instance with a Generation instance.
+
+        Parameters:
+            generator (Generation): Shared Generation instance (default creates a new one).
+            reranker (Reranker): Shared cross-encoder reranker (default Reranker()).
         """
-        self.generator = Generation("gpt-3.5-turbo")
+        self.generator = generator if generator is not None else Generation("gpt-3.5-turbo")
+        self.reranker = reranker if reranker is not None else Reranker()
+        # Identical sufficiency checks in flight (same prompt, question and passage) share one LLM call
+        self.flights = SingleFlight()
         
     def ranking_query(self, matching_documents: list, query: str):
         """
-        Rank the matching documents based on a query using a CrossEncoder.
+        Rank the matching documents based on a query using the shared cross-encoder.
 
         Parameters:
             matching_documents (list): List of documents to rank.
@@ -21,37 +31,105 @@ class Evaluation:
         Returns:
             list: Ranked indices of matching documents.
         """
-        cross_encoder = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
-        pairs = [[query, doc] for doc in matching_documents]
-        scores = cross_encoder.predict(pairs)
-        new_scores = [original_index for original_index in np.argsort(scores)[::-1]]
-        return new_scores   
+        return self.reranker.rank(query, matching_documents)
 
-    def evaluate(self, prompt: str, user_message: str, context: str, use_test_data: bool = False) -> str:
+    def evaluate(self, prompt: str, user_message: str, context: str, use_test_data: bool = False, timeout: float = None) -> str:
         """
         Evaluate the hallucination classification.
 
         Parameters:
-            prompt (str): Prompt for generation.
+            prompt (PromptTemplate | str): Prompt for generation.
             user_message (str): User message.
             context (str): Context for generation.
             use_test_data (bool): Flag to use test data (default is False).
+            timeout (float): Request timeout in seconds (default uses the client setting).
+
+        Returns:
+            str: Classification of the hallucination.
+        """
+        content = self._prompt(prompt, user_message, context)
+        return self.flights.do(content, self._evaluate, content, len(context), timeout)
+
+    def _evaluate(self, content: str, context_chars: int, timeout: float = None) -> str:
+        """Send one rendered sufficiency prompt to the model and classify the answer."""
+        with tracing.span('evaluation', context_chars=context_chars) as stage:
+            API_RESPONSE = self.generator.get_completion(
+                [
+                    {
+                        "role": "system",
+                        "content": content
+                    }
+                ],
+                model='gpt-3.5-turbo',
+                logprobs=True,
+                top_logprobs=1,
+                timeout=timeout,
+            )
+            classification = self._classification(API_RESPONSE)
+            stage.set(relevant=int(classification == 'true'))
+        return classification
+
+    async def aevaluate(self, prompt: str, user_message: str, context: str, timeout: float = None) -> str:
+        """
+        Async version of evaluate using the pooled async client.
+
+        Parameters:
+            prompt (PromptTemplate | str): Prompt for generation.
+            user_message (str): User message.
+            context (str): Context for generation.
+            timeout (float): Request timeout in seconds (default uses the client setting).
 
         Returns:
             str: Classification of the hallucination.
         """
-        API_RESPONSE = self.generator.get_completion(
-            [
-                {
-                    "role": "system",
-                    "content": prompt.replace("{Context}", context).replace("{Question}", user_message)
-                }
-            ],
-            model='gpt-3.5-turbo',
-            logprobs=True,
-            top_logprobs=1,
-        )
+        content = self._prompt(prompt, user_message, context)
+        return await self.flights.ado(content, self._aevaluate, content, len(context), timeout)
+
+    async def _aevaluate(self, content: str, context_chars: int, timeout: float = None) -> str:
+        """Async version of _evaluate."""
+        with tracing.span('evaluation', context_chars=context_chars) as stage:
+            API_RESPONSE = await self.generator.aget_completion(
+                [
+                    {
+                        "role": "system",
+                        "content": content
+                    }
+                ],
+                model='gpt-3.5-turbo',
+                logprobs=True,
+                top_logprobs=1,
+                timeout=timeout,
+            )
+            classification = self._classification(API_RESPONSE)
+            stage.set(relevant=int(classification == 'true'))
+        return classification
 
+    def _prompt(self, prompt, user_message: str, context: str) -> str:
+        """
+        Fill the context and question into the sufficiency prompt.
+
+        Parameters:
+            prompt (PromptTemplate | str): Compiled template or raw prompt text.
+            user_message (str): User message.
+            context (str): Context for generation.
+
+        Returns:
+            str: Rendered prompt.
+        """
+        if isinstance(prompt, PromptTemplate):
+            return prompt.render(Context=context, Question=user_message)
+        return prompt.replace("{Context}", context).replace("{Question}", user_message)
+
+    def _classification(self, API_RESPONSE) -> str:
+        """
+        Turn a completion with logprobs into 'true' or 'false'.
+
+        Parameters:
+            API_RESPONSE: Chat completion of the sufficiency prompt.
+
+        Returns:
+            str: 'true' only when the model answered 'true' with at least 95% probability.
+        """
         system_msg = str(API_RESPONSE.choices[0].message.content)
 
         for i, logprob in enumerate(API_RESPONSE.choices[0].logprobs.content[0].top_logprobs, start=1):
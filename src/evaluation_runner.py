@@ -0,0 +1,327 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from answer_cache import FileBackend
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(REPO_DIR, 'cache', 'evaluation')
+
+
+def read_dataset(path: str) -> list:
+    """
+    Read evaluation examples from JSONL or CSV.
+
+    Every example needs a question and one or more ground truths: a
+    'ground_truths' list (JSONL), or 'ground_truth' holding one answer. An
+    'id' is optional and defaults to the hash of the question.
+
+    Parameters:
+        path (str): Input file.
+
+    Returns:
+        list: Dicts with id, question and ground_truths.
+    """
+    with open(path, 'r', newline='') as file:
+        rows = list(csv.DictReader(file)) if path.endswith('.csv') else [json.loads(line) for line in file if line.strip()]
+    examples = []
+    for row in rows:
+        ground_truths = row.get('ground_truths')
+        if ground_truths is None:
+            ground_truths = [row['ground_truth']] if row.get('ground_truth') else []
+        elif isinstance(ground_truths, str):
+            ground_truths = [ground_truths]
+        examples.append({
+            'id': str(row.get('id') or hashlib.sha256(row['question'].encode('utf-8')).hexdigest()[:16]),
+            'question': row['question'],
+            'ground_truths': list(ground_truths),
+        })
+    return examples
+
+
+class RateLimiter:
+    """Token bucket shared by threads: at most `rate` calls per second after an initial burst."""
+
+    def __init__(self, rate: float, burst: int = 1, clock=time.monotonic, sleep=time.sleep):
+        """
+        Initialize the RateLimiter instance.
+
+        Parameters:
+            rate (float): Calls allowed per second.
+            burst (int): Calls allowed at once before the rate applies.
+            clock (callable): Monotonic time in seconds.
+            sleep (callable): Called with the seconds to wait.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until the next call is allowed."""
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token now so waiting callers are served in arrival order
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self.sleep(wait)
+
+
+class EvaluationRunner:
+    """Answer a question set and score every answer with a set of metrics.
+
+    Answers and metric calls run on thread pools under a shared rate limit.
+    Each metric result is cached by the hash of the metric, question, answer,
+    contexts and ground truths, and every finished example is appended to a
+    JSONL checkpoint, so an interrupted run resumes where it stopped and a
+    repeated run only calls the LLM for what changed.
+    """
+
+    def __init__(self, answer, metrics: dict, max_concurrency: int = 8, rate_limiter: RateLimiter = None, cache=None,
+                 checkpoint_path: str = None):
+        """
+        Initialize the EvaluationRunner instance.
+
+        Parameters:
+            answer (callable): Called as answer(question); returns (answer text, list of context texts).
+            metrics (dict): Metric name -> callable(question, answer, contexts, ground_truths) returning a score.
+            max_concurrency (int): Answers in flight, and metric calls in flight.
+            rate_limiter (RateLimiter): Limit shared by answer and metric calls (default unlimited).
+            cache: Metric store with get(key) and set(key, value), e.g. answer_cache.FileBackend (default none).
+            checkpoint_path (str): JSON lines file of finished examples (default no resuming).
+        """
+        self.answer = answer
+        self.metrics = metrics
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.checkpoint_path = checkpoint_path
+        self._checkpoint_lock = threading.Lock()
+        self._counts_lock = threading.Lock()
+        self.counts = {'answered': 0, 'metric_calls': 0, 'cached': 0}
+
+    def run(self, examples: list, progress=None) -> list:
+        """
+        Evaluate the examples that are not finished in the checkpoint.
+
+        Parameters:
+            examples (list): Dicts with id, question and ground_truths (see read_dataset).
+            progress (callable): Called as progress(finished, total) after every example.
+
+        Returns:
+            list: Result rows of this run: id, question, ground_truths, answer, contexts,
+                one column per metric and error (None when every step succeeded).
+        """
+        finished = self.finished_ids()
+        pending = [example for example in examples if example['id'] not in finished]
+        rows = []
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='answer') as answers, \
+                ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='metric') as metric_pool:
+            futures = [answers.submit(self._evaluate, example, metric_pool) for example in pending]
+            for done, future in enumerate(as_completed(futures), start=len(examples) - len(pending) + 1):
+                row = future.result()
+                self._checkpoint(row)
+                rows.append(row)
+                if progress is not None:
+                    progress(done, len(examples))
+        return rows
+
+    def finished_ids(self) -> set:
+        """
+        Return the ids the checkpoint holds a complete result for.
+
+        Returns:
+            set: Ids of examples whose last checkpointed row has no error.
+        """
+        latest = {}
+        for row in read_checkpoint(self.checkpoint_path):
+            latest[row['id']] = row['error'] is None
+        return {example_id for example_id, complete in latest.items() if complete}
+
+    def cache_key(self, metric: str, question: str, answer: str, contexts: list, ground_truths: list) -> str:
+        """
+        Return the cache key of a metric result.
+
+        Parameters:
+            metric (str): Metric name.
+            question (str): Question.
+            answer (str): Generated answer.
+            contexts (list): Context texts the answer was generated from.
+            ground_truths (list): Reference answers (used by recall metrics).
+
+        Returns:
+            str: sha256 of the inputs.
+        """
+        payload = json.dumps([metric, question, answer, contexts, ground_truths], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _evaluate(self, example: dict, metric_pool: ThreadPoolExecutor) -> dict:
+        """Answer one example and score it with every metric on the metric pool."""
+        row = {'id': example['id'], 'question': example['question'], 'ground_truths': example['ground_truths'],
+               'answer': None, 'contexts': [], **{name: None for name in self.metrics}, 'error': None}
+        try:
+            self._limit()
+            row['answer'], row['contexts'] = self.answer(example['question'])
+            self._count('answered')
+        except Exception as e:
+            row['error'] = f"answer: {e}"
+            return row
+
+        futures = {name: metric_pool.submit(self._score, name, row) for name in self.metrics}
+        errors = []
+        for name, future in futures.items():
+            try:
+                row[name] = future.result()
+            except Exception as e:
+                errors.append(f"{name}: {e}")
+        row['error'] = "; ".join(errors) or None
+        return row
+
+    def _score(self, name: str, row: dict) -> float:
+        """Return a cached metric result or compute it."""
+        inputs = (row['question'], row['answer'], list(row['contexts']), row['ground_truths'])
+        key = self.cache_key(name, *inputs)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._count('cached')
+                return cached
+        self._limit()
+        score = float(self.metrics[name](*inputs))
+        self._count('metric_calls')
+        if self.cache is not None:
+            self.cache.set(key, score)
+        return score
+
+    def _limit(self):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+    def _count(self, name: str):
+        with self._counts_lock:
+            self.counts[name] += 1
+
+    def _checkpoint(self, row: dict):
+        """Append a finished example to the checkpoint."""
+        if not self.checkpoint_path:
+            return
+        with self._checkpoint_lock, open(self.checkpoint_path, 'a') as file:
+            file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def read_checkpoint(path: str):
+    """
+    Yield the rows of a checkpoint file, skipping a line cut off by an interruption.
+
+    Parameters:
+        path (str): Checkpoint written by EvaluationRunner (missing or None yields nothing).
+
+    Yields:
+        dict: Result rows in the order they finished.
+    """
+    if not path or not os.path.exists(path):
+        return
+    with open(path, 'r') as file:
+        for line in file:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def write_parquet(checkpoint_path: str, output_path: str, metrics: list, batch_size: int = 1000) -> dict:
+    """
+    Write the latest row of every example in a checkpoint to a Parquet file.
+
+    The checkpoint is streamed twice, once to find the latest row of every
+    example and once to write them in record batches, so no run has to fit
+    in memory.
+
+    Parameters:
+        checkpoint_path (str): Checkpoint written by EvaluationRunner.
+        output_path (str): Parquet file to write.
+        metrics (list): Metric columns.
+        batch_size (int): Rows per record batch.
+
+    Returns:
+        dict: Number of rows, rows with errors and the mean of every metric.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.string()),
+        ('question', pa.string()),
+        ('ground_truths', pa.list_(pa.string())),
+        ('answer', pa.string()),
+        ('contexts', pa.list_(pa.string())),
+        *[(name, pa.float64()) for name in metrics],
+        ('error', pa.string()),
+    ])
+    latest = {}
+    for position, row in enumerate(read_checkpoint(checkpoint_path)):
+        latest[row['id']] = position
+    keep = set(latest.values())
+
+    totals = {name: [0.0, 0] for name in metrics}
+    summary = {'rows': 0, 'errors': 0}
+    with pq.ParquetWriter(output_path, schema) as writer:
+        batch = []
+        for position, row in enumerate(read_checkpoint(checkpoint_path)):
+            if position not in keep:
+                continue
+            batch.append(row)
+            summary['rows'] += 1
+            summary['errors'] += row['error'] is not None
+            for name in metrics:
+                if row.get(name) is not None:
+                    totals[name][0] += row[name]
+                    totals[name][1] += 1
+            if len(batch) == batch_size:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                batch = []
+        if batch:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+    summary['means'] = {name: total / count if count else None for name, (total, count) in totals.items()}
+    return summary
+
+
+if __name__ == '__main__':
+    from ragas_evaluate import Ragas
+
+    parser = argparse.ArgumentParser(description="Answer a question set with the RAG chain and score it with RAGAS metrics.")
+    parser.add_argument('dataset', help='JSONL or CSV file with question and ground_truth(s)')
+    parser.add_argument('--output', default='evaluation.parquet', help='Parquet file of the results')
+    parser.add_argument('--checkpoint', default=None, help='Checkpoint file (default <output>.checkpoint.jsonl)')
+    parser.add_argument('--index-name', default='RaptorContractdocx', help='Vector index of the document')
+    parser.add_argument('--concurrency', type=int, default=8, help='Answers and metric calls in flight')
+    parser.add_argument('--rate', type=float, default=5.0, help='LLM calls started per second')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Metric result cache')
+    args = parser.parse_args()
+
+    ragas = Ragas(index_name=args.index_name)
+    metrics = ragas.metric_functions()
+    runner = EvaluationRunner(
+        answer=ragas.answer,
+        metrics=metrics,
+        max_concurrency=args.concurrency,
+        rate_limiter=RateLimiter(args.rate, burst=args.concurrency),
+        cache=FileBackend(args.cache_dir, max_entries=100000),
+        checkpoint_path=args.checkpoint or args.output + '.checkpoint.jsonl',
+    )
+    examples = read_dataset(args.dataset)
+    start = time.perf_counter()
+    runner.run(examples, progress=lambda done, total: print(f"\r{done}/{total}", end='', flush=True))
+    print()
+    summary = write_parquet(runner.checkpoint_path, args.output, list(metrics))
+    print(json.dumps({**summary, **runner.counts, 'seconds': round(time.perf_counter() - start, 1)}, indent=2))
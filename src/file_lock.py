@@ -0,0 +1,24 @@
+import fcntl
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False):
+    """
+    Hold an advisory lock on a lock file while the block runs.
+
+    Every call opens the file anew, and flock locks belong to the open file, so
+    the lock excludes other threads of this process as well as other processes.
+
+    Parameters:
+        path (str): Lock file; created if missing.
+        shared (bool): Take a shared (reader) lock instead of an exclusive one.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
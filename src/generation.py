@@ -1,20 +1,55 @@
-import os
-from openai import OpenAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.chat_models import ChatOpenAI
+import functools
+from clients import openai_client, async_openai_pool, DEFAULT_MAX_CONNECTIONS
+from prompt_registry import get_registry
+from context_assembly import ContextAssembler, SEPARATOR
+import tracing
 
 class Generation:
             
-    def __init__(self, model_name: str):
+    def __init__(self, model_name: str, client: 'OpenAI' = None, max_connections: int = DEFAULT_MAX_CONNECTIONS, prompts=None,
+                 context_assembler: ContextAssembler = None):
         """
         Initialize the Generation instance with OpenAI and ChatOpenAI.
 
         Parameters:
             model_name (str): Name of the model.
+            client (OpenAI): Sync client (default the shared pooled client of clients.openai_client).
+            max_connections (int): OpenAI calls in flight per event loop on the async path.
+            prompts (PromptRegistry): Prompt templates (default the shared registry).
+            context_assembler (ContextAssembler): Selects the passages of a retrieved context
+                (default deduplication and a budget of DEFAULT_MAX_TOKENS for model_name).
         """
         self.model_name = model_name
-        self.client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-        self.chat = ChatOpenAI(api_key=os.environ.get("OPENAI_API_KEY"), temperature=0.0, model=model_name)
+        self.max_connections = max_connections
+        self.client = client if client is not None else openai_client()
+        self.prompts = prompts if prompts is not None else get_registry()
+        self.context_assembler = context_assembler if context_assembler is not None else ContextAssembler(model_name)
+
+    @functools.cached_property
+    def chat(self):
+        # Only built (and langchain only imported) when used; it opens its own connection pool
+        from langchain.chat_models import ChatOpenAI
+        return ChatOpenAI(api_key=self.client.api_key, temperature=0.0, model=self.model_name)
+
+    @property
+    def async_pool(self):
+        """Shared AsyncOpenAIPool matching the settings of the sync client."""
+        return async_openai_pool(self.client, self.max_connections)
+
+    async def _acreate(self, **params):
+        """
+        Create a chat completion with the async client once a connection slot is free.
+
+        Parameters:
+            **params: Arguments of chat.completions.create.
+
+        Returns:
+            ChatCompletion: The completion.
+        """
+        async with self.async_pool.slot() as client:
+            response = await client.chat.completions.create(**params)
+        tracing.record_usage(response)
+        return response
         
     def chats(self, message):
         """
@@ -32,7 +67,69 @@ class Generation:
             {"role": "user", "content": message}
             ]
         )
+        tracing.record_usage(response)
+        return response.choices[0].message.content
+
+    def stream_chats(self, message):
+        """
+        Stream a response for a given message token by token.
+
+        Parameters:
+            message (str): Input message.
+
+        Yields:
+            str: Content deltas in the order they arrive.
+        """
+        stream = self.client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[
+            {"role": "user", "content": message}
+            ],
+            stream=True,
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def achats(self, message):
+        """
+        Async version of chats using the pooled async client.
+
+        Parameters:
+            message (str): Input message.
+
+        Returns:
+            str: Response from the model.
+        """
+        response = await self._acreate(
+            model="gpt-3.5-turbo",
+            messages=[
+            {"role": "user", "content": message}
+            ]
+        )
         return response.choices[0].message.content
+
+    async def astream_chats(self, message):
+        """
+        Async version of stream_chats.
+
+        Parameters:
+            message (str): Input message.
+
+        Yields:
+            str: Content deltas in the order they arrive.
+        """
+        async with self.async_pool.slot() as client:
+            stream = await client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                {"role": "user", "content": message}
+                ],
+                stream=True,
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
     
     
     def get_completion(
@@ -46,6 +143,7 @@ class Generation:
         tools=None,
         logprobs=None,
         top_logprobs=None,
+        timeout=None,
     ) -> str:
         """
         Get the completion of the prompt using the OpenAI chat API.
@@ -60,6 +158,7 @@ class Generation:
             tools (str): Additional tools to use.
             logprobs (int): Include log probabilities in the response.
             top_logprobs (int): Include top log probabilities in the response.
+            timeout (float): Request timeout in seconds (default uses the client setting).
 
         Returns:
             str: Completion of the prompt.
@@ -76,13 +175,50 @@ class Generation:
         }
         if tools:
             params["tools"] = tools
+        if timeout is not None:
+            params["timeout"] = timeout
 
         completion = self.client.chat.completions.create(**params)
+        tracing.record_usage(completion)
         return completion
+
+    async def aget_completion(self, messages: list[dict[str, str]], model: str = 'gpt-3.5-turbo-1106', max_tokens=1000, temperature=0,
+                              stop=None, seed=123, tools=None, logprobs=None, top_logprobs=None, timeout=None):
+        """
+        Async version of get_completion; takes the same parameters.
+
+        Returns:
+            ChatCompletion: Completion of the prompt.
+        """
+        params = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stop": stop,
+            "seed": seed,
+            "logprobs": logprobs,
+            "top_logprobs": top_logprobs,
+        }
+        if tools:
+            params["tools"] = tools
+        if timeout is not None:
+            params["timeout"] = timeout
+
+        return await self._acreate(**params)
     
     def get_keyword(self, prompt , query):
-        client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-        response = client.chat.completions.create(
+        response = self.client.chat.completions.create(
+        model=self.model_name,
+        messages=[
+            {"role": "user", "content": prompt.format(query=query)},
+        ]
+        )
+        tracing.record_usage(response)
+        return response.choices[0].message.content
+
+    async def aget_keyword(self, prompt, query):
+        response = await self._acreate(
         model=self.model_name,
         messages=[
             {"role": "user", "content": prompt.format(query=query)},
@@ -91,14 +227,57 @@ class Generation:
         return response.choices[0].message.content
     
     
+    def assemble(self, context) -> list:
+        """
+        Select the passages of a retrieved context that are sent to the model.
+
+        Parameters:
+            context (list): Output of Retriever.retrieve_query.
+
+        Returns:
+            list: Deduplicated, merged passage texts within the token budget, best first.
+        """
+        return self.context_assembler.assemble(context)
+
     def generate_answer(self, context, question):
-        file_path = '../src/prompts/generate-answer.txt'
+        context = self._context_text(context)
+        with tracing.span('generation', context_chars=len(context)):
+            return self.chats(self._answer_message(context, question))
 
-        # Open the file in read mode ('r')
-        with open(file_path, 'r') as file:
-            # Read the entire contents of the file
-            file_content = file.read()
-            
-        message = file_content.replace('{question}',question).replace('{context}',context)
-         
-        return self.chats(message)
+    async def agenerate_answer(self, context, question):
+        context = self._context_text(context)
+        with tracing.span('generation', context_chars=len(context)):
+            return await self.achats(self._answer_message(context, question))
+
+    def stream_answer(self, context, question):
+        """
+        Stream the answer for a question token by token.
+
+        Parameters:
+            context (str | list): Context text, or retrieved passages to assemble.
+            question (str): User question.
+
+        Yields:
+            str: Answer content deltas.
+        """
+        return self.stream_chats(self._answer_message(self._context_text(context), question))
+
+    def astream_answer(self, context, question):
+        """
+        Async version of stream_answer.
+
+        Parameters:
+            context (str | list): Context text, or retrieved passages to assemble.
+            question (str): User question.
+
+        Returns:
+            AsyncIterator[str]: Answer content deltas.
+        """
+        return self.astream_chats(self._answer_message(self._context_text(context), question))
+
+    def _context_text(self, context):
+        # Retrieved passages (a list) are assembled; a string is used as given
+        return context if isinstance(context, str) else SEPARATOR.join(self.assemble(context))
+
+    def _answer_message(self, context, question):
+        return self.prompts.render('generate-answer', question=question, context=context)
@@ -0,0 +1,142 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from tracing import propagate
+
+
+def passage_key(item) -> str:
+    """
+    Return the deduplication key of a passage or LangChain document.
+
+    Parameters:
+        item: Passage text or object with page_content.
+
+    Returns:
+        str: Case-folded text with collapsed whitespace.
+    """
+    return re.sub(r'\s+', ' ', getattr(item, 'page_content', item)).strip().casefold()
+
+
+def where_filter(filters: dict):
+    """
+    Build a Weaviate where filter requiring every metadata value of filters.
+
+    Parameters:
+        filters (dict): Property -> required value, e.g. {'section': '2.1', 'page': 3}.
+
+    Returns:
+        dict: Where filter for similarity_search(where_filter=...), None without filters.
+    """
+    if not filters:
+        return None
+    operands = []
+    for name, value in filters.items():
+        value_key = 'valueBoolean' if isinstance(value, bool) else 'valueInt' if isinstance(value, int) else \
+            'valueNumber' if isinstance(value, float) else 'valueText'
+        operands.append({'path': [name], 'operator': 'Equal', value_key: value})
+    return operands[0] if len(operands) == 1 else {'operator': 'And', 'operands': operands}
+
+
+def reciprocal_rank_fusion(rankings: dict, k: int = 60, weights: dict = None) -> list:
+    """
+    Fuse ranked result lists with (weighted) reciprocal-rank fusion.
+
+    Each item scores sum(weight / (k + rank)) over the lists it appears in.
+    Items with the same text are merged; the first occurrence is kept.
+
+    Parameters:
+        rankings (dict): Source name -> results, best first.
+        k (int): RRF smoothing constant.
+        weights (dict): Source name -> weight (default 1.0 each).
+
+    Returns:
+        list: (item, score, sources) tuples, best score first.
+    """
+    weights = weights or {}
+    fused = {}
+    for source, results in rankings.items():
+        weight = weights.get(source, 1.0)
+        seen = set()
+        for rank, item in enumerate(results, start=1):
+            key = passage_key(item)
+            if key in seen:
+                continue
+            seen.add(key)
+            entry = fused.setdefault(key, [item, 0.0, []])
+            entry[1] += weight / (k + rank)
+            entry[2].append(source)
+    return sorted((tuple(entry) for entry in fused.values()), key=lambda entry: -entry[1])
+
+
+class HybridRetriever:
+    """Run lexical and vector search in parallel and fuse them into one deduplicated list."""
+
+    def __init__(self, lexical_search, vector_search, vector_k: int = 10, fusion_k: int = 60, weights: dict = None, max_candidates: int = 20,
+                 vector_workers: int = 16):
+        """
+        Initialize the HybridRetriever instance.
+
+        Parameters:
+            lexical_search (callable): Called as lexical_search(query); returns passages, best first.
+            vector_search (callable): Called as vector_search(query, k), or vector_search(query, k, filters)
+                when filtering, e.g. Database.retrieve; returns documents, best first.
+            vector_k (int): Number of vector search results.
+            fusion_k (int): RRF smoothing constant.
+            weights (dict): Weight of the 'lexical' and 'vector' sources (default equal).
+            max_candidates (int): Length of the fused list handed to reranking.
+            vector_workers (int): Vector searches in flight at once; the retriever of a
+                document is shared by all its concurrent requests, so this bounds them.
+        """
+        self.lexical_search = lexical_search
+        self.vector_search = vector_search
+        self.vector_k = vector_k
+        self.fusion_k = fusion_k
+        self.weights = weights
+        self.max_candidates = max_candidates
+        self._executor = ThreadPoolExecutor(max_workers=vector_workers)
+
+    def gather(self, query: str, filters: dict = None) -> dict:
+        """
+        Run both searches concurrently: the vector search on the pool, the lexical
+        search (up to three LLM keyword calls) on the calling thread.
+
+        Lexical results carry no page or section, so with filters only the
+        vector search runs and the lexical list is empty.
+
+        Parameters:
+            query (str): User question.
+            filters (dict): Metadata values every result must have, e.g. {'section': '2.1'} (default none).
+
+        Returns:
+            dict: {'lexical': [...], 'vector': [...]} raw results.
+        """
+        # Stage spans of both searches nest under the caller's trace
+        if filters:
+            return {'lexical': [], 'vector': self.vector_search(query, self.vector_k, filters)}
+        vector = self._executor.submit(propagate(self.vector_search), query, self.vector_k)
+        return {'lexical': self.lexical_search(query), 'vector': vector.result()}
+
+    def fuse(self, results: dict) -> list:
+        """
+        Fuse raw results into one deduplicated candidate list.
+
+        Parameters:
+            results (dict): Output of gather.
+
+        Returns:
+            list: At most max_candidates passages or documents, best fused rank first.
+        """
+        fused = reciprocal_rank_fusion(results, k=self.fusion_k, weights=self.weights)
+        return [item for item, _, _ in fused[:self.max_candidates]]
+
+    def search(self, query: str, filters: dict = None) -> list:
+        """
+        Search both sources and fuse the results.
+
+        Parameters:
+            query (str): User question.
+            filters (dict): Metadata values every result must have (default none).
+
+        Returns:
+            list: Deduplicated candidates, best fused rank first.
+        """
+        return self.fuse(self.gather(query, filters))
@@ -0,0 +1,466 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from file_lock import file_lock
+from logger import Logger
+
+# Properties written with every chunk besides its text; vector stores return them as document metadata
+CHUNK_PROPERTIES = ['source', 'chunk', 'page', 'section', 'heading']
+
+
+def index_name(file_path: str) -> str:
+    """
+    Derive the Weaviate class name of a document from its file name.
+
+    Parameters:
+        file_path (str): Path to the document.
+
+    Returns:
+        str: File name without extension, dots and spaces.
+    """
+    file_name_without_extension, file_extension = os.path.splitext(os.path.basename(file_path))
+    return file_name_without_extension.replace('.', ' ').replace(' ', '')
+
+
+def parse_pdf(file_path: str) -> list:
+    """
+    Load, clean and chunk one PDF; runs inside a worker process.
+
+    Parameters:
+        file_path (str): Path to the PDF file.
+
+    Returns:
+        list: Token split chunks.
+    """
+    from documentloader import PDFProcessor
+    return PDFProcessor(file_path).process_pdf() or []
+
+
+class IngestionPipeline:
+    """Streaming ingestion: parallel parsing, batched concurrent embedding and Weaviate batch writes."""
+
+    def __init__(self, weaviate_client, embeddings, batch_size: int = 64, embedding_concurrency: int = 4,
+                 parse_workers: int = None, checkpoint_path: str = None, text_key: str = 'text',
+                 embedding_store=None, manifest_path: str = None):
+        """
+        Initialize the IngestionPipeline instance.
+
+        Parameters:
+            weaviate_client: Weaviate client instance.
+            embeddings: LangChain embeddings with embed_documents(texts).
+            batch_size (int): Chunks per embedding request and Weaviate batch.
+            embedding_concurrency (int): Embedding requests in flight.
+            parse_workers (int): Processes used to parse PDFs (default CPU count).
+            checkpoint_path (str): JSON lines file of written chunk ids; chunks listed
+                there are skipped, so a failed run can be resumed.
+            text_key (str): Property holding the chunk text.
+            embedding_store (EmbeddingStore): Persistent vectors reused for unchanged chunks
+                (default embeds every chunk).
+            manifest_path (str): JSON file recording the chunk ids of every synced source,
+                used by sync to find new and removed chunks.
+        """
+        self.weaviate_client = weaviate_client
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.embedding_concurrency = embedding_concurrency
+        self.parse_workers = parse_workers
+        self.checkpoint_path = checkpoint_path
+        self.text_key = text_key
+        self.embedding_store = embedding_store
+        self.manifest_path = manifest_path
+        self.logger = Logger("ingestion.log").get_app_logger()
+        self._created_classes = set()
+        self._checkpoint_lock = threading.Lock()
+        self._rejected = {}
+
+    def chunks(self, file_paths: list):
+        """
+        Parse PDFs in a process pool and yield their chunks as each file finishes.
+
+        Parameters:
+            file_paths (list): Paths to PDF files.
+
+        Yields:
+            tuple: (class name, source file, chunk index, chunk text).
+        """
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as executor:
+            futures = {executor.submit(parse_pdf, file_path): file_path for file_path in file_paths}
+            for future in as_completed(futures):
+                file_path = futures[future]
+                try:
+                    texts = future.result()
+                except Exception as e:
+                    self.logger.error(f"Error parsing {file_path}: {e}")
+                    continue
+                self.logger.info(f"Parsed {file_path}. Total chunks: {len(texts)}")
+                for position, text in enumerate(texts):
+                    yield index_name(file_path), os.path.basename(file_path), position, text
+
+    def ingest(self, file_paths: list) -> dict:
+        """
+        Parse, embed and write a set of PDFs.
+
+        Parameters:
+            file_paths (list): Paths to PDF files.
+
+        Returns:
+            dict: Throughput statistics (see write).
+        """
+        return self.write(self.chunks(file_paths))
+
+    def write(self, chunks, progress=None) -> dict:
+        """
+        Embed and write chunks, batch by batch.
+
+        Parameters:
+            chunks: Iterable of (class name, source, chunk index, text) tuples, optionally
+                followed by a dict of extra properties (e.g. page and section).
+            progress (callable): Called as progress(written, total) after every batch;
+                total is None when chunks has no length.
+
+        Returns:
+            dict: Chunks written, chunks skipped from the checkpoint, chunks sent to the
+                embedding model, chunks Weaviate rejected, elapsed seconds and chunks per second.
+        """
+        return self._write(chunks, progress)[0]
+
+    def _write(self, chunks, progress=None) -> tuple:
+        """
+        Embed and write chunks, batch by batch; rejected chunks are left out of the checkpoint.
+
+        Returns:
+            tuple: (statistics of write, ids of the chunks Weaviate rejected).
+        """
+        done = self._load_checkpoint()
+        total = len(chunks) if hasattr(chunks, '__len__') else None
+        start = time.perf_counter()
+        written = 0
+        skipped = 0
+        embedded = 0
+        failed = []
+
+        def pending():
+            nonlocal skipped
+            for class_name, source, position, text, *properties in chunks:
+                chunk_id = self.chunk_id(class_name, source, text)
+                if chunk_id in done:
+                    skipped += 1
+                    continue
+                yield class_name, source, position, chunk_id, text, (properties[0] if properties else {})
+
+        self.weaviate_client.batch.configure(batch_size=self.batch_size, callback=self._record_batch_results)
+        with ThreadPoolExecutor(max_workers=self.embedding_concurrency) as executor:
+            in_flight = deque()
+            for batch in self._batches(pending()):
+                in_flight.append((batch, executor.submit(self._embed, [item[4] for item in batch])))
+                # Keep a bounded number of embedding requests ahead of the writer
+                while len(in_flight) > self.embedding_concurrency:
+                    batch_written, batch_embedded, batch_failed = self._write_batch(*in_flight.popleft())
+                    written += batch_written
+                    embedded += batch_embedded
+                    failed.extend(batch_failed)
+                    if progress is not None:
+                        progress(written, total)
+            while in_flight:
+                batch_written, batch_embedded, batch_failed = self._write_batch(*in_flight.popleft())
+                written += batch_written
+                embedded += batch_embedded
+                failed.extend(batch_failed)
+                if progress is not None:
+                    progress(written, total)
+
+        seconds = time.perf_counter() - start
+        stats = {
+            'chunks': written,
+            'skipped': skipped,
+            'embedded': embedded,
+            'failed': len(failed),
+            'seconds': seconds,
+            'chunks_per_second': written / seconds if seconds else 0.0,
+        }
+        self.logger.info(f"Ingested {written} chunks ({skipped} already done, {embedded} embedded, {len(failed)} rejected) in {seconds:.2f}s, {stats['chunks_per_second']:.1f} chunks/s")
+        return stats, failed
+
+    def sync(self, class_name: str, source: str, texts: list, progress=None, metadatas: list = None) -> dict:
+        """
+        Incrementally bring a source in Weaviate in line with its current chunks.
+
+        Chunk ids are content addressed, so only new or changed chunks are embedded
+        and upserted, and ids recorded for the source that no longer occur are deleted.
+        Chunks Weaviate rejected are not recorded, so the next sync writes them again.
+        The first sync of a class also deletes its objects without a source, which
+        were written under random ids before sync existed and would otherwise be
+        returned next to their re-inserted copies.
+
+        Parameters:
+            class_name (str): Weaviate class of the document.
+            source (str): Source file name.
+            texts (list): Current chunks of the source.
+            progress (callable): Called as progress(written, total) after every batch of new chunks.
+            metadatas (list): Extra properties per chunk, e.g. page and section (default none).
+
+        Returns:
+            dict: Statistics of write plus the number of unchanged, deleted and legacy deleted chunks.
+
+        Raises:
+            RuntimeError: Weaviate rejected chunks; the others are recorded, so a retry only writes those.
+        """
+        current = {}
+        for text, properties in zip(texts, metadatas if metadatas is not None else [{}] * len(texts)):
+            current.setdefault(self.chunk_id(class_name, source, text), (text, properties))
+
+        manifest = self._load_manifest()
+        legacy = self._delete_legacy_objects(class_name) if class_name not in manifest else 0
+        previous = set(manifest.get(class_name, {}).get(source, []))
+        new_chunks = [(class_name, source, position, text, properties)
+                      for position, (chunk_id, (text, properties)) in enumerate(current.items()) if chunk_id not in previous]
+
+        stats, failed = self._write(new_chunks, progress)
+        stale = previous - current.keys()
+        for chunk_id in stale:
+            self.weaviate_client.data_object.delete(uuid=chunk_id, class_name=class_name)
+
+        rejected = set(failed)
+        self._record_manifest(class_name, source, [chunk_id for chunk_id in current if chunk_id not in rejected])
+        if failed:
+            raise RuntimeError(f"Weaviate rejected {len(failed)} of {len(new_chunks)} new chunks of {source}")
+
+        stats.update(unchanged=len(current) - len(new_chunks), deleted=len(stale), legacy_deleted=legacy)
+        self.logger.info(f"Synced {source}: {len(new_chunks)} new, {stats['unchanged']} unchanged, {len(stale)} deleted")
+        return stats
+
+    def _delete_legacy_objects(self, class_name: str) -> int:
+        """
+        Delete the objects of a class that have no source property.
+
+        Classes filled with Weaviate.from_texts have random ids that no manifest
+        records; sync re-inserts their chunks under content-addressed ids.
+
+        Parameters:
+            class_name (str): Weaviate class of the document.
+
+        Returns:
+            int: Number of objects deleted.
+        """
+        if not self.weaviate_client.schema.exists(class_name):
+            return 0
+        legacy, cursor = [], None
+        while True:
+            objects = self.weaviate_client.data_object.get(class_name=class_name, limit=self.batch_size, after=cursor)['objects']
+            if not objects:
+                break
+            legacy.extend(item['id'] for item in objects if item['properties'].get('source') is None)
+            cursor = objects[-1]['id']
+        # Deleted after the scan, so the cursor never points at a removed object
+        for object_id in legacy:
+            self.weaviate_client.data_object.delete(uuid=object_id, class_name=class_name)
+        if legacy:
+            self.logger.info(f"Deleted {len(legacy)} objects without a source from {class_name}")
+        return len(legacy)
+
+    def chunk_id(self, class_name: str, source: str, text: str) -> str:
+        """
+        Return the content-addressed Weaviate id of a chunk.
+
+        Parameters:
+            class_name (str): Weaviate class of the document.
+            source (str): Source file name.
+            text (str): Chunk text.
+
+        Returns:
+            str: uuid5 of the class, source and text.
+        """
+        from weaviate.util import generate_uuid5
+        return generate_uuid5(f"{class_name}:{source}:{text}")
+
+    def _batches(self, items):
+        """
+        Group items into lists of batch_size.
+
+        Parameters:
+            items: Iterable of (class name, source, chunk index, id, text, properties) tuples.
+
+        Yields:
+            list: Batches of items.
+        """
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _write_batch(self, batch: list, embedding_future) -> tuple:
+        """
+        Write one embedded batch with the Weaviate batch API and checkpoint the chunks it accepted.
+
+        Parameters:
+            batch (list): (class name, source, chunk index, id, text, properties) tuples.
+            embedding_future: Future resolving to one vector per chunk.
+
+        Returns:
+            tuple: Number of chunks written, number of chunks sent to the embedding model
+                and ids of the chunks Weaviate rejected.
+        """
+        vectors, embedded = embedding_future.result()
+        for class_name in {item[0] for item in batch}:
+            self._ensure_class(class_name)
+
+        self._rejected = {}
+
+        with self.weaviate_client.batch as writer:
+            for (class_name, source, position, chunk_id, text, properties), vector in zip(batch, vectors):
+                writer.add_data_object(
+                    data_object={self.text_key: text, 'source': source, 'chunk': position, **properties},
+                    class_name=class_name,
+                    uuid=chunk_id,
+                    vector=vector,
+                )
+
+        failed = [item[3] for item in batch if item[3] in self._rejected]
+        if failed:
+            self.logger.error(f"Weaviate rejected {len(failed)} of {len(batch)} chunks, e.g. {failed[0]}: {self._rejected[failed[0]]}")
+        self._save_checkpoint([item[3] for item in batch if item[3] not in self._rejected])
+        return len(batch) - len(failed), embedded, failed
+
+    def _record_batch_results(self, results):
+        """
+        Batch callback of the Weaviate client: remember the objects it rejected.
+
+        Parameters:
+            results (list): One result per object of a flushed batch.
+        """
+        for result in results or []:
+            errors = (result.get('result') or {}).get('errors')
+            if errors:
+                self._rejected[result['id']] = errors
+
+    def _embed(self, texts: list) -> tuple:
+        """
+        Embed a batch, reusing stored vectors when an embedding store is configured.
+
+        Parameters:
+            texts (list): Chunk texts.
+
+        Returns:
+            tuple: (vectors aligned with texts, number of texts sent to the embedding model).
+        """
+        if self.embedding_store is None:
+            return self.embeddings.embed_documents(texts), len(texts)
+        return self.embedding_store.embed(texts, self.embeddings.embed_documents)
+
+    def _ensure_class(self, class_name: str):
+        """
+        Create the Weaviate class on first use unless it already exists.
+
+        Parameters:
+            class_name (str): Name of the class.
+        """
+        if class_name in self._created_classes:
+            return
+        if not self.weaviate_client.schema.exists(class_name):
+            self.weaviate_client.schema.create_class({
+                "class": class_name,
+                "properties": [
+                    {"name": self.text_key, "dataType": ["text"]},
+                    {"name": "source", "dataType": ["text"]},
+                    {"name": "chunk", "dataType": ["int"]},
+                    {"name": "page", "dataType": ["int"]},
+                    {"name": "section", "dataType": ["text"]},
+                    {"name": "heading", "dataType": ["text"]},
+                ],
+            })
+        self._created_classes.add(class_name)
+
+    def _load_manifest(self) -> dict:
+        """
+        Read the chunk ids recorded per class and source.
+
+        Returns:
+            dict: Class name -> source -> list of chunk ids.
+        """
+        if not self.manifest_path or not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, 'r') as file:
+            return json.load(file)
+
+    def _record_manifest(self, class_name: str, source: str, chunk_ids: list):
+        """
+        Record the chunk ids of one source in the manifest.
+
+        The manifest is shared by every upload, so it is re-read, updated and
+        atomically replaced under a file lock; sources synced meanwhile by other
+        jobs or processes are kept.
+
+        Parameters:
+            class_name (str): Weaviate class of the document.
+            source (str): Source file name.
+            chunk_ids (list): Current chunk ids of the source.
+        """
+        if not self.manifest_path:
+            return
+        with file_lock(self.manifest_path + '.lock'):
+            manifest = self._load_manifest()
+            manifest.setdefault(class_name, {})[source] = chunk_ids
+            with open(self.manifest_path + '.tmp', 'w') as file:
+                json.dump(manifest, file)
+            os.replace(self.manifest_path + '.tmp', self.manifest_path)
+
+    def _load_checkpoint(self) -> set:
+        """
+        Read the ids written by previous runs.
+
+        Returns:
+            set: Chunk ids.
+        """
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return set()
+        with open(self.checkpoint_path, 'r') as file:
+            return {chunk_id for line in file if line.strip() for chunk_id in json.loads(line)}
+
+    def _save_checkpoint(self, chunk_ids: list):
+        """
+        Append written ids to the checkpoint.
+
+        Parameters:
+            chunk_ids (list): Ids of the chunks just written.
+        """
+        if not self.checkpoint_path:
+            return
+        with self._checkpoint_lock, open(self.checkpoint_path, 'a') as file:
+            file.write(json.dumps(chunk_ids) + "\n")
+
+
+if __name__ == '__main__':
+    import weaviate
+    from langchain_openai import OpenAIEmbeddings
+
+    parser = argparse.ArgumentParser(description="Ingest a folder of contract PDFs into Weaviate.")
+    parser.add_argument('folder', help='Folder containing PDF files')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--embedding-concurrency', type=int, default=4)
+    parser.add_argument('--parse-workers', type=int, default=None)
+    parser.add_argument('--checkpoint', default=None, help='Checkpoint file used to resume an interrupted run')
+    args = parser.parse_args()
+
+    client = weaviate.Client(
+        url=os.environ.get("WEAVIATE_URL"),
+        auth_client_secret=weaviate.AuthApiKey(api_key=os.environ.get("WEAVIATE_API_KEY")),
+    )
+    pipeline = IngestionPipeline(
+        client,
+        OpenAIEmbeddings(api_key=os.environ.get("OPENAI_API_KEY")),
+        batch_size=args.batch_size,
+        embedding_concurrency=args.embedding_concurrency,
+        parse_workers=args.parse_workers,
+        checkpoint_path=args.checkpoint,
+    )
+    paths = sorted(os.path.join(args.folder, name) for name in os.listdir(args.folder) if name.endswith('.pdf'))
+    stats = pipeline.ingest(paths)
+    print(f"{stats['chunks']} chunks in {stats['seconds']:.1f}s ({stats['chunks_per_second']:.1f} chunks/s), {stats['skipped']} resumed")
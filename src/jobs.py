@@ -0,0 +1,380 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_JOBS_PATH = os.path.join(REPO_DIR, 'cache', 'jobs.sqlite3')
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+
+FIELDS = ('job_id', 'kind', 'payload', 'tenant', 'status', 'stage', 'done', 'total', 'result', 'error',
+          'attempts', 'created', 'started', 'finished', 'owner')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    tenant TEXT,
+    status TEXT NOT NULL,
+    stage TEXT,
+    done INTEGER,
+    total INTEGER,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    owner TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, seq);
+"""
+
+# Tokens of the queues open in this process; see JobQueue._owner_alive
+_open_queues = set()
+_open_queues_lock = threading.Lock()
+
+
+class Job:
+    """Handle passed to a running job's handler to report progress and take resource slots."""
+
+    def __init__(self, queue: 'JobQueue', record: dict):
+        self.queue = queue
+        self.job_id = record['job_id']
+        self.kind = record['kind']
+        self.payload = record['payload']
+        self.tenant = record['tenant']
+        self.attempts = record['attempts']
+
+    def progress(self, stage: str = None, done: int = None, total: int = None):
+        """
+        Record how far the job got; polled through JobQueue.get.
+
+        Parameters:
+            stage (str): Name of the current step (unchanged when None).
+            done (int): Units of the current step finished.
+            total (int): Units of the current step, if known.
+        """
+        fields = {'done': done, 'total': total}
+        if stage is not None:
+            fields['stage'] = stage
+        self.queue._update(self.job_id, **fields)
+
+    @contextmanager
+    def resource(self, name: str):
+        """
+        Hold one slot of a limited resource for the duration of the block.
+
+        Parameters:
+            name (str): Resource configured in the queue's limits, e.g. 'parse' or 'embed'.
+        """
+        semaphore = self.queue._semaphores[name]
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+class JobQueue:
+    """Background jobs persisted in SQLite and run by a pool of worker threads.
+
+    Jobs are claimed in submission order. Handlers limit their heavy steps
+    with Job.resource, so CPU-bound parsing and I/O-bound embedding each run
+    at most their own number of jobs at once while the other steps overlap.
+    Jobs left queued or running by a previous process are picked up again
+    by recover.
+
+    Several processes may share one database (e.g. the Werkzeug reloader's
+    parent and child, or several servers): a job is claimed with a
+    conditional UPDATE, so only one of them runs it, and each running job
+    records its owner, so recover only restarts jobs whose owner is gone.
+    """
+
+    def __init__(self, path: str = DEFAULT_JOBS_PATH, workers: int = 2, limits: dict = None, max_attempts: int = 3):
+        """
+        Initialize the JobQueue instance and create the table if needed.
+
+        Parameters:
+            path (str): SQLite database file.
+            workers (int): Jobs running at the same time.
+            limits (dict): Resource name -> jobs allowed to hold it at once.
+            max_attempts (int): Runs of a job interrupted by restarts before it is failed.
+        """
+        self.path = path
+        self.workers = workers
+        self.limits = dict(limits or {})
+        self.max_attempts = max_attempts
+        self.handlers = {}
+        self._semaphores = {name: threading.BoundedSemaphore(limit) for name, limit in self.limits.items()}
+        self._condition = threading.Condition()
+        self._running = set()
+        self._threads = []
+        self._closed = False
+        # pid:token identifies this queue as the owner of the jobs it runs
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        with _open_queues_lock:
+            _open_queues.add(self.owner)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(jobs)")]
+        if 'owner' not in columns:
+            # Databases created before jobs recorded their owner
+            self._connection.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+
+    def register(self, kind: str, handler):
+        """
+        Set the function that runs jobs of a kind.
+
+        Parameters:
+            kind (str): Job kind.
+            handler (callable): Called as handler(job) in a worker thread; its return value
+                (JSON serializable) is stored as the result and an exception fails the job.
+        """
+        self.handlers[kind] = handler
+
+    def submit(self, kind: str, payload: dict, tenant: str = None) -> dict:
+        """
+        Queue a job.
+
+        Parameters:
+            kind (str): Registered job kind.
+            payload (dict): JSON serializable arguments of the handler.
+            tenant (str): Owner of the job (default shared).
+
+        Returns:
+            dict: The queued job.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        job_id = uuid.uuid4().hex[:16]
+        with self._condition:
+            self._connection.execute(
+                "INSERT INTO jobs (job_id, kind, payload, tenant, status, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), tenant, QUEUED, time.time()))
+            self._condition.notify()
+        self._start()
+        return self.find(job_id)
+
+    def recover(self) -> int:
+        """
+        Queue the jobs a previous process left queued or running.
+
+        A running job whose owner process is gone was interrupted part way, so
+        it starts over; after max_attempts interrupted runs it is failed
+        instead. Jobs still run by a live queue (in this or another process)
+        are left alone.
+
+        Returns:
+            int: Number of jobs that will run.
+        """
+        with self._condition:
+            now = time.time()
+            running = self._connection.execute("SELECT job_id, owner, attempts FROM jobs WHERE status = ?", (RUNNING,)).fetchall()
+            for job_id, owner, attempts in running:
+                if self._owner_alive(owner):
+                    continue
+                if attempts >= self.max_attempts:
+                    fields = {'status': FAILED, 'error': "Interrupted too many times", 'finished': now}
+                else:
+                    fields = {'status': QUEUED, 'stage': None, 'done': None, 'total': None, 'owner': None}
+                # Conditional on the owner, so a job another process recovers at the same time changes only once
+                self._connection.execute(
+                    f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE job_id = ? AND status = ? AND owner IS ?",
+                    (*fields.values(), job_id, RUNNING, owner))
+            queued = self._connection.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            self._condition.notify_all()
+        if queued:
+            self._start()
+        return queued
+
+    def close(self):
+        """
+        Stop claiming jobs; jobs already running finish. Running jobs of a closed
+        queue count as interrupted for recover.
+        """
+        with _open_queues_lock:
+            _open_queues.discard(self.owner)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def get(self, job_id: str, tenant: str = None):
+        """
+        Return a job visible to a tenant.
+
+        Parameters:
+            job_id (str): Job id.
+            tenant (str): Caller's tenant; jobs of other tenants are not visible.
+
+        Returns:
+            dict | None: The job.
+        """
+        job = self.find(job_id)
+        if job is None or (job['tenant'] is not None and job['tenant'] != tenant):
+            return None
+        return job
+
+    def find(self, job_id: str):
+        """
+        Return a job whatever its tenant.
+
+        Parameters:
+            job_id (str): Job id.
+
+        Returns:
+            dict | None: The job.
+        """
+        with self._condition:
+            row = self._connection.execute(f"SELECT {', '.join(FIELDS)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def jobs(self, status: str = None, kind: str = None) -> list:
+        """
+        List jobs in submission order.
+
+        Parameters:
+            status (str): Only jobs with this status (default all).
+            kind (str): Only jobs of this kind (default all).
+
+        Returns:
+            list: The jobs.
+        """
+        with self._condition:
+            rows = self._connection.execute(
+                f"SELECT {', '.join(FIELDS)} FROM jobs WHERE (? IS NULL OR status = ?) AND (? IS NULL OR kind = ?) ORDER BY seq",
+                (status, status, kind, kind)).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def join(self, timeout: float = None) -> bool:
+        """
+        Wait until no job is queued and none is running in this queue.
+
+        The database is polled, since other processes sharing it may claim
+        queued jobs without notifying this one.
+
+        Parameters:
+            timeout (float): Seconds to wait at most (default no limit).
+
+        Returns:
+            bool: True when no job is left.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while not self._idle():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(0.05 if remaining is None else min(0.05, remaining))
+            return True
+
+    def stats(self) -> dict:
+        """
+        Count jobs by status.
+
+        Returns:
+            dict: Status -> number of jobs, plus the configured workers and limits.
+        """
+        with self._condition:
+            counts = dict(self._connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {**{status: counts.get(status, 0) for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)},
+                'workers': self.workers, 'limits': self.limits}
+
+    def _start(self):
+        """Start the worker threads on first use."""
+        with self._condition:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f"jobs-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _claim(self):
+        """Mark the oldest queued job running and return it; called with the lock held."""
+        if self._closed:
+            return None
+        while True:
+            row = self._connection.execute(
+                f"SELECT {', '.join(FIELDS)} FROM jobs WHERE status = ? ORDER BY seq LIMIT 1", (QUEUED,)).fetchone()
+            if row is None:
+                return None
+            job = self._to_dict(row)
+            job.update(status=RUNNING, attempts=job['attempts'] + 1, started=time.time(), owner=self.owner)
+            # Only the process whose UPDATE still finds the job queued runs it
+            claimed = self._connection.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, started = ?, owner = ? WHERE job_id = ? AND status = ?",
+                (RUNNING, job['attempts'], job['started'], self.owner, job['job_id'], QUEUED)).rowcount
+            if claimed:
+                self._running.add(job['job_id'])
+                return job
+
+    def _run(self):
+        """Run queued jobs until the queue is closed or the process exits."""
+        while True:
+            with self._condition:
+                record = self._condition.wait_for(lambda: self._closed or self._claim())
+                if record is True:
+                    return
+            try:
+                handler = self.handlers.get(record['kind'])
+                if handler is None:
+                    raise ValueError(f"No handler registered for job kind: {record['kind']}")
+                result = handler(Job(self, record))
+                self._update(record['job_id'], status=SUCCEEDED, result=json.dumps(result), finished=time.time())
+            except Exception as e:
+                self._update(record['job_id'], status=FAILED, error=str(e), finished=time.time())
+            finally:
+                with self._condition:
+                    self._running.discard(record['job_id'])
+                    self._condition.notify_all()
+
+    def _idle(self) -> bool:
+        """True when no job is queued and none runs in this queue; called with the lock held."""
+        if self._running:
+            return False
+        return self._connection.execute("SELECT 1 FROM jobs WHERE status = ? LIMIT 1", (QUEUED,)).fetchone() is None
+
+    def _owner_alive(self, owner: str) -> bool:
+        """
+        Check whether the queue that claimed a job can still finish it.
+
+        Parameters:
+            owner (str): pid:token of the claiming queue (None for jobs claimed
+                before owners were recorded).
+
+        Returns:
+            bool: True when the owning process runs and, in this process, the queue is open.
+        """
+        if not owner:
+            return False
+        pid = int(owner.split(':', 1)[0])
+        if pid == os.getpid():
+            with _open_queues_lock:
+                return owner in _open_queues
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def _update(self, job_id: str, **fields):
+        """Set columns of a job."""
+        with self._condition:
+            self._connection.execute(f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE job_id = ?",
+                                     (*fields.values(), job_id))
+
+    def _to_dict(self, row) -> dict:
+        job = dict(zip(FIELDS, row))
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
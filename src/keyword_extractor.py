@@ -0,0 +1,71 @@
+from keyword_index import KeywordIndex, tokenize
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here hers
+how i if in into is it its itself just me more most my no nor not of off on once only or other our out over own
+same she should so some such than that the their them then there these they this those through to too under
+until up very was we were what when where which while who whom why will with would you your
+circumstances extent much many need needs give tell describe explain mean means
+""".split())
+
+
+class LocalKeywordExtractor:
+    """Pick a search keyword from the question itself using the document's own term statistics."""
+
+    def __init__(self, index: KeywordIndex, max_phrase_length: int = 3):
+        """
+        Initialize the LocalKeywordExtractor instance.
+
+        Parameters:
+            index (KeywordIndex): Index of the document being questioned.
+            max_phrase_length (int): Longest run of content words tried as a phrase.
+        """
+        self.index = index
+        self.max_phrase_length = max_phrase_length
+        # IDF of a term found in a single paragraph, the most specific a term can be
+        self.max_idf = index.idf_for_frequency(1)
+
+    def extract(self, query: str):
+        """
+        Choose the most specific keyword or phrase of the query present in the document.
+
+        Candidates are runs of consecutive content words that occur as a phrase in
+        the document, weighted by the summed IDF of their tokens (TF-IDF over the
+        question). The confidence is the mean IDF of the chosen tokens relative
+        to the IDF of a term that occurs in one paragraph only.
+
+        Parameters:
+            query (str): User question.
+
+        Returns:
+            tuple: (keyword, confidence between 0 and 1); keyword is None when no
+                content word of the query occurs in the document.
+        """
+        tokens = tokenize(query)
+        runs = []
+        current = []
+        for token in tokens:
+            if token in STOPWORDS or token.isdigit():
+                if current:
+                    runs.append(current)
+                current = []
+            else:
+                current.append(token)
+        if current:
+            runs.append(current)
+
+        best, best_weight = None, 0.0
+        for run in runs:
+            for length in range(1, min(self.max_phrase_length, len(run)) + 1):
+                for start in range(len(run) - length + 1):
+                    phrase = run[start:start + length]
+                    if length > 1 and not self.index.search(" ".join(phrase), limit=1):
+                        continue
+                    weight = sum(self.index.idf(token) for token in phrase)
+                    if weight > best_weight:
+                        best, best_weight = phrase, weight
+
+        if best is None or not self.max_idf:
+            return None, 0.0
+        return " ".join(best), min(1.0, best_weight / (len(best) * self.max_idf))
@@ -0,0 +1,150 @@
+import math
+import re
+from collections import Counter
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list:
+    """
+    Split text into case-folded word tokens.
+
+    Parameters:
+        text (str): Text to tokenize.
+
+    Returns:
+        list: Tokens in order of appearance.
+    """
+    return [token.casefold() for token in TOKEN_PATTERN.findall(text)]
+
+
+class KeywordIndex:
+    """Inverted index over the paragraphs of a document with BM25 ranking and phrase lookup."""
+
+    def __init__(self, paragraphs: list, k1: float = 1.5, b: float = 0.75):
+        """
+        Build the index.
+
+        Parameters:
+            paragraphs (list): Paragraph texts of the document.
+            k1 (float): BM25 term frequency saturation.
+            b (float): BM25 length normalisation.
+        """
+        self.paragraphs = paragraphs
+        self.k1 = k1
+        self.b = b
+        # token -> {paragraph id: [positions]}
+        self.postings = {}
+        self.lengths = []
+
+        for paragraph_id, paragraph in enumerate(paragraphs):
+            tokens = tokenize(paragraph)
+            self.lengths.append(len(tokens))
+            for position, token in enumerate(tokens):
+                self.postings.setdefault(token, {}).setdefault(paragraph_id, []).append(position)
+
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    def idf(self, token: str) -> float:
+        """
+        Return the BM25 inverse document frequency of a token.
+
+        Parameters:
+            token (str): Case-folded token.
+
+        Returns:
+            float: IDF weight, 0 for unknown tokens.
+        """
+        return self.idf_for_frequency(len(self.postings.get(token, {})))
+
+    def idf_for_frequency(self, document_frequency: int) -> float:
+        """
+        Return the BM25 inverse document frequency for a number of paragraphs.
+
+        Parameters:
+            document_frequency (int): Number of paragraphs containing a term.
+
+        Returns:
+            float: IDF weight, 0 when the term occurs nowhere.
+        """
+        if not document_frequency:
+            return 0.0
+        return math.log(1 + (len(self.paragraphs) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(self, keyword: str, limit: int = None) -> list:
+        """
+        Find the paragraphs containing a keyword or phrase, best BM25 score first.
+
+        A multi-word keyword only matches paragraphs that contain its tokens
+        consecutively.
+
+        Parameters:
+            keyword (str): Keyword or phrase.
+            limit (int): Maximum number of paragraph ids to return (default all).
+
+        Returns:
+            list: Paragraph ids.
+        """
+        tokens = tokenize(keyword)
+        if not tokens or any(token not in self.postings for token in tokens):
+            return []
+
+        candidates = set(self.postings[tokens[0]])
+        for token in tokens[1:]:
+            candidates &= self.postings[token].keys()
+        if len(tokens) > 1:
+            candidates = {paragraph_id for paragraph_id in candidates if self._contains_phrase(paragraph_id, tokens)}
+
+        scores = {paragraph_id: self.score(paragraph_id, tokens) for paragraph_id in candidates}
+        ranked = sorted(scores, key=lambda paragraph_id: (-scores[paragraph_id], paragraph_id))
+        return ranked if limit is None else ranked[:limit]
+
+    def matching_paragraphs(self, keyword: str, limit: int = None) -> list:
+        """
+        Return the texts of the paragraphs matching a keyword, best first.
+
+        Parameters:
+            keyword (str): Keyword or phrase.
+            limit (int): Maximum number of paragraphs (default all).
+
+        Returns:
+            list: Paragraph texts.
+        """
+        return [self.paragraphs[paragraph_id] for paragraph_id in self.search(keyword, limit)]
+
+    def score(self, paragraph_id: int, tokens: list) -> float:
+        """
+        Return the BM25 score of a paragraph for query tokens.
+
+        Parameters:
+            paragraph_id (int): Paragraph id.
+            tokens (list): Case-folded query tokens.
+
+        Returns:
+            float: BM25 score.
+        """
+        length_norm = self.k1 * (1 - self.b + self.b * self.lengths[paragraph_id] / (self.average_length or 1.0))
+        score = 0.0
+        for token, count in Counter(tokens).items():
+            frequency = len(self.postings.get(token, {}).get(paragraph_id, ()))
+            if frequency:
+                score += count * self.idf(token) * frequency * (self.k1 + 1) / (frequency + length_norm)
+        return score
+
+    def _contains_phrase(self, paragraph_id: int, tokens: list) -> bool:
+        """
+        Check whether the tokens occur consecutively in a paragraph.
+
+        Parameters:
+            paragraph_id (int): Paragraph id.
+            tokens (list): Case-folded phrase tokens.
+
+        Returns:
+            bool: True if the phrase occurs.
+        """
+        starts = set(self.postings[tokens[0]][paragraph_id])
+        for offset, token in enumerate(tokens[1:], start=1):
+            starts &= {position - offset for position in self.postings[token][paragraph_id]}
+            if not starts:
+                return False
+        return True
@@ -1,4 +1,7 @@
 import logging
+import os
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs')
 
 
 class Logger:
@@ -8,23 +11,29 @@ class Logger:
         """Initilize logger class with file name to be written and default log level.
 
         Args:
-            file_name (str): _description_
+            file_name (str): Log file name, written to the repository's logs/ directory
+                whatever the working directory (directory parts are ignored).
             basic_level (_type_, optional): _description_. Defaults to logging.INFO.
         """
-        # Gets or creates a logger
-        logger = logging.getLogger(__name__)
+        file_name = os.path.basename(file_name)
+        os.makedirs(LOG_DIR, exist_ok=True)
+        path = os.path.join(LOG_DIR, file_name)
+
+        # Gets or creates one logger per file, so lines are not copied into every log
+        logger = logging.getLogger(f"{__name__}.{os.path.splitext(file_name)[0]}")
 
         # set log level
         logger.setLevel(basic_level)
 
-        # define file handler and set formatter
+        # define file handler and set formatter, once per file
 
-        file_handler = logging.FileHandler(f'../logs/{file_name}')
-        formatter = logging.Formatter(
-            '%(asctime)s : %(levelname)s : %(name)s : %(message)s', '%m-%d-%Y %H:%M:%S')
+        if not any(getattr(handler, 'baseFilename', None) == path for handler in logger.handlers):
+            file_handler = logging.FileHandler(path)
+            formatter = logging.Formatter(
+                '%(asctime)s : %(levelname)s : %(name)s : %(message)s', '%m-%d-%Y %H:%M:%S')
 
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+            file_handler.setFormatter(formatter)
+            logger.addHandler(file_handler)
 
         self.logger = logger
 
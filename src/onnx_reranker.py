@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ONNX_DIR = os.path.join(REPO_DIR, 'cache', 'onnx')
+FP32_FILE = 'model.onnx'
+INT8_FILE = 'model.int8.onnx'
+EXPORT_FILE = 'export.json'
+
+
+def onnx_dir(model_name: str, root: str = DEFAULT_ONNX_DIR) -> str:
+    """
+    Return the directory an export of a model is written to and loaded from.
+
+    Parameters:
+        model_name (str): Hugging Face name of the cross-encoder.
+        root (str): Directory holding all exports.
+
+    Returns:
+        str: root/<model name with '/' replaced by '--'>.
+    """
+    return os.path.join(root, model_name.replace('/', '--'))
+
+
+class ONNXCrossEncoder:
+    """Cross-encoder run by ONNX Runtime on CPU, a drop-in model for Reranker.
+
+    Loads the int8-quantized export written by export() (or the float32 one)
+    together with the tokenizer saved next to it. predict() takes the same
+    arguments as sentence_transformers.CrossEncoder.predict and returns the
+    same raw logits, so scores and fitted sufficiency thresholds stay
+    comparable with the PyTorch model.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = True, num_threads: int = None, max_length: int = 512,
+                 session=None, tokenizer=None):
+        """
+        Initialize the ONNXCrossEncoder instance and load the model.
+
+        Parameters:
+            model_dir (str): Directory written by export().
+            quantized (bool): Load the int8 model instead of the float32 one.
+            num_threads (int): Threads ONNX Runtime uses per forward pass (default one per core).
+            max_length (int): Tokens per (query, passage) pair; longer pairs are truncated.
+            session: Object with get_inputs() and run(outputs, feed) (default an
+                onnxruntime.InferenceSession of the model file).
+            tokenizer: Hugging Face tokenizer (default the one saved in model_dir).
+        """
+        self.model_dir = model_dir
+        self.model_path = os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)
+        self.num_threads = num_threads
+        self.max_length = max_length
+        self.session = session if session is not None else self._load_session()
+        if tokenizer is None:
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(model_dir, use_fast=True)
+        self.tokenizer = tokenizer
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def _load_session(self):
+        import onnxruntime
+
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"No ONNX export at {self.model_path}; run: python onnx_reranker.py --output {self.model_dir}")
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Batches are already parallel inside one forward pass; Reranker(num_workers=...) adds parallel batches
+        options.inter_op_num_threads = 1
+        if self.num_threads:
+            options.intra_op_num_threads = self.num_threads
+        return onnxruntime.InferenceSession(self.model_path, options, providers=['CPUExecutionProvider'])
+
+    def predict(self, pairs: list, batch_size: int = 32, show_progress_bar: bool = False) -> np.ndarray:
+        """
+        Score (query, passage) pairs.
+
+        Parameters:
+            pairs (list): [query, passage] pairs.
+            batch_size (int): Pairs per forward pass.
+            show_progress_bar (bool): Accepted for CrossEncoder compatibility; ignored.
+
+        Returns:
+            np.ndarray: One logit per pair.
+        """
+        scores = [self._forward(pairs[start:start + batch_size]) for start in range(0, len(pairs), batch_size)]
+        return np.concatenate(scores) if scores else np.empty(0, dtype=np.float32)
+
+    def _forward(self, pairs: list) -> np.ndarray:
+        """Run one batch through the session."""
+        encoded = self.tokenizer([query for query, _ in pairs], [passage for _, passage in pairs], padding=True,
+                                 truncation='longest_first', max_length=self.max_length, return_tensors='np')
+        feed = {name: np.asarray(encoded[name], dtype=np.int64) for name in self.input_names}
+        logits = self.session.run(None, feed)[0]
+        return np.asarray(logits, dtype=np.float32).reshape(len(pairs), -1)[:, 0]
+
+
+def export(model_name: str, output_dir: str, quantize: bool = True, opset: int = 14) -> dict:
+    """
+    Export a Hugging Face cross-encoder to ONNX and quantize its weights to int8.
+
+    The float32 graph is exported with dynamic batch and sequence axes; dynamic
+    quantization then stores the weights of the linear layers as int8 and
+    quantizes activations at run time, which needs no calibration data.
+
+    Parameters:
+        model_name (str): Hugging Face name of the cross-encoder.
+        output_dir (str): Directory for the model files and the tokenizer.
+        quantize (bool): Also write the int8 model.
+        opset (int): ONNX opset version.
+
+    Returns:
+        dict: Model name, opset and the size in bytes of every written model file.
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    sample = tokenizer(["What is the escrow amount?"], ["The escrow amount is $1,000,000."], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['logits'] = {0: 'batch'}
+
+    fp32_path = os.path.join(output_dir, FP32_FILE)
+    with torch.no_grad():
+        torch.onnx.export(model, tuple(sample[name] for name in input_names), fp32_path, input_names=input_names,
+                          output_names=['logits'], dynamic_axes=dynamic_axes, opset_version=opset)
+    tokenizer.save_pretrained(output_dir)
+
+    sizes = {FP32_FILE: os.path.getsize(fp32_path)}
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        int8_path = os.path.join(output_dir, INT8_FILE)
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        sizes[INT8_FILE] = os.path.getsize(int8_path)
+
+    info = {'model_name': model_name, 'opset': opset, 'sizes': sizes}
+    with open(os.path.join(output_dir, EXPORT_FILE), 'w') as file:
+        json.dump(info, file, indent=2)
+    return info
+
+
+if __name__ == '__main__':
+    from reranker import DEFAULT_MODEL
+
+    parser = argparse.ArgumentParser(description="Export the reranker's cross-encoder to an int8-quantized ONNX model.")
+    parser.add_argument('--model', default=DEFAULT_MODEL, help='Cross-encoder to export')
+    parser.add_argument('--output', default=None, help='Output directory (default cache/onnx/<model>)')
+    parser.add_argument('--opset', type=int, default=14, help='ONNX opset version')
+    parser.add_argument('--no-quantize', action='store_true', help='Only write the float32 model')
+    args = parser.parse_args()
+
+    print(json.dumps(export(args.model, args.output or onnx_dir(args.model), quantize=not args.no_quantize, opset=args.opset), indent=2))
@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class Pipeline:
+    """Heavy objects needed to answer questions about one document."""
+
+    def __init__(self, retriever, generation):
+        """
+        Initialize the Pipeline instance.
+
+        Parameters:
+            retriever: Retriever bound to the document.
+            generation: Generation instance used to write the answer.
+        """
+        self.retriever = retriever
+        self.generation = generation
+
+
+class PipelineRegistry:
+    """Process-wide registry that builds one pipeline per document and model.
+
+    With max_pipelines, the least recently used pipelines are dropped once the
+    limit is exceeded, so idle documents release their parsed text and keyword
+    index; shared models and clients are not owned by a pipeline and stay loaded.
+    """
+
+    def __init__(self, factory, max_pipelines: int = None):
+        """
+        Initialize the PipelineRegistry instance.
+
+        Parameters:
+            factory (callable): Called as factory(file_path, eval_path, model_name)
+                and must return a Pipeline. Only invoked on a cold lookup.
+            max_pipelines (int): Pipelines kept in memory (default unbounded).
+        """
+        self.factory = factory
+        self.max_pipelines = max_pipelines
+        self.evictions = 0
+        self._pipelines = OrderedDict()
+        self._build_locks = {}
+        self._lock = threading.Lock()
+        self._timings = {
+            'cold': {'count': 0, 'total': 0.0, 'max': 0.0},
+            'warm': {'count': 0, 'total': 0.0, 'max': 0.0},
+        }
+
+    def get(self, file_path: str, eval_path: str, model_name: str) -> Pipeline:
+        """
+        Return the pipeline for a document and model, building it on first use.
+
+        Concurrent callers asking for the same key wait for a single build
+        instead of each loading the models and parsing the document.
+
+        Parameters:
+            file_path (str): Path to the PDF file.
+            eval_path (str): Path to the evaluation prompt.
+            model_name (str): Name of the model.
+
+        Returns:
+            Pipeline: Shared pipeline for the key.
+        """
+        key = (file_path, eval_path, model_name)
+        start = time.perf_counter()
+
+        pipeline = self._touch(key)
+        if pipeline is not None:
+            self._record('warm', time.perf_counter() - start)
+            return pipeline
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            pipeline = self._touch(key)
+            if pipeline is not None:
+                self._record('warm', time.perf_counter() - start)
+                return pipeline
+            pipeline = self.factory(file_path, eval_path, model_name)
+            with self._lock:
+                self._pipelines[key] = pipeline
+                while self.max_pipelines is not None and len(self._pipelines) > self.max_pipelines:
+                    evicted, _ = self._pipelines.popitem(last=False)
+                    self._build_locks.pop(evicted, None)
+                    self.evictions += 1
+
+        self._record('cold', time.perf_counter() - start)
+        return pipeline
+
+    def warm(self, file_path: str, eval_path: str, model_name: str) -> threading.Thread:
+        """
+        Build a pipeline in a background thread, e.g. at application startup.
+
+        Parameters:
+            file_path (str): Path to the PDF file.
+            eval_path (str): Path to the evaluation prompt.
+            model_name (str): Name of the model.
+
+        Returns:
+            threading.Thread: The started warm-up thread.
+        """
+        thread = threading.Thread(target=self.get, args=(file_path, eval_path, model_name), daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> dict:
+        """
+        Report how long cold builds and warm lookups have taken.
+
+        Returns:
+            dict: Count, mean and max seconds for the 'cold' and 'warm' paths,
+                plus the number of cached and evicted pipelines.
+        """
+        with self._lock:
+            report = {'pipelines': len(self._pipelines), 'max_pipelines': self.max_pipelines, 'evictions': self.evictions}
+            for path, timing in self._timings.items():
+                mean = timing['total'] / timing['count'] if timing['count'] else 0.0
+                report[path] = {'count': timing['count'], 'mean_seconds': mean, 'max_seconds': timing['max']}
+            return report
+
+    def _touch(self, key: tuple):
+        """
+        Return a cached pipeline and mark it as most recently used.
+
+        Parameters:
+            key (tuple): (file_path, eval_path, model_name).
+
+        Returns:
+            Pipeline | None: Cached pipeline, or None on a miss.
+        """
+        with self._lock:
+            pipeline = self._pipelines.get(key)
+            if pipeline is not None:
+                self._pipelines.move_to_end(key)
+            return pipeline
+
+    def _record(self, path: str, seconds: float):
+        """
+        Add one observation to the cold or warm timing.
+
+        Parameters:
+            path (str): 'cold' or 'warm'.
+            seconds (float): Elapsed time of the lookup.
+        """
+        with self._lock:
+            timing = self._timings[path]
+            timing['count'] += 1
+            timing['total'] += seconds
+            timing['max'] = max(timing['max'], seconds)
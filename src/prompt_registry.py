@@ -0,0 +1,140 @@
+import os
+import re
+import threading
+
+PROMPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts')
+PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+class PromptTemplate:
+    """Prompt text split once into literal segments and {name} placeholders.
+
+    Rendering is a single join, and values are never rescanned for placeholders.
+    Braces that do not enclose a bare name (such as JSON examples) are literal.
+    """
+
+    def __init__(self, name: str, text: str):
+        """
+        Initialize the PromptTemplate instance.
+
+        Parameters:
+            name (str): Template name.
+            text (str): Template text.
+        """
+        self.name = name
+        self.text = text
+        self._parts = PLACEHOLDER.split(text)
+        self.placeholders = set(self._parts[1::2])
+
+    def render(self, **values) -> str:
+        """
+        Fill in the placeholders.
+
+        Parameters:
+            **values: Placeholder name -> value; placeholders without a value are kept verbatim.
+
+        Returns:
+            str: Rendered prompt.
+        """
+        parts = list(self._parts)
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            parts[i] = str(values[name]) if name in values else '{' + name + '}'
+        return ''.join(parts)
+
+    format = render
+
+    def __str__(self) -> str:
+        return self.text
+
+
+class PromptRegistry:
+    """Prompt templates loaded and compiled once per process.
+
+    With hot_reload, a template whose file changed is recompiled on its next
+    lookup; otherwise files are never read again.
+    """
+
+    def __init__(self, directory: str = PROMPT_DIR, hot_reload: bool = False):
+        """
+        Initialize the PromptRegistry instance and load every *.txt template in directory.
+
+        Parameters:
+            directory (str): Directory of the templates.
+            hot_reload (bool): Check modification times on lookup.
+        """
+        self.directory = os.path.abspath(directory)
+        self.hot_reload = hot_reload
+        self._lock = threading.Lock()
+        self._templates = {}
+        for file_name in sorted(os.listdir(self.directory)):
+            if file_name.endswith('.txt'):
+                self.load(os.path.join(self.directory, file_name))
+
+    def get(self, name: str) -> PromptTemplate:
+        """
+        Return a template of the registry directory.
+
+        Parameters:
+            name (str): File name with or without .txt.
+
+        Returns:
+            PromptTemplate: Compiled template.
+        """
+        file_name = name if name.endswith('.txt') else name + '.txt'
+        return self.load(os.path.join(self.directory, file_name))
+
+    def load(self, path: str) -> PromptTemplate:
+        """
+        Return the template stored at a path, compiling it on first use.
+
+        Parameters:
+            path (str): Path to a template file, inside or outside the registry directory.
+
+        Returns:
+            PromptTemplate: Compiled template.
+        """
+        path = os.path.abspath(path)
+        entry = self._templates.get(path)
+        if entry is not None and not self.hot_reload:
+            return entry[1]
+
+        mtime = os.stat(path).st_mtime_ns
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+        with self._lock:
+            entry = self._templates.get(path)
+            if entry is None or entry[0] != mtime:
+                with open(path, 'r') as file:
+                    template = PromptTemplate(os.path.splitext(os.path.basename(path))[0], file.read())
+                entry = self._templates[path] = (mtime, template)
+        return entry[1]
+
+    def render(self, name: str, /, **values) -> str:
+        """
+        Render a template of the registry directory.
+
+        Parameters:
+            name (str): File name with or without .txt (positional, so templates may use {name}).
+            **values: Placeholder values.
+
+        Returns:
+            str: Rendered prompt.
+        """
+        return self.get(name).render(**values)
+
+
+_registry = None
+
+
+def get_registry() -> PromptRegistry:
+    """
+    Return the process-wide registry of src/prompts; PROMPT_HOT_RELOAD=1 enables hot reload.
+
+    Returns:
+        PromptRegistry: Shared registry.
+    """
+    global _registry
+    if _registry is None:
+        _registry = PromptRegistry(hot_reload=os.environ.get("PROMPT_HOT_RELOAD", "0") == "1")
+    return _registry
@@ -1,3 +1,4 @@
+import functools
 import os
 import weaviate
 import pandas as pd
@@ -6,27 +7,34 @@ from langchain_openai import OpenAIEmbeddings
 from langchain.chat_models import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.chains import RetrievalQA
+from langchain_core.documents import Document
+from vector_index import LocalVectorIndex, DEFAULT_INDEX_DIR
 from ragas.langchain.evalchain import RagasEvaluatorChain
 from ragas.metrics import faithfulness, answer_relevancy, context_recall, context_relevancy
-from ragas.langchain.evalchain import RagasEvaluatorChain
+from evaluation_runner import EvaluationRunner
+
+METRICS = (faithfulness, answer_relevancy, context_recall, context_relevancy)
 
 class Ragas:
-    def __init__(self):
-        # Initialize Weaviate, embeddings, and other necessary components
-        auth_config = weaviate.AuthApiKey(api_key=os.environ.get("WEAVIATE_API_KEY"))
-        weaviate_client =  weaviate.Client(
-            url=os.environ.get("WEAVIATE_URL"),
-            auth_client_secret=auth_config
-        )
+    def __init__(self, index_name: str = "RaptorContractdocx"):
+        # Initialize Weaviate, embeddings, and other necessary components; index_name selects the document
         embeddings = OpenAIEmbeddings(api_key=os.environ.get("OPENAI_API_KEY"))
-        attributes = {
-            'client': weaviate_client,
-            'index_name': "RaptorContractdocx",
-            'embedding': embeddings,
-            'text_key': 'text',
-            'by_text': False
-        }
-        self.instance = Weaviate(**attributes)
+        if os.environ.get("VECTOR_BACKEND", "weaviate") == "local":
+            self.instance = LocalVectorIndex(os.path.join(DEFAULT_INDEX_DIR, index_name), embeddings)
+        else:
+            auth_config = weaviate.AuthApiKey(api_key=os.environ.get("WEAVIATE_API_KEY"))
+            weaviate_client =  weaviate.Client(
+                url=os.environ.get("WEAVIATE_URL"),
+                auth_client_secret=auth_config
+            )
+            attributes = {
+                'client': weaviate_client,
+                'index_name': index_name,
+                'embedding': embeddings,
+                'text_key': 'text',
+                'by_text': False
+            }
+            self.instance = Weaviate(**attributes)
 
         # Define LLM
         self.llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0)
@@ -42,18 +50,51 @@ class Ragas:
         """
         self.prompt = ChatPromptTemplate.from_template(template)
 
-    def run_qa(self, examples):
+    @functools.cached_property
+    def qa(self):
         # Set up RetrievalQA
-        qa = RetrievalQA.from_chain_type(llm=self.llm,
-                                         chain_type="stuff",  # <-- Fill in the correct chain type
-                                         chain_type_kwargs={"prompt": self.prompt},
-                                         retriever=self.instance.as_retriever(),
-                                         return_source_documents=True)
+        return RetrievalQA.from_chain_type(llm=self.llm,
+                                           chain_type="stuff",  # <-- Fill in the correct chain type
+                                           chain_type_kwargs={"prompt": self.prompt},
+                                           retriever=self.instance.as_retriever(),
+                                           return_source_documents=True)
 
+    def run_qa(self, examples):
         # Run QA for the provided examples
-        predictions = qa.batch(examples)
+        predictions = self.qa.batch(examples)
         return predictions
 
+    def answer(self, question):
+        """
+        Answer one question with the QA chain.
+
+        Parameters:
+            question (str): Question.
+
+        Returns:
+            tuple: (answer text, texts of the retrieved source documents).
+        """
+        result = self.qa.invoke({"query": question})
+        return result['result'], [document.page_content for document in result['source_documents']]
+
+    def metric_functions(self):
+        """
+        Wrap every RAGAS metric as a function of one example, for EvaluationRunner.
+
+        Returns:
+            dict: Metric name -> callable(question, answer, contexts, ground_truths) returning the score.
+        """
+        def metric_function(metric):
+            chain = RagasEvaluatorChain(metric=metric)
+
+            def score(question, answer, contexts, ground_truths):
+                result = chain({"query": question, "result": answer, "ground_truths": ground_truths,
+                                "source_documents": [Document(page_content=context) for context in contexts]})
+                return result[f"{metric.name}_score"]
+            return score
+
+        return {metric.name: metric_function(metric) for metric in METRICS}
+
     def evaluate_metrics(self, result):
         # Create evaluation chains
         faithfulness_chain = RagasEvaluatorChain(metric=faithfulness)
@@ -80,31 +121,25 @@ class Ragas:
                         "No"]
 
         examples = [
-            {"query": q, "ground_truths": [ground_truths[i]]}
+            {"id": str(i), "question": q, "ground_truths": [ground_truths[i]]}
             for i, q in enumerate(questions)
         ]
 
-        # Run QA
-        predictions = self.run_qa(examples)
-        
+        # Answers and the four metrics of every answer run concurrently; larger sets use src/evaluation_runner.py
+        rows = EvaluationRunner(self.answer, self.metric_functions()).run(examples)
         results_list = []
-
-        # Evaluate metrics
-        
-        for i, result in enumerate(predictions):
-            faithfulness_score, context_recall_score, answer_rel_score, context_relevancy_score = self.evaluate_metrics(result)
+        for result in sorted(rows, key=lambda row: int(row['id'])):
             results_list.append({
-                "Question": result.get('query'),
-                "Context": result.get('source_documents'),  
-                "Ground_Truth": result.get('ground_truths'),
-                "Answer": result.get('result'),
-                "Faithfulness_Score": faithfulness_score,
-                "Context_Recall_Score": context_recall_score,
-                "Answer_Relevancy_Score": answer_rel_score,
-                "Context_Relevancy_Score": context_relevancy_score
+                "Question": result['question'],
+                "Context": result['contexts'],
+                "Ground_Truth": result['ground_truths'],
+                "Answer": result['answer'],
+                "Faithfulness_Score": result.get('faithfulness'),
+                "Context_Recall_Score": result.get('context_recall'),
+                "Answer_Relevancy_Score": result.get('answer_relevancy'),
+                "Context_Relevancy_Score": result.get('context_relevancy')
             })
-            
-            
+
         return pd.DataFrame(results_list)
 
 if __name__ == "__main__":
@@ -0,0 +1,171 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+DEFAULT_MODEL = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def load_cross_encoder(model_name: str = DEFAULT_MODEL, backend: str = 'torch', num_threads: int = None):
+    """
+    Return a process-wide cross-encoder, loading the weights only once.
+
+    Parameters:
+        model_name (str): Name of the cross-encoder model.
+        backend (str): 'torch' runs sentence_transformers.CrossEncoder; 'onnx' runs the
+            int8-quantized ONNX export of the same model (see onnx_reranker.py).
+        num_threads (int): Threads per forward pass of the ONNX backend (default one per core).
+
+    Returns:
+        CrossEncoder | ONNXCrossEncoder: Shared model instance.
+    """
+    key = (model_name, backend, num_threads)
+    with _models_lock:
+        if key not in _models:
+            if backend == 'torch':
+                from sentence_transformers import CrossEncoder
+                _models[key] = CrossEncoder(model_name)
+            elif backend == 'onnx':
+                from onnx_reranker import ONNXCrossEncoder, onnx_dir
+                _models[key] = ONNXCrossEncoder(onnx_dir(model_name), num_threads=num_threads)
+            else:
+                raise ValueError(f"Unknown reranker backend: {backend}")
+        return _models[key]
+
+
+def top_k(scores, k: int) -> np.ndarray:
+    """
+    Return the indices of the k highest scores, best first.
+
+    Uses np.argpartition so only the selected k scores are sorted.
+
+    Parameters:
+        scores: Sequence of scores.
+        k (int): Number of indices to return.
+
+    Returns:
+        np.ndarray: Indices into scores.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+class Reranker:
+    """Shared cross-encoder reranker with batching and a (query, passage) score cache."""
+
+    def __init__(self, model=None, model_name: str = DEFAULT_MODEL, batch_size: int = 32, num_workers: int = 1, cache_size: int = 4096,
+                 backend: str = 'torch', num_threads: int = None):
+        """
+        Initialize the Reranker instance.
+
+        Parameters:
+            model: Object with a CrossEncoder compatible predict(pairs, batch_size=...)
+                method (default loads the shared model on first use).
+            model_name (str): Model loaded when no model is given.
+            batch_size (int): Number of pairs per forward pass.
+            num_workers (int): Threads used to score batches in parallel on CPU.
+            cache_size (int): Maximum number of cached (query, passage) scores.
+            backend (str): 'torch' or 'onnx' (int8-quantized export, see load_cross_encoder).
+            num_threads (int): Threads per forward pass of the ONNX backend.
+        """
+        self._model = model
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.cache_size = cache_size
+        self.backend = backend
+        self.num_threads = num_threads
+        self.pairs_scored = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=num_workers) if num_workers > 1 else None
+
+    @property
+    def model(self):
+        """Cross-encoder model, loaded on first use."""
+        if self._model is None:
+            self._model = load_cross_encoder(self.model_name, self.backend, self.num_threads)
+        return self._model
+
+    def score(self, query: str, passages: list) -> np.ndarray:
+        """
+        Score passages against a query.
+
+        Duplicate passages and pairs already in the cache are scored only once;
+        the remaining pairs go through the model in batches.
+
+        Parameters:
+            query (str): Query text.
+            passages (list): Passage texts.
+
+        Returns:
+            np.ndarray: One score per passage, in input order.
+        """
+        unique = list(dict.fromkeys(passages))
+        scores = {}
+        missing = []
+        with self._lock:
+            for passage in unique:
+                cached = self._cache.get((query, passage))
+                if cached is None:
+                    missing.append(passage)
+                else:
+                    self._cache.move_to_end((query, passage))
+                    scores[passage] = cached
+
+        if missing:
+            batches = [[[query, passage] for passage in missing[i:i + self.batch_size]] for i in range(0, len(missing), self.batch_size)]
+            if self._executor is not None and len(batches) > 1:
+                batch_scores = list(self._executor.map(self._predict, batches))
+            else:
+                batch_scores = [self._predict(batch) for batch in batches]
+            new_scores = np.concatenate(batch_scores)
+
+            with self._lock:
+                self.pairs_scored += len(missing)
+                for passage, value in zip(missing, new_scores):
+                    value = float(value)
+                    scores[passage] = value
+                    self._cache[(query, passage)] = value
+                    self._cache.move_to_end((query, passage))
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return np.array([scores[passage] for passage in passages], dtype=np.float64)
+
+    def rank(self, query: str, passages: list, k: int = None) -> list:
+        """
+        Rank passages against a query.
+
+        Parameters:
+            query (str): Query text.
+            passages (list): Passage texts.
+            k (int): Number of indices to return (default all).
+
+        Returns:
+            list: Indices of the k best passages, best first.
+        """
+        k = len(passages) if k is None else k
+        return top_k(self.score(query, passages), k).tolist()
+
+    def _predict(self, pairs: list) -> np.ndarray:
+        """
+        Run one batch of pairs through the model.
+
+        Parameters:
+            pairs (list): [query, passage] pairs.
+
+        Returns:
+            np.ndarray: Scores of the pairs.
+        """
+        return np.asarray(self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False), dtype=np.float64).reshape(-1)
@@ -1,14 +1,19 @@
-import os
-import re
-from openai import OpenAI
-from sentence_transformers import CrossEncoder
-from langchain_community.document_loaders import UnstructuredPDFLoader
-import numpy as np
+import asyncio
+from document_cache import DocumentCache
+from reranker import Reranker, top_k
+from concurrent_evaluation import ConcurrentEvaluator, AsyncConcurrentEvaluator
+from keyword_index import KeywordIndex
+from keyword_extractor import LocalKeywordExtractor
+from hybrid import HybridRetriever, where_filter
 from evaluation import Evaluation
 from generation import Generation
+import tracing
 
 class Retriever:
-    def __init__(self, file_path, eval_path, weviate_instance, model_name):
+    def __init__(self, file_path, eval_path, weviate_instance, model_name, document_cache=None, reranker=None,
+                 max_concurrency=6, evaluation_timeout=15.0, stop_after=None,
+                 keyword_mode='llm', keyword_confidence=0.5, max_candidates=20, evaluate_k=6, fusion_weights=None,
+                 sufficiency=None, context_assembler=None):
         """
         Initialize Retriever class.
 
@@ -17,49 +22,232 @@ class Retriever:
             eval_path (str): Path to the evaluation file.
             weviate_instance: Instance of Weaviate.
             model_name (str): Name of the model.
+            document_cache (DocumentCache): Cache of parsed documents (default DocumentCache()).
+            reranker (Reranker): Shared cross-encoder reranker (default Reranker()).
+            max_concurrency (int): Maximum number of sufficiency checks in flight.
+            evaluation_timeout (float): Seconds a single sufficiency check may take.
+            stop_after (int): Stop checking once this many passages are 'true' (default check all).
+            keyword_mode (str): 'llm' asks the model for a keyword; 'local' picks it from the
+                question with document term weights and only asks the model below keyword_confidence.
+            keyword_confidence (float): Minimum confidence of a local keyword.
+            max_candidates (int): Fused keyword and vector candidates sent to reranking.
+            evaluate_k (int): Best reranked candidates sent to the sufficiency check.
+            fusion_weights (dict): Reciprocal-rank fusion weight of the 'lexical' and 'vector' sources.
+            sufficiency (SufficiencyClassifier): Decide sufficiency from the rerank score and only
+                ask the LLM about uncertain scores (default LLM check for every candidate).
+            context_assembler (ContextAssembler): Deduplication and token budget of the answer
+                context (default Generation's).
         """
-        self.cross_encoder = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
-        self.data = UnstructuredPDFLoader(file_path).load()
-        self.file_content = self._read_file(eval_path)
+        from langchain_community.document_loaders import UnstructuredPDFLoader
+        from langchain_core.documents import Document
+
+        self.reranker = reranker if reranker is not None else Reranker()
+        if sufficiency is not None and sufficiency.model_name not in (None, self.reranker.model_name):
+            raise ValueError(f"sufficiency thresholds were fitted for {sufficiency.model_name}, not {self.reranker.model_name}")
+        self.sufficiency = sufficiency
+        self.cross_encoder = self.reranker.model
+        self.document_cache = document_cache if document_cache is not None else DocumentCache()
+        with tracing.span('pdf_load') as stage:
+            self.document = self.document_cache.load(file_path, UnstructuredPDFLoader)
+            stage.set(pages=len(self.document.pages), paragraphs=len(self.document.paragraphs))
+        self.data = [Document(page_content=page) for page in self.document.pages]
+        self.paragraphs = self.document.paragraphs
+        self.keyword_index = KeywordIndex(self.paragraphs)
+        self.keyword_extractor = LocalKeywordExtractor(self.keyword_index) if keyword_mode == 'local' else None
+        self.keyword_confidence = keyword_confidence
         self.weaviate_instance = weviate_instance
-        self.evaluation = Evaluation()
-        self.generation = Generation(model_name)
+        self.generation = Generation(model_name, context_assembler=context_assembler)
+        self.eval_path = eval_path
+        self.generation.prompts.load(eval_path)
+        self.evaluation = Evaluation(self.generation, self.reranker)
+        self.evaluation_timeout = evaluation_timeout
+        self.stop_after = stop_after
+        self.evaluator = ConcurrentEvaluator(self._evaluate_passage, max_concurrency=max_concurrency, timeout=evaluation_timeout)
+        self.async_evaluator = AsyncConcurrentEvaluator(self._aevaluate_passage, max_concurrency=max_concurrency, timeout=evaluation_timeout)
+        self.evaluate_k = evaluate_k
+        self.hybrid = HybridRetriever(
+            lexical_search=self._find_matching_documents,
+            vector_search=self._vector_search,
+            weights=fusion_weights,
+            max_candidates=max_candidates,
+        )
         
         
-    def _read_file(self, file_path):
+    @property
+    def file_content(self):
+        """Compiled sufficiency prompt; looked up on use so hot reload applies."""
+        return self.generation.prompts.load(self.eval_path)
+
+    @property
+    def keyword_prompt(self):
+        """Compiled keyword prompt from src/prompts/keywords.txt."""
+        return self.generation.prompts.get('keywords')
+
+    def retrieve_query(self, query, progress=None, filters=None):
         """
-        Read contents of a file.
+        Evaluate a query.
 
         Parameters:
-            file_path (str): Path to the file.
+            query (str): Query to be evaluated.
+            progress (callable): Called as progress(stage, details) after each
+                retrieval stage (default no reporting).
+            filters (dict): Chunk metadata every passage must have, e.g. {'section': '2.1'}
+                or {'page': 3}; only the vector search runs then (default none).
 
         Returns:
-            str: Contents of the file.
+            list: List of relevant documents.
         """
-        with open(file_path, 'r') as file:
-            return file.read() 
+        progress = progress or (lambda stage, details: None)
+
+        with tracing.span('retrieval') as retrieval:
+            # Keyword and vector search run in parallel and are fused into one deduplicated list
+            results = self.hybrid.gather(query, filters)
+            progress('keyword_match', {'matches': len(results['lexical'])})
+            progress('vector_search', {'results': len(results['vector'])})
+            candidates = self.hybrid.fuse(results)
+            progress('fusion', {'candidates': len(candidates)})
+            retrieval.set(candidates=len(candidates))
+
+            if not candidates:
+                return []
+
+            with tracing.span('rerank', candidates=len(candidates)):
+                scores = self.reranker.score(query, [getattr(candidate, 'page_content', candidate) for candidate in candidates])
+            progress('rerank', {'candidates': len(candidates)})
+
+            # All sufficiency checks for the query run concurrently, best reranked first
+            selected, selected_scores = self._top_candidates(candidates, scores, k=self.evaluate_k, with_scores=True)
+            true_values = self._evaluate_candidates(query, selected, selected_scores)
+            progress('evaluation', {'checked': len(selected), 'relevant': len(true_values)})
+            retrieval.set(evaluated=len(selected), relevant=len(true_values))
 
-    def retrieve_query(self, query):
+        return true_values
+
+    async def aretrieve_query(self, query, progress=None, filters=None):
         """
-        Evaluate a query.
+        Async version of retrieve_query for the ASGI app.
+
+        OpenAI calls go through the pooled async client; the vector store's
+        asimilarity_search and the CPU-bound reranking run off the event loop.
 
         Parameters:
             query (str): Query to be evaluated.
+            progress (callable): Called as progress(stage, details) after each retrieval stage.
+            filters (dict): Chunk metadata every passage must have (default none).
 
         Returns:
             list: List of relevant documents.
         """
-        true_values = []
-        matching_documents = self._find_matching_documents(query)
+        progress = progress or (lambda stage, details: None)
+
+        with tracing.span('retrieval') as retrieval:
+            if filters:
+                # Keyword matches carry no page or section, like HybridRetriever.gather
+                lexical, vector = [], await self._avector_search(query, self.hybrid.vector_k, filters)
+            else:
+                lexical, vector = await asyncio.gather(
+                    self._afind_matching_documents(query),
+                    self._avector_search(query, self.hybrid.vector_k),
+                )
+            progress('keyword_match', {'matches': len(lexical)})
+            progress('vector_search', {'results': len(vector)})
+            candidates = self.hybrid.fuse({'lexical': lexical, 'vector': vector})
+            progress('fusion', {'candidates': len(candidates)})
+            retrieval.set(candidates=len(candidates))
 
-        if not matching_documents:
-            return true_values
+            if not candidates:
+                return []
 
-        true_values.extend(self._evaluate_matching_documents(query, matching_documents))
-        true_values.extend(self._evaluate_similar_documents(query))
+            passages = [getattr(candidate, 'page_content', candidate) for candidate in candidates]
+            with tracing.span('rerank', candidates=len(candidates)):
+                scores = await asyncio.to_thread(self.reranker.score, query, passages)
+            progress('rerank', {'candidates': len(candidates)})
+
+            selected, selected_scores = self._top_candidates(candidates, scores, k=self.evaluate_k, with_scores=True)
+            passages = [getattr(candidate, 'page_content', candidate) for candidate in selected]
+            if self.sufficiency is None:
+                classifications = await self.async_evaluator.classify(query, passages, stop_after=self.stop_after)
+            else:
+                with tracing.span('sufficiency_local', candidates=len(selected)) as stage:
+                    classifications = await self.sufficiency.aresolve(
+                        selected_scores,
+                        lambda indices, stop_after: self.async_evaluator.classify(query, [passages[i] for i in indices], stop_after=stop_after),
+                        stop_after=self.stop_after)
+                    stage.set(uncertain=sum(self.sufficiency.classify(score) is None for score in selected_scores))
+            true_values = [[candidate] for candidate, classification in zip(selected, classifications) if classification == 'true']
+            progress('evaluation', {'checked': len(selected), 'relevant': len(true_values)})
+            retrieval.set(evaluated=len(selected), relevant=len(true_values))
 
         return true_values
 
+    def _vector_search(self, query, k, filters=None):
+        """
+        Search the vector store.
+
+        Parameters:
+            query (str): User question.
+            k (int): Number of results.
+            filters (dict): Chunk metadata every result must have (default none).
+
+        Returns:
+            list: LangChain documents, most similar first.
+        """
+        with tracing.span('vector_search', k=k) as stage:
+            results = self.weaviate_instance.similarity_search(query=query, k=k, where_filter=where_filter(filters))
+            stage.set(results=len(results))
+        return results
+
+    async def _avector_search(self, query, k, filters=None):
+        """
+        Async version of _vector_search.
+
+        Parameters:
+            query (str): User question.
+            k (int): Number of results.
+            filters (dict): Chunk metadata every result must have (default none).
+
+        Returns:
+            list: LangChain documents, most similar first.
+        """
+        with tracing.span('vector_search', k=k) as stage:
+            results = await self.weaviate_instance.asimilarity_search(query, k=k, where_filter=where_filter(filters))
+            stage.set(results=len(results))
+        return results
+
+    def _match_keyword(self, keyword):
+        """
+        Look a keyword up in the BM25 index.
+
+        Parameters:
+            keyword (str): Keyword to match.
+
+        Returns:
+            list: Matching paragraphs, best BM25 match first.
+        """
+        with tracing.span('keyword_match') as stage:
+            matching_documents = self.keyword_index.matching_paragraphs(keyword)
+            stage.set(matches=len(matching_documents))
+        return matching_documents
+
+    def _match_local_keyword(self, query):
+        """
+        Match the keyword of the local extractor, when it is confident enough.
+
+        Parameters:
+            query (str): Query to extract the keyword from.
+
+        Returns:
+            list: Matching paragraphs, best BM25 match first; empty without a
+                local extractor or a confident keyword.
+        """
+        if self.keyword_extractor is None:
+            return []
+        with tracing.span('keyword_extraction', mode='local'):
+            keyword, confidence = self.keyword_extractor.extract(query)
+        if keyword is None or confidence < self.keyword_confidence:
+            return []
+        return self._match_keyword(keyword)
+
     def _find_matching_documents(self, query):
         """
         Find matching documents for a given query.
@@ -68,61 +256,109 @@ class Retriever:
             query (str): Query to search for matching documents.
 
         Returns:
-            list: List of matching documents.
+            list: List of matching documents, best BM25 match first.
         """
-        file = self._read_file('./prompts/keywords.txt')
+        matching_documents = self._match_local_keyword(query)
+        if matching_documents:
+            return matching_documents
+
         attempts = 3
         for attempt in range(attempts):
-            keyword = self.generation.get_keyword(file,query)
-            matching_documents = [doc for doc in self.data[0].page_content.split("\n\n") if re.search(re.escape(keyword), doc, re.IGNORECASE)]
+            with tracing.span('keyword_extraction', mode='llm'):
+                keyword = self.generation.get_keyword(self.keyword_prompt, query)
+            matching_documents = self._match_keyword(keyword)
             if matching_documents:
                 return matching_documents
         return []
 
-    def _evaluate_matching_documents(self, query, matching_documents):
+    async def _afind_matching_documents(self, query):
         """
-        Evaluate matching documents for a given query.
+        Async version of _find_matching_documents.
 
         Parameters:
-            query (str): Query to be evaluated.
-            matching_documents (list): List of matching documents.
+            query (str): Query to search for matching documents.
 
         Returns:
-            list: List of relevant matching documents.
+            list: List of matching documents, best BM25 match first.
         """
-        true_values = []
-        match_pairs = [[query, doc] for doc in matching_documents]
-        scores = self.cross_encoder.predict(match_pairs)
-        match_scores = [o for o in np.argsort(scores)[::-1]]
-        
-        for i in match_scores[0:3]:
-            if i < len(matching_documents):
-                classification = self.evaluation.evaluate(self.file_content, query, matching_documents[i])
-                if classification == 'true':
-                    true_values.append([matching_documents[i]])
+        matching_documents = self._match_local_keyword(query)
+        if matching_documents:
+            return matching_documents
 
-        return true_values
+        attempts = 3
+        for attempt in range(attempts):
+            with tracing.span('keyword_extraction', mode='llm'):
+                keyword = await self.generation.aget_keyword(self.keyword_prompt, query)
+            matching_documents = self._match_keyword(keyword)
+            if matching_documents:
+                return matching_documents
+        return []
+
+    def _top_candidates(self, documents, scores, k=3, with_scores=False):
+        """
+        Select the best scored documents.
+
+        Parameters:
+            documents (list): Passages or LangChain documents.
+            scores (np.ndarray): Cross-encoder score of every document.
+            k (int): Number of documents to keep.
+            with_scores (bool): Also return the scores of the kept documents.
 
-    def _evaluate_similar_documents(self, query):
+        Returns:
+            list: The k best documents, best first (and their scores with with_scores).
         """
-        Evaluate similar documents for a given query.
+        indices = [i for i in top_k(scores, k) if i < len(documents)]
+        if with_scores:
+            return [documents[i] for i in indices], [float(scores[i]) for i in indices]
+        return [documents[i] for i in indices]
+
+    def _evaluate_candidates(self, query, candidates, scores=None):
+        """
+        Run the sufficiency check on all candidates concurrently.
 
         Parameters:
             query (str): Query to be evaluated.
+            candidates (list): Passages or LangChain documents, best first.
+            scores (list): Rerank scores of the candidates, used by the local sufficiency classifier.
 
         Returns:
-            list: List of relevant similar documents.
+            list: Relevant candidates in ranked order, each wrapped in a list.
+        """
+        passages = [getattr(candidate, 'page_content', candidate) for candidate in candidates]
+        if self.sufficiency is None or scores is None:
+            classifications = self.evaluator.classify(query, passages, stop_after=self.stop_after)
+        else:
+            # Confident scores are decided locally; only the uncertain band costs an LLM call
+            with tracing.span('sufficiency_local', candidates=len(candidates)) as stage:
+                classifications = self.sufficiency.resolve(
+                    scores,
+                    lambda indices, stop_after: self.evaluator.classify(query, [passages[i] for i in indices], stop_after=stop_after),
+                    stop_after=self.stop_after)
+                stage.set(uncertain=sum(self.sufficiency.classify(score) is None for score in scores))
+        return [[candidate] for candidate, classification in zip(candidates, classifications) if classification == 'true']
+
+    def _evaluate_passage(self, query, passage):
         """
-        true_values = []
-        ans = self.weaviate_instance.similarity_search(query=query, k=10)
-        pairs = [[query, doc.page_content] for doc in ans]
-        scores = self.cross_encoder.predict(pairs)
-        db_scores = [o for o in np.argsort(scores)[::-1]]
+        Check whether a passage holds enough context to answer the query.
 
-        for i in db_scores[0:3]:
-            if i < len(ans):
-                classification = self.evaluation.evaluate(self.file_content, query, ans[i].page_content)
-                if classification == 'true':
-                    true_values.append([ans[i]])
+        Parameters:
+            query (str): Query to be evaluated.
+            passage (str): Passage text.
 
-        return true_values
+        Returns:
+            str: 'true' or 'false'.
+        """
+        return self.evaluation.evaluate(self.file_content, query, passage, timeout=self.evaluation_timeout)
+
+    async def _aevaluate_passage(self, query, passage):
+        """
+        Async version of _evaluate_passage.
+
+        Parameters:
+            query (str): Query to be evaluated.
+            passage (str): Passage text.
+
+        Returns:
+            str: 'true' or 'false'.
+        """
+        return await self.evaluation.aevaluate(self.file_content, query, passage, timeout=self.evaluation_timeout)
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution.
+
+    The first caller of a key runs the function; callers arriving while it is
+    in flight wait for it and receive the same result or exception. Nothing is
+    kept once the call finishes, so this deduplicates work in progress and is
+    no cache: a later call runs again.
+    """
+
+    def __init__(self):
+        """Initialize the SingleFlight instance."""
+        self.executed = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Run function(*args, **kwargs) unless a call with the same key is in flight.
+
+        Parameters:
+            key: Hashable identity of the call.
+            function (callable): Produces the result.
+            *args, **kwargs: Arguments of function.
+
+        Returns:
+            Result of the call, shared by every caller of the key.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def ado(self, key, function, *args, **kwargs):
+        """
+        Async version of do; function is a coroutine function.
+
+        The call runs as a task of the running loop and callers wait on it
+        shielded: a cancelled caller (e.g. a disconnected client or a check
+        stopped early) leaves the call running for the others, and the call is
+        only cancelled once every caller of it was.
+
+        Parameters:
+            key: Hashable identity of the call.
+            function (callable): Coroutine function producing the result.
+            *args, **kwargs: Arguments of function.
+
+        Returns:
+            Result of the call, shared by every caller of the key.
+        """
+        # Tasks belong to one event loop, so calls are only coalesced within a loop
+        task_key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            call = self._tasks.get(task_key)
+            if call is None:
+                # [task, callers waiting on it]
+                call = self._tasks[task_key] = [asyncio.ensure_future(function(*args, **kwargs)), 0]
+                call[0].add_done_callback(lambda task: self._forget(task_key, call))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+            call[1] += 1
+        try:
+            return await asyncio.shield(call[0])
+        finally:
+            with self._lock:
+                call[1] -= 1
+                abandoned = call[1] == 0 and not call[0].done()
+                if abandoned and self._tasks.get(task_key) is call:
+                    del self._tasks[task_key]
+            if abandoned:
+                call[0].cancel()
+
+    def stats(self) -> dict:
+        """
+        Report how many calls ran and how many waited on a call in flight.
+
+        Returns:
+            dict: Executed and coalesced call counts.
+        """
+        with self._lock:
+            return {'executed': self.executed, 'coalesced': self.coalesced}
+
+    def _forget(self, task_key, call: list):
+        with self._lock:
+            if self._tasks.get(task_key) is call:
+                del self._tasks[task_key]
+        # Mark the exception retrieved, so a failure whose callers were all cancelled is not logged as lost
+        if not call[0].cancelled():
+            call[0].exception()
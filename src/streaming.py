@@ -0,0 +1,135 @@
+import asyncio
+import json
+import queue
+import threading
+import tracing
+from context_assembly import SEPARATOR
+
+_DONE = object()
+
+
+def format_event(event: str, data) -> str:
+    """
+    Format one Server-Sent Event.
+
+    Parameters:
+        event (str): Event name.
+        data: JSON serialisable payload.
+
+    Returns:
+        str: Event in text/event-stream framing.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_answer(retriever, generation, question: str):
+    """
+    Answer a question as a stream of Server-Sent Events.
+
+    Emits 'status' immediately, a 'progress' event after each retrieval stage,
+    the assembled passages sent to the model as 'context', every answer delta as 'token' and the
+    full answer as 'done'. Failures are reported as an 'error' event.
+
+    Parameters:
+        retriever: Retriever bound to the document.
+        generation: Generation instance used to write the answer.
+        question (str): User question.
+
+    Yields:
+        str: Formatted events.
+    """
+    yield format_event('status', {'stage': 'retrieving'})
+
+    events = queue.Queue()
+    result = {}
+
+    def retrieve():
+        try:
+            result['context'] = retriever.retrieve_query(question, progress=lambda stage, details: events.put((stage, details)))
+        except Exception as e:
+            result['error'] = e
+        finally:
+            events.put(_DONE)
+
+    threading.Thread(target=retrieve, daemon=True).start()
+    while True:
+        item = events.get()
+        if item is _DONE:
+            break
+        stage, details = item
+        yield format_event('progress', {'stage': stage, **details})
+
+    if 'error' in result:
+        yield format_event('error', {'error': f"An error occurred: {str(result['error'])}"})
+        return
+
+    passages = generation.assemble(result['context'])
+    yield format_event('context', {'passages': passages})
+
+    # Timed by hand: a span's context would leak into the consumer across yields
+    stage, answer = tracing.Span('generation', {'context_chars': sum(len(passage) for passage in passages)}), []
+    try:
+        for token in generation.stream_answer(context=SEPARATOR.join(passages), question=question):
+            answer.append(token)
+            yield format_event('token', {'token': token})
+    except Exception as e:
+        stage.error = type(e).__name__
+        yield format_event('error', {'error': f"An error occurred: {str(e)}"})
+        return
+    finally:
+        stage.finish()
+
+    yield format_event('done', {'result': ''.join(answer)})
+
+
+async def astream_answer(retriever, generation, question: str):
+    """
+    Async version of stream_answer; emits the same events.
+
+    Retrieval runs as a task on the event loop and reports progress through an
+    asyncio queue, so no thread is held per stream.
+
+    Parameters:
+        retriever: Retriever bound to the document.
+        generation: Generation instance used to write the answer.
+        question (str): User question.
+
+    Yields:
+        str: Formatted events.
+    """
+    yield format_event('status', {'stage': 'retrieving'})
+
+    events = asyncio.Queue()
+    retrieval = asyncio.ensure_future(retriever.aretrieve_query(question, progress=lambda stage, details: events.put_nowait((stage, details))))
+    retrieval.add_done_callback(lambda _: events.put_nowait(_DONE))
+    try:
+        while True:
+            item = await events.get()
+            if item is _DONE:
+                break
+            stage, details = item
+            yield format_event('progress', {'stage': stage, **details})
+    finally:
+        # The client went away before retrieval finished
+        retrieval.cancel()
+
+    if retrieval.exception() is not None:
+        yield format_event('error', {'error': f"An error occurred: {str(retrieval.exception())}"})
+        return
+
+    passages = generation.assemble(retrieval.result())
+    yield format_event('context', {'passages': passages})
+
+    stage, answer = tracing.Span('generation', {'context_chars': sum(len(passage) for passage in passages)}), []
+    try:
+        async for token in generation.astream_answer(context=SEPARATOR.join(passages), question=question):
+            answer.append(token)
+            yield format_event('token', {'token': token})
+    except Exception as e:
+        stage.error = type(e).__name__
+        yield format_event('error', {'error': f"An error occurred: {str(e)}"})
+        return
+    finally:
+        stage.finish()
+
+    yield format_event('done', {'result': ''.join(answer)})
@@ -0,0 +1,221 @@
+import argparse
+import csv
+import json
+import os
+import numpy as np
+
+DEFAULT_CALIBRATION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cache', 'sufficiency.json')
+
+
+class SufficiencyClassifier:
+    """Decide passage sufficiency from the cross-encoder score computed during reranking.
+
+    Scores at or above `high` are 'true', scores at or below `low` are 'false'
+    and only the scores in between are sent to the LLM check. A bound of None
+    never decides locally on that side.
+    """
+
+    def __init__(self, low: float = None, high: float = None, model_name: str = None, stats: dict = None):
+        """
+        Initialize the SufficiencyClassifier instance.
+
+        Parameters:
+            low (float): Highest score classified 'false' without the LLM.
+            high (float): Lowest score classified 'true' without the LLM.
+            model_name (str): Cross-encoder the thresholds were fitted for.
+            stats (dict): Calibration statistics, kept for reporting.
+        """
+        if low is not None and high is not None and low >= high:
+            raise ValueError(f"low threshold {low} must be below high threshold {high}")
+        self.low = low
+        self.high = high
+        self.model_name = model_name
+        self.stats = stats or {}
+
+    def classify(self, score: float):
+        """
+        Classify one reranker score.
+
+        Parameters:
+            score (float): Cross-encoder score of a (question, passage) pair.
+
+        Returns:
+            str | None: 'true', 'false', or None when the LLM has to decide.
+        """
+        if self.high is not None and score >= self.high:
+            return 'true'
+        if self.low is not None and score <= self.low:
+            return 'false'
+        return None
+
+    def resolve(self, scores: list, fallback, stop_after: int = None) -> list:
+        """
+        Classify ranked candidates, asking fallback only about the uncertain ones.
+
+        Parameters:
+            scores (list): Reranker score of every candidate, best first.
+            fallback (callable): Called as fallback(indices, stop_after) with the uncertain
+                candidate indices; returns 'true'/'false'/None per index, like ConcurrentEvaluator.classify.
+            stop_after (int): Number of 'true' candidates after which to stop (default evaluate all).
+
+        Returns:
+            list: 'true' or 'false' per candidate, or None for checks skipped by stop_after.
+        """
+        results = [self.classify(float(score)) for score in scores]
+        uncertain = [i for i, result in enumerate(results) if result is None]
+        remaining = None if stop_after is None else stop_after - results.count('true')
+        if uncertain and (remaining is None or remaining > 0):
+            for index, result in zip(uncertain, fallback(uncertain, remaining)):
+                results[index] = result
+        return results
+
+    async def aresolve(self, scores: list, fallback, stop_after: int = None) -> list:
+        """
+        Async version of resolve; fallback is a coroutine function.
+
+        Returns:
+            list: 'true' or 'false' per candidate, or None for checks skipped by stop_after.
+        """
+        results = [self.classify(float(score)) for score in scores]
+        uncertain = [i for i, result in enumerate(results) if result is None]
+        remaining = None if stop_after is None else stop_after - results.count('true')
+        if uncertain and (remaining is None or remaining > 0):
+            for index, result in zip(uncertain, await fallback(uncertain, remaining)):
+                results[index] = result
+        return results
+
+    def to_dict(self) -> dict:
+        return {'low': self.low, 'high': self.high, 'model_name': self.model_name, 'stats': self.stats}
+
+    def save(self, path: str = DEFAULT_CALIBRATION_PATH):
+        """
+        Write the thresholds as JSON.
+
+        Parameters:
+            path (str): Output file.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_CALIBRATION_PATH) -> 'SufficiencyClassifier':
+        """
+        Read thresholds written by save.
+
+        Parameters:
+            path (str): Calibration file.
+
+        Returns:
+            SufficiencyClassifier: Classifier with the stored thresholds.
+        """
+        with open(path, 'r') as file:
+            data = json.load(file)
+        return cls(data.get('low'), data.get('high'), data.get('model_name'), data.get('stats'))
+
+
+def calibrate(scores, labels, target_precision: float = 0.95, min_support: int = 5, model_name: str = None) -> SufficiencyClassifier:
+    """
+    Fit the thresholds against labeled examples.
+
+    `high` is the lowest score above which at least target_precision of the
+    examples are sufficient, `low` the highest score below which at least
+    target_precision are insufficient; each side needs min_support examples.
+
+    Parameters:
+        scores: Cross-encoder score of every example.
+        labels: True when the passage answers the question.
+        target_precision (float): Required share of correct local decisions on each side.
+        min_support (int): Minimum number of examples decided by a threshold.
+        model_name (str): Cross-encoder the scores come from.
+
+    Returns:
+        SufficiencyClassifier: Fitted classifier; its stats hold the coverage on the examples.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels, dtype=bool)
+    if len(scores) != len(labels) or len(scores) == 0:
+        raise ValueError("calibration needs the same, non-zero number of scores and labels")
+
+    order = np.argsort(-scores, kind='stable')
+    descending, positives = scores[order], labels[order]
+    # Precision of "score >= descending[i]" for every prefix, taken at the last index of tied scores
+    precision = np.cumsum(positives) / np.arange(1, len(scores) + 1)
+    last_of_ties = np.r_[descending[1:] != descending[:-1], True]
+    high_candidates = [i for i in range(min_support - 1, len(scores)) if last_of_ties[i] and precision[i] >= target_precision]
+    high = float(descending[max(high_candidates)]) if high_candidates else None
+
+    ascending, negatives = descending[::-1], ~positives[::-1]
+    npv = np.cumsum(negatives) / np.arange(1, len(scores) + 1)
+    last_of_ties = np.r_[ascending[1:] != ascending[:-1], True]
+    low_candidates = [i for i in range(min_support - 1, len(scores)) if last_of_ties[i] and npv[i] >= target_precision]
+    low = float(ascending[max(low_candidates)]) if low_candidates else None
+
+    if low is not None and high is not None and low >= high:
+        # Overlapping ranges: only scores below high may be decided 'false'
+        below = scores[scores < high]
+        low = float(below.max()) if len(below) else None
+
+    classifier = SufficiencyClassifier(low, high, model_name)
+    decisions = [classifier.classify(score) for score in scores]
+    decided = [(decision == 'true') == label for decision, label in zip(decisions, labels) if decision is not None]
+    classifier.stats = {
+        'examples': int(len(scores)),
+        'positives': int(labels.sum()),
+        'target_precision': target_precision,
+        'coverage': len(decided) / len(scores),
+        'accuracy_when_decided': (sum(decided) / len(decided)) if decided else None,
+    }
+    return classifier
+
+
+def classifier_from_env():
+    """
+    Build the classifier selected by SUFFICIENCY_MODE ('llm' or 'local').
+
+    Returns:
+        SufficiencyClassifier | None: Thresholds from SUFFICIENCY_CALIBRATION for 'local', None for LLM-only checks.
+    """
+    if os.environ.get("SUFFICIENCY_MODE", "llm") != "local":
+        return None
+    return SufficiencyClassifier.load(os.environ.get("SUFFICIENCY_CALIBRATION", DEFAULT_CALIBRATION_PATH))
+
+
+def read_examples(path: str) -> list:
+    """
+    Read labeled examples from JSONL or CSV with question, passage and label fields.
+
+    Parameters:
+        path (str): Input file; labels may be booleans, 'true'/'false' or 1/0.
+
+    Returns:
+        list: (question, passage, label) tuples.
+    """
+    with open(path, 'r', newline='') as file:
+        rows = list(csv.DictReader(file)) if path.endswith('.csv') else [json.loads(line) for line in file if line.strip()]
+    return [(row['question'], row['passage'], str(row['label']).strip().lower() in ('true', '1', 'yes')) for row in rows]
+
+
+if __name__ == '__main__':
+    from reranker import Reranker, DEFAULT_MODEL
+
+    parser = argparse.ArgumentParser(description="Fit the local sufficiency thresholds on labeled (question, passage, label) examples.")
+    parser.add_argument('examples', help='JSONL or CSV file with question, passage and label fields')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help='Cross-encoder used by the reranker')
+    parser.add_argument('--target-precision', type=float, default=0.95)
+    parser.add_argument('--min-support', type=int, default=5)
+    parser.add_argument('--output', default=DEFAULT_CALIBRATION_PATH)
+    args = parser.parse_args()
+
+    examples = read_examples(args.examples)
+    reranker = Reranker(model_name=args.model, cache_size=0)
+    by_question = {}
+    for index, (question, passage, _) in enumerate(examples):
+        by_question.setdefault(question, []).append(index)
+    scores = np.empty(len(examples))
+    for question, indices in by_question.items():
+        scores[indices] = reranker.score(question, [examples[i][1] for i in indices])
+
+    classifier = calibrate(scores, [label for _, _, label in examples], args.target_precision, args.min_support, args.model)
+    classifier.save(args.output)
+    print(json.dumps(classifier.to_dict(), indent=2))
@@ -0,0 +1,290 @@
+import bisect
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """One timed pipeline stage with counts, token usage and child stages."""
+
+    def __init__(self, name: str, attributes: dict = None):
+        """
+        Initialize the Span instance.
+
+        Parameters:
+            name (str): Stage name, e.g. 'rerank'.
+            attributes (dict): Counts known when the stage starts.
+        """
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.children = []
+        self.error = None
+        self.start = time.time()
+        self.duration = None
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        """
+        Record counts of the stage, e.g. span.set(candidates=20).
+
+        Parameters:
+            **attributes: Attribute name -> number or string.
+        """
+        self.attributes.update(attributes)
+
+    def add_usage(self, usage):
+        """
+        Add the token usage of an OpenAI response.
+
+        Parameters:
+            usage: CompletionUsage (or None for responses without usage).
+        """
+        if usage is None:
+            return
+        self.prompt_tokens += getattr(usage, 'prompt_tokens', 0) or 0
+        self.completion_tokens += getattr(usage, 'completion_tokens', 0) or 0
+
+    def finish(self):
+        """Stop the clock and add the span to the process metrics."""
+        self.duration = time.perf_counter() - self._started
+        metrics.observe(self)
+
+    def to_dict(self) -> dict:
+        """
+        Serialise the span tree.
+
+        Returns:
+            dict: JSON serialisable span with its children.
+        """
+        span = {
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': None if self.duration is None else self.duration * 1000,
+            'attributes': self.attributes,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'children': [child.to_dict() for child in list(self.children)],
+        }
+        if self.error is not None:
+            span['error'] = self.error
+        return span
+
+
+class Trace(Span):
+    """Root span of one request; its token counts include every stage below it."""
+
+    def __init__(self, name: str, attributes: dict = None):
+        super().__init__(name, attributes)
+        self.trace_id = uuid.uuid4().hex
+
+    def to_dict(self) -> dict:
+        trace = super().to_dict()
+        trace['trace_id'] = self.trace_id
+        trace['prompt_tokens'], trace['completion_tokens'] = self.total_tokens()
+        return trace
+
+    def total_tokens(self) -> tuple:
+        """
+        Sum the token usage of the whole tree.
+
+        Returns:
+            tuple: (prompt tokens, completion tokens).
+        """
+        prompt, completion, pending = 0, 0, [self]
+        while pending:
+            span = pending.pop()
+            prompt += span.prompt_tokens
+            completion += span.completion_tokens
+            pending.extend(span.children)
+        return prompt, completion
+
+
+class MetricsRegistry:
+    """Process-wide stage metrics in the Prometheus text exposition format."""
+
+    def __init__(self, buckets: tuple = DURATION_BUCKETS):
+        """
+        Initialize the MetricsRegistry instance.
+
+        Parameters:
+            buckets (tuple): Upper bounds of the duration histogram in seconds.
+        """
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._tokens = {}
+        self._counts = {}
+        self._errors = {}
+
+    def observe(self, span: Span):
+        """
+        Add a finished span to the metrics.
+
+        Parameters:
+            span (Span): Finished span.
+        """
+        with self._lock:
+            histogram = self._durations.setdefault(span.name, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            histogram[0][bisect.bisect_left(self.buckets, span.duration)] += 1
+            histogram[1] += span.duration
+            histogram[2] += 1
+            for kind, tokens in (('prompt', span.prompt_tokens), ('completion', span.completion_tokens)):
+                if tokens:
+                    self._tokens[(span.name, kind)] = self._tokens.get((span.name, kind), 0) + tokens
+            for field, value in span.attributes.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self._counts[(span.name, field)] = self._counts.get((span.name, field), 0) + value
+            if span.error is not None:
+                self._errors[span.name] = self._errors.get(span.name, 0) + 1
+
+    def render(self) -> str:
+        """
+        Render all metrics.
+
+        Returns:
+            str: Prometheus text format (version 0.0.4).
+        """
+        with self._lock:
+            lines = ['# HELP rag_stage_duration_seconds Duration of pipeline stages.',
+                     '# TYPE rag_stage_duration_seconds histogram']
+            for stage, (counts, total, count) in sorted(self._durations.items()):
+                cumulative = 0
+                for bound, bucket in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'rag_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'rag_stage_duration_seconds_sum{{stage="{stage}"}} {total}')
+                lines.append(f'rag_stage_duration_seconds_count{{stage="{stage}"}} {count}')
+
+            lines += ['# HELP rag_stage_tokens_total OpenAI tokens used by pipeline stages.',
+                      '# TYPE rag_stage_tokens_total counter']
+            lines += [f'rag_stage_tokens_total{{stage="{stage}",kind="{kind}"}} {value}' for (stage, kind), value in sorted(self._tokens.items())]
+
+            lines += ['# HELP rag_stage_items_total Items (candidates, matches, passages) handled by pipeline stages.',
+                      '# TYPE rag_stage_items_total counter']
+            lines += [f'rag_stage_items_total{{stage="{stage}",field="{field}"}} {value}' for (stage, field), value in sorted(self._counts.items())]
+
+            lines += ['# HELP rag_stage_errors_total Pipeline stages that raised.',
+                      '# TYPE rag_stage_errors_total counter']
+            lines += [f'rag_stage_errors_total{{stage="{stage}"}} {value}' for stage, value in sorted(self._errors.items())]
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    """
+    Time a stage, nesting it under the current span of this context.
+
+    Parameters:
+        name (str): Stage name.
+        **attributes: Counts known when the stage starts.
+
+    Yields:
+        Span: The running span; add counts with span.set(...).
+    """
+    current = Span(name, attributes)
+    parent = _current_span.get()
+    if parent is not None:
+        parent.children.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish()
+
+
+@contextlib.contextmanager
+def trace(name: str, **attributes):
+    """
+    Start the root span of a request.
+
+    Parameters:
+        name (str): Request name, e.g. the route.
+        **attributes: Request attributes.
+
+    Yields:
+        Trace: The running trace.
+    """
+    current = Trace(name, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish()
+
+
+def current_span():
+    """
+    Return the innermost running span of this context.
+
+    Returns:
+        Span | None: Running span, or None outside any span.
+    """
+    return _current_span.get()
+
+
+def record_usage(response):
+    """
+    Add the token usage of an OpenAI response to the current span, if any.
+
+    Parameters:
+        response: Chat completion (responses without usage are ignored).
+    """
+    current = _current_span.get()
+    if current is not None:
+        current.add_usage(getattr(response, 'usage', None))
+
+
+def propagate(function):
+    """
+    Bind a callable to the current tracing context, for work handed to another thread.
+
+    Every call runs in its own copy of the context, so the wrapper may run in
+    several threads at once.
+
+    Parameters:
+        function (callable): Function run by an executor or thread.
+
+    Returns:
+        callable: Function that runs inside a copy of the caller's context.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(function, *args, **kwargs)
+
+
+def save_trace(current: Trace, directory: str = None):
+    """
+    Write a trace as JSON when TRACE_DIR (or directory) is set.
+
+    Parameters:
+        current (Trace): Finished trace.
+        directory (str): Output directory (default TRACE_DIR; nothing is written without one).
+    """
+    directory = directory or os.environ.get("TRACE_DIR")
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{current.trace_id}.json"), 'w') as file:
+        json.dump(current.to_dict(), file)
@@ -0,0 +1,397 @@
+import heapq
+import json
+import math
+import os
+import threading
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from document_cache import write_section, read_section
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cache', 'vector_index')
+
+
+def matches_where(metadata: dict, where: dict) -> bool:
+    """
+    Check metadata against a Weaviate where filter of Equal conditions joined by And.
+
+    Parameters:
+        metadata (dict): Metadata of an indexed text.
+        where (dict): Where filter, e.g. built by hybrid.where_filter.
+
+    Returns:
+        bool: Whether every condition holds.
+    """
+    if where['operator'] == 'And':
+        return all(matches_where(metadata, operand) for operand in where['operands'])
+    if where['operator'] != 'Equal':
+        raise ValueError(f"Unsupported where operator: {where['operator']}")
+    value = next(value for key, value in where.items() if key.startswith('value'))
+    return metadata.get(where['path'][-1]) == value
+
+
+class LocalVectorIndex(VectorStore):
+    """In-process vector store persisted to memory-mapped files.
+
+    Small corpora are searched exactly with one matrix-vector product; above
+    exact_threshold vectors an HNSW graph is built and searched instead. Vectors
+    are unit-normalised float32 so the inner product is the cosine similarity.
+    """
+
+    def __init__(self, directory: str, embedding, exact_threshold: int = 20000, m: int = 16,
+                 ef_construction: int = 100, ef_search: int = 64, seed: int = 123):
+        """
+        Initialize the LocalVectorIndex instance. Files are read on first use.
+
+        Parameters:
+            directory (str): Directory holding the index files.
+            embedding: LangChain embeddings used for queries and added texts.
+            exact_threshold (int): Largest corpus searched exactly.
+            m (int): HNSW links per node on the upper layers (2 * m on layer 0).
+            ef_construction (int): HNSW candidate list size while building.
+            ef_search (int): HNSW candidate list size while searching.
+            seed (int): Seed of the HNSW level assignment.
+        """
+        self.directory = directory
+        self.embedding = embedding
+        self.exact_threshold = exact_threshold
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._random = np.random.default_rng(seed)
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._vectors = None
+        self._texts = []
+        self._metadatas = []
+        self._links = []
+        self._entry_point = None
+        self._max_level = -1
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    @property
+    def texts(self) -> list:
+        """Indexed texts in row order."""
+        self._ensure_loaded()
+        return self._texts
+
+    @property
+    def metadatas(self) -> list:
+        """Metadata of the indexed texts in row order."""
+        self._ensure_loaded()
+        return self._metadatas
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return 0 if self._vectors is None else len(self._vectors)
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, directory: str = DEFAULT_INDEX_DIR, **kwargs):
+        """
+        Build and save an index from texts.
+
+        Parameters:
+            texts (list): Texts to index.
+            embedding: LangChain embeddings.
+            metadatas (list): Metadata per text.
+            directory (str): Directory of the index files.
+            **kwargs: Other options of LocalVectorIndex.
+
+        Returns:
+            LocalVectorIndex: The saved index.
+        """
+        index = cls(directory, embedding, **kwargs)
+        index.add_texts(texts, metadatas)
+        index.save()
+        return index
+
+    def add_texts(self, texts, metadatas=None, vectors=None, **kwargs) -> list:
+        """
+        Add texts to the index.
+
+        Parameters:
+            texts (list): Texts to add.
+            metadatas (list): Metadata per text.
+            vectors (list): Precomputed embeddings (default embeds the texts).
+
+        Returns:
+            list: Row ids of the added texts.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        matrix = np.asarray(vectors if vectors is not None else self.embedding.embed_documents(texts), dtype=np.float32)
+        matrix = self._normalize(matrix)
+
+        with self._lock:
+            self._ensure_loaded()
+            start = 0 if self._vectors is None else len(self._vectors)
+            self._vectors = matrix if self._vectors is None else np.vstack([np.asarray(self._vectors), matrix])
+            self._texts.extend(texts)
+            self._metadatas.extend(metadatas)
+            if self._links or len(self._vectors) > self.exact_threshold:
+                self._build_graph(start)
+        return list(range(start, start + len(texts)))
+
+    def clear(self):
+        """
+        Remove every text from the index; save() then writes the empty index.
+        """
+        with self._lock:
+            self._vectors = None
+            self._texts = []
+            self._metadatas = []
+            self._links = []
+            self._entry_point = None
+            self._max_level = -1
+            self._loaded = True
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> list:
+        """
+        Return the k texts most similar to a query.
+
+        Parameters:
+            query (str): Query text.
+            k (int): Number of documents.
+            where_filter (dict): Weaviate-style filter on the metadata (default none).
+
+        Returns:
+            list: LangChain documents, most similar first.
+        """
+        return [document for document, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs) -> list:
+        """
+        Return the k texts most similar to a query with their cosine similarity.
+
+        Parameters:
+            query (str): Query text.
+            k (int): Number of documents.
+            where_filter (dict): Weaviate-style filter on the metadata (default none).
+
+        Returns:
+            list: (Document, similarity) tuples, most similar first.
+        """
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k, kwargs.get('where_filter'))
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs) -> list:
+        return [document for document, _ in self.similarity_search_by_vector_with_score(embedding, k, kwargs.get('where_filter'))]
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4, where_filter: dict = None) -> list:
+        """
+        Return the k texts closest to a vector.
+
+        Filtered searches are exact over the matching rows.
+
+        Parameters:
+            embedding: Query vector.
+            k (int): Number of documents.
+            where_filter (dict): Weaviate-style filter on the metadata (default none).
+
+        Returns:
+            list: (Document, similarity) tuples, most similar first.
+        """
+        self._ensure_loaded()
+        if self._vectors is None:
+            return []
+        query = self._normalize(np.asarray(embedding, dtype=np.float32)[None, :])[0]
+
+        if where_filter:
+            rows = np.array([i for i, metadata in enumerate(self._metadatas) if matches_where(metadata, where_filter)], dtype=np.int64)
+            hits = self._exact_search(query, k, rows)
+        elif self._links:
+            hits = self._search_graph(query, k)
+        else:
+            hits = self._exact_search(query, k)
+
+        return [(Document(page_content=self._texts[i], metadata=self._metadatas[i]), similarity) for similarity, i in hits]
+
+    def save(self):
+        """
+        Write the index to its directory.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            os.makedirs(self.directory, exist_ok=True)
+            if self._vectors is None:
+                # Without the vector file the index loads empty
+                if os.path.exists(os.path.join(self.directory, 'vectors.npy')):
+                    os.remove(os.path.join(self.directory, 'vectors.npy'))
+                return
+            vectors = np.ascontiguousarray(self._vectors, dtype=np.float32)
+            with open(os.path.join(self.directory, 'vectors.npy.tmp'), 'wb') as file:
+                np.save(file, vectors)
+            os.replace(os.path.join(self.directory, 'vectors.npy.tmp'), os.path.join(self.directory, 'vectors.npy'))
+            write_section(self.directory, 'texts', self._texts)
+            write_section(self.directory, 'metadatas', [json.dumps(metadata) for metadata in self._metadatas])
+
+            graph = {'entry_point': self._entry_point, 'max_level': self._max_level, 'upper_layers': []}
+            if self._links:
+                width = 2 * self.m
+                layer0 = np.full((len(self._links), width), -1, dtype=np.int32)
+                for node, levels in enumerate(self._links):
+                    layer0[node, :len(levels[0])] = levels[0]
+                with open(os.path.join(self.directory, 'layer0.npy.tmp'), 'wb') as file:
+                    np.save(file, layer0)
+                os.replace(os.path.join(self.directory, 'layer0.npy.tmp'), os.path.join(self.directory, 'layer0.npy'))
+                graph['upper_layers'] = [{str(level): links for level, links in enumerate(levels) if level > 0} for levels in self._links]
+            with open(os.path.join(self.directory, 'graph.json'), 'w') as file:
+                json.dump(graph, file)
+
+    def _ensure_loaded(self):
+        """
+        Map the saved files into memory on first use.
+        """
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            vectors_path = os.path.join(self.directory, 'vectors.npy')
+            texts = read_section(self.directory, 'texts')
+            if os.path.exists(vectors_path) and texts is not None:
+                self._vectors = np.load(vectors_path, mmap_mode='r')
+                self._texts = texts
+                self._metadatas = [json.loads(metadata) for metadata in read_section(self.directory, 'metadatas')]
+                with open(os.path.join(self.directory, 'graph.json'), 'r') as file:
+                    graph = json.load(file)
+                if graph['upper_layers']:
+                    layer0 = np.load(os.path.join(self.directory, 'layer0.npy'), mmap_mode='r')
+                    self._links = []
+                    for node, upper in enumerate(graph['upper_layers']):
+                        levels = [[int(n) for n in layer0[node] if n >= 0]]
+                        levels.extend(upper[str(level)] for level in range(1, len(upper) + 1))
+                        self._links.append(levels)
+                    self._entry_point = graph['entry_point']
+                    self._max_level = graph['max_level']
+            self._loaded = True
+
+    def _build_graph(self, start: int):
+        """
+        Insert rows from start onwards into the HNSW graph, building it from scratch if needed.
+
+        Parameters:
+            start (int): First row not in the graph yet.
+        """
+        if not self._links:
+            start = 0
+        level_multiplier = 1 / math.log(self.m)
+        for node in range(start, len(self._vectors)):
+            level = int(-math.log(1.0 - self._random.random()) * level_multiplier)
+            self._links.append([[] for _ in range(level + 1)])
+            if self._entry_point is None:
+                self._entry_point, self._max_level = node, level
+                continue
+
+            vector = self._vectors[node]
+            entry_points = [self._entry_point]
+            for layer in range(self._max_level, level, -1):
+                entry_points = [self._search_layer(vector, entry_points, 1, layer)[0][1]]
+            for layer in range(min(level, self._max_level), -1, -1):
+                found = self._search_layer(vector, entry_points, self.ef_construction, layer)
+                limit = 2 * self.m if layer == 0 else self.m
+                neighbours = [n for _, n in found[:limit]]
+                self._links[node][layer] = neighbours
+                for neighbour in neighbours:
+                    links = self._links[neighbour][layer]
+                    links.append(node)
+                    if len(links) > limit:
+                        similarities = self._vectors[links] @ self._vectors[neighbour]
+                        self._links[neighbour][layer] = [links[i] for i in np.argsort(-similarities)[:limit]]
+                entry_points = [n for _, n in found]
+            if level > self._max_level:
+                self._entry_point, self._max_level = node, level
+
+    def _exact_search(self, query: np.ndarray, k: int, rows: np.ndarray = None) -> list:
+        """
+        Rank rows by their similarity to the query with one matrix-vector product.
+
+        Parameters:
+            query (np.ndarray): Unit query vector.
+            k (int): Number of results.
+            rows (np.ndarray): Rows to search (default all, without copying the vectors).
+
+        Returns:
+            list: (similarity, row) tuples, most similar first.
+        """
+        similarities = np.asarray((self._vectors if rows is None else self._vectors[rows]) @ query)
+        k = min(k, len(similarities))
+        if not k:
+            return []
+        best = np.argpartition(-similarities, k - 1)[:k]
+        best = best[np.argsort(-similarities[best], kind='stable')]
+        return [(float(similarities[i]), int(i if rows is None else rows[i])) for i in best]
+
+    def _search_graph(self, query: np.ndarray, k: int) -> list:
+        """
+        Greedy descent through the upper layers followed by a beam search on layer 0.
+
+        Parameters:
+            query (np.ndarray): Unit query vector.
+            k (int): Number of results.
+
+        Returns:
+            list: (similarity, row) tuples, most similar first.
+        """
+        entry_points = [self._entry_point]
+        for layer in range(self._max_level, 0, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+        return self._search_layer(query, entry_points, max(self.ef_search, k), 0)[:k]
+
+    def _search_layer(self, query: np.ndarray, entry_points: list, ef: int, layer: int) -> list:
+        """
+        Beam search of one HNSW layer.
+
+        Parameters:
+            query (np.ndarray): Unit query vector.
+            entry_points (list): Rows to start from.
+            ef (int): Size of the candidate list.
+            layer (int): Layer to search.
+
+        Returns:
+            list: Up to ef (similarity, row) tuples, most similar first.
+        """
+        visited = set(entry_points)
+        similarities = self._vectors[entry_points] @ query
+        candidates = [(-float(s), n) for s, n in zip(similarities, entry_points)]
+        results = [(float(s), n) for s, n in zip(similarities, entry_points)]
+        heapq.heapify(candidates)
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            negative, node = heapq.heappop(candidates)
+            if len(results) >= ef and -negative < results[0][0]:
+                break
+            links = self._links[node][layer] if layer < len(self._links[node]) else []
+            unvisited = [n for n in links if n not in visited]
+            if not unvisited:
+                continue
+            visited.update(unvisited)
+            for similarity, neighbour in zip(self._vectors[unvisited] @ query, unvisited):
+                similarity = float(similarity)
+                if len(results) < ef or similarity > results[0][0]:
+                    heapq.heappush(candidates, (-similarity, neighbour))
+                    heapq.heappush(results, (similarity, neighbour))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted(results, reverse=True)
+
+    def _normalize(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Scale rows to unit length.
+
+        Parameters:
+            matrix (np.ndarray): Row vectors.
+
+        Returns:
+            np.ndarray: float32 unit rows.
+        """
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).astype(np.float32)
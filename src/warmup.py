@@ -0,0 +1,89 @@
+import threading
+import time
+
+PENDING, RUNNING, READY, FAILED = 'pending', 'running', 'ready', 'failed'
+
+
+class Warmup:
+    """Start-up steps run in the background, so a process can accept connections at once.
+
+    Importing the app only defines clients and models; loading the cross-encoder,
+    connecting to Weaviate and building the default pipeline happen here, each
+    step in its own thread. The process is ready once every step succeeded, which
+    is what a readiness probe (GET /ready) should wait for before routing traffic.
+    """
+
+    def __init__(self, steps: dict):
+        """
+        Initialize the Warmup instance. Nothing runs until start().
+
+        Parameters:
+            steps (dict): Step name -> callable taking no arguments.
+        """
+        self.steps = dict(steps)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._state = {name: {'status': PENDING, 'seconds': None, 'error': None} for name in self.steps}
+
+    def start(self) -> list:
+        """
+        Start every step in a background thread; later calls do nothing.
+
+        Returns:
+            list: The threads running the steps.
+        """
+        with self._lock:
+            if not self._threads:
+                self._threads = [threading.Thread(target=self._run, args=(name,), name=f"warmup-{name}", daemon=True)
+                                 for name in self.steps]
+                for thread in self._threads:
+                    thread.start()
+            return self._threads
+
+    def join(self, timeout: float = None) -> bool:
+        """
+        Wait for the started steps to finish.
+
+        Parameters:
+            timeout (float): Seconds to wait for all steps (default no limit).
+
+        Returns:
+            bool: True if every step finished in time.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in list(self._threads):
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not any(thread.is_alive() for thread in self._threads)
+
+    @property
+    def ready(self) -> bool:
+        """True once every step succeeded."""
+        with self._lock:
+            return all(state['status'] == READY for state in self._state.values())
+
+    def status(self) -> dict:
+        """
+        Report the state of every step.
+
+        Returns:
+            dict: 'ready' and, per step, its status (pending, running, ready or failed),
+                the seconds it took and the error of a failed step.
+        """
+        with self._lock:
+            steps = {name: dict(state) for name, state in self._state.items()}
+        return {'ready': all(state['status'] == READY for state in steps.values()), 'steps': steps}
+
+    def _run(self, name: str):
+        """Run one step and record how it went."""
+        self._set(name, status=RUNNING)
+        start = time.perf_counter()
+        try:
+            self.steps[name]()
+        except Exception as e:
+            self._set(name, status=FAILED, seconds=round(time.perf_counter() - start, 3), error=f"{type(e).__name__}: {e}")
+        else:
+            self._set(name, status=READY, seconds=round(time.perf_counter() - start, 3))
+
+    def _set(self, name: str, **values):
+        with self._lock:
+            self._state[name].update(values)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules under src/ import their siblings by bare name (e.g. "from generation import Generation").
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
@@ -0,0 +1,88 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeChatCompletionsServer:
+    """Local stand-in for the OpenAI chat-completions endpoint.
+
+    Answers 'true' when the context of a sufficiency prompt contains one of
+    the configured keywords and 'false' otherwise, after an optional delay.
+    """
+
+    def __init__(self, keywords=("escrow",), delay=0.0, slow_keyword=None, slow_delay=0.0):
+        self.keywords = keywords
+        self.delay = delay
+        self.slow_keyword = slow_keyword
+        self.slow_delay = slow_delay
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reply(self, content):
+        context = re.search(r"Context:\s*(.*?)\s*User question", content, re.DOTALL)
+        context = context.group(1) if context else content
+        answer = 'true' if any(keyword in context.lower() for keyword in self.keywords) else 'false'
+        delay = self.slow_delay if self.slow_keyword and self.slow_keyword in context.lower() else self.delay
+        return answer, delay
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with fake._lock:
+                    fake.requests += 1
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                try:
+                    answer, delay = fake.reply(body['messages'][-1]['content'])
+                    time.sleep(delay)
+                    payload = json.dumps({
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion",
+                        "created": 0,
+                        "model": body.get('model', 'gpt-3.5-turbo'),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": answer},
+                            "logprobs": {"content": [{"token": answer, "logprob": -0.001, "bytes": None,
+                                                      "top_logprobs": [{"token": answer, "logprob": -0.001, "bytes": None}]}]},
+                            "finish_reason": "stop",
+                        }],
+                        "usage": {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11},
+                    }).encode('utf-8')
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with fake._lock:
+                        fake.in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,152 @@
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+from src.answer_cache import AnswerCache, FileBackend, MemoryBackend, RedisBackend, normalize_question
+
+EMBEDDINGS = {
+    "how much is the escrow amount": [1.0, 0.0, 0.0],
+    "what is the escrow amount": [0.99, 0.1, 0.0],
+    "what's the escrow amount": [1.0, 0.02, 0.0],
+    "who is the buyer": [0.0, 1.0, 0.0],
+}
+
+def embed(question):
+    return EMBEDDINGS[normalize_question(question)]
+
+class FakeRedis:
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, name):
+        return self.data.get(name)
+
+    def set(self, name, value, ex=None):
+        self.data[name] = value
+
+class TestAnswerCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = AnswerCache(embed=embed, similarity_threshold=0.95)
+        self.compute = Mock(return_value="The escrow amount is $1,000,000.")
+
+    def test_normalized_question_hits_exact_level(self):
+        self.cache.get_or_compute("How much is the escrow amount?", "doc", "gpt-3.5-turbo", self.compute)
+        answer = self.cache.get_or_compute("  how much is the   ESCROW amount ", "doc", "gpt-3.5-turbo", self.compute)
+
+        self.assertEqual(answer, "The escrow amount is $1,000,000.")
+        self.assertEqual(self.compute.call_count, 1)
+        self.assertEqual(self.cache.stats()['hits_exact'], 1)
+
+    def test_similar_question_hits_semantic_level(self):
+        self.cache.get_or_compute("How much is the escrow amount?", "doc", "gpt-3.5-turbo", self.compute)
+        answer = self.cache.get_or_compute("What is the escrow amount?", "doc", "gpt-3.5-turbo", self.compute)
+
+        self.assertEqual(answer, "The escrow amount is $1,000,000.")
+        self.assertEqual(self.compute.call_count, 1)
+        self.assertEqual(self.cache.stats()['hits_semantic'], 1)
+
+    def test_async_lookup_shares_the_cache(self):
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return "The escrow amount is $1,000,000."
+
+        first = asyncio.run(self.cache.aget_or_compute("How much is the escrow amount?", "doc", "gpt-3.5-turbo", compute))
+        second = self.cache.get_or_compute("What is the escrow amount?", "doc", "gpt-3.5-turbo", self.compute)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+        self.compute.assert_not_called()
+
+    def test_concurrent_identical_questions_share_one_computation(self):
+        started, release = threading.Event(), threading.Event()
+
+        def compute():
+            started.set()
+            release.wait(5)
+            return "The escrow amount is $1,000,000."
+
+        answers = []
+        first = threading.Thread(target=lambda: answers.append(self.cache.get_or_compute("Who is the buyer?", "doc", "gpt-3.5-turbo", compute)))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=lambda: answers.append(self.cache.get_or_compute("who is the BUYER", "doc", "gpt-3.5-turbo", self.compute)))
+        second.start()
+        while self.cache.stats()['coalesced'] == 0:
+            time.sleep(0.001)
+        release.set()
+        first.join(5)
+        second.join(5)
+
+        self.assertEqual(answers, ["The escrow amount is $1,000,000."] * 2)
+        self.compute.assert_not_called()
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_unrelated_question_document_or_model_misses(self):
+        self.cache.get_or_compute("How much is the escrow amount?", "doc", "gpt-3.5-turbo", self.compute)
+        self.cache.get_or_compute("Who is the buyer?", "doc", "gpt-3.5-turbo", self.compute)
+        self.cache.get_or_compute("How much is the escrow amount?", "other-doc", "gpt-3.5-turbo", self.compute)
+        self.cache.get_or_compute("How much is the escrow amount?", "doc", "gpt-4", self.compute)
+
+        self.assertEqual(self.compute.call_count, 4)
+        self.assertEqual(self.cache.stats()['misses'], 4)
+
+    def test_expired_answers_are_recomputed(self):
+        cache = AnswerCache(ttl=0.01)
+        cache.get_or_compute("How much is the escrow amount?", "doc", "gpt-3.5-turbo", self.compute)
+        time.sleep(0.02)
+        cache.get_or_compute("How much is the escrow amount?", "doc", "gpt-3.5-turbo", self.compute)
+
+        self.assertEqual(self.compute.call_count, 2)
+
+    def test_semantic_level_falls_back_to_the_next_candidate_and_prunes_evicted_ones(self):
+        cache = AnswerCache(backend=MemoryBackend(max_entries=1), embed=embed, similarity_threshold=0.95)
+        cache.set("How much is the escrow amount?", "doc", "gpt-3.5-turbo", "evicted")
+        cache.set("What is the escrow amount?", "doc", "gpt-3.5-turbo", "The escrow amount is $1,000,000.")
+
+        answer = cache.get("What's the escrow amount?", "doc", "gpt-3.5-turbo")
+
+        self.assertEqual(answer, "The escrow amount is $1,000,000.")
+        self.assertEqual(cache.stats()['hits_semantic'], 1)
+        self.assertEqual(cache._index[("doc", "gpt-3.5-turbo")][0], [cache.key("What is the escrow amount?", "doc", "gpt-3.5-turbo")])
+
+    def test_memory_backend_evicts_least_recently_used(self):
+        backend = MemoryBackend(max_entries=2)
+        backend.set("a", 1)
+        backend.set("b", 2)
+        backend.get("a")
+        backend.set("c", 3)
+
+        self.assertEqual((backend.get("a"), backend.get("b"), backend.get("c")), (1, None, 3))
+
+    def test_file_and_redis_backends_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for backend in (FileBackend(directory), RedisBackend(FakeRedis())):
+                cache = AnswerCache(backend=backend)
+                cache.set("How much is the escrow amount?", "doc", "gpt-3.5-turbo", {"assistant": "$1,000,000"})
+
+                self.assertEqual(cache.get("how much is the escrow amount", "doc", "gpt-3.5-turbo"), {"assistant": "$1,000,000"})
+
+    def test_semantic_hits_survive_a_restart_and_are_shared_between_workers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for backend in (FileBackend(directory), RedisBackend(FakeRedis())):
+                worker = AnswerCache(backend=backend, embed=embed, index_refresh=0)
+                other_worker = AnswerCache(backend=backend, embed=embed, index_refresh=0)
+                self.assertIsNone(other_worker.get("Who is the buyer?", "doc", "gpt-3.5-turbo"))
+                worker.set("How much is the escrow amount?", "doc", "gpt-3.5-turbo", "The escrow amount is $1,000,000.")
+                other_worker.set("Who is the buyer?", "doc", "gpt-3.5-turbo", "Raptor Inc.")
+
+                restarted = AnswerCache(backend=backend, embed=embed)
+
+                self.assertEqual(other_worker.get("What is the escrow amount?", "doc", "gpt-3.5-turbo"), "The escrow amount is $1,000,000.")
+                self.assertEqual(restarted.get("What is the escrow amount?", "doc", "gpt-3.5-turbo"), "The escrow amount is $1,000,000.")
+                self.assertEqual(len(restarted._index[("doc", "gpt-3.5-turbo")][0]), 2)
+                self.assertEqual(restarted.stats()['hits_semantic'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import re
+import unittest
+import numpy as np
+from src.chunker import StructureChunker
+
+def word_offsets(text):
+    """Words and punctuation marks as tokens."""
+    return np.array([(match.start(), match.end()) for match in re.finditer(r"\w+|[^\w\s]", text)], dtype=np.int64).reshape(-1, 2)
+
+CONTRACT = [
+    """STOCK PURCHASE AGREEMENT
+
+ARTICLE I DEFINITIONS
+
+"Affiliate" means any person controlling the Company.
+"Escrow Amount" means $1,000,000.
+
+ARTICLE II PURCHASE AND SALE
+
+2.1 Purchase Price. The Buyer shall pay the Purchase Price at Closing.
+(a) the Escrow Amount shall be deposited with the Escrow Agent;
+(b) the balance shall be paid to the Sellers.""",
+    """2.2 Closing Bonus. The Company shall pay the Employees Closing Bonus Amount.
+\fARTICLE III INDEMNIFICATION
+
+Except in the case of fraud, the Sellers have no liability for breach of representations.""",
+]
+
+class TestStructureChunker(unittest.TestCase):
+
+    def setUp(self):
+        self.tokenized = []
+
+        def tokenizer(text):
+            self.tokenized.append(text)
+            return word_offsets(text)
+
+        self.chunker = StructureChunker(max_tokens=30, overlap_tokens=5, tokenizer=tokenizer)
+
+    def test_chunks_follow_sections_and_carry_their_metadata(self):
+        chunks = self.chunker.chunk(CONTRACT)
+
+        self.assertEqual([(chunk['page'], chunk['section']) for chunk in chunks],
+                         [(1, None), (1, 'I'), (1, 'II'), (1, '2.1'), (2, '2.2'), (3, 'III')])
+        self.assertEqual(chunks[1]['defines'], ['Affiliate', 'Escrow Amount'])
+        self.assertEqual(chunks[4]['heading'], 'Closing Bonus')
+        self.assertTrue(chunks[5]['text'].startswith("ARTICLE III INDEMNIFICATION"))
+        self.assertEqual(len(self.tokenized), 1)
+
+    def test_offsets_and_token_counts_point_into_the_joined_pages(self):
+        text = "\n\n".join(CONTRACT)
+
+        for chunk in self.chunker.chunk(CONTRACT):
+            self.assertEqual(text[chunk['start']:chunk['end']], chunk['text'])
+            self.assertEqual(chunk['tokens'], len(word_offsets(chunk['text'])))
+            self.assertLessEqual(chunk['tokens'], 30)
+
+    def test_long_clauses_are_cut_into_overlapping_windows(self):
+        clause = "1.1 Term. " + " ".join(f"word{i}" for i in range(70))
+
+        chunks = StructureChunker(max_tokens=30, overlap_tokens=5, tokenizer=word_offsets).chunk([clause])
+
+        self.assertEqual([chunk['tokens'] for chunk in chunks], [30, 30, 25])
+        self.assertTrue(all(chunk['section'] == '1.1' for chunk in chunks))
+        self.assertEqual(chunks[0]['text'].split()[-5:], chunks[1]['text'].split()[:5])
+
+    def test_wrapped_lines_starting_with_a_number_are_no_headings(self):
+        page = """7. Closing. The Closing shall take place no later than
+30 Days after the Closing, and the Seller shall deliver the shares
+2.5 Business Days before the escrow is released.
+8. Termination. Either party may terminate this Agreement."""
+
+        chunks = StructureChunker(max_tokens=200, overlap_tokens=5, tokenizer=word_offsets).chunk([page])
+
+        self.assertEqual([(chunk['section'], chunk['heading']) for chunk in chunks], [('7', 'Closing'), ('8', 'Termination')])
+        self.assertTrue(chunks[0]['text'].endswith("before the escrow is released."))
+
+    def test_overlap_must_be_below_the_chunk_size(self):
+        with self.assertRaises(ValueError):
+            StructureChunker(max_tokens=10, overlap_tokens=10, tokenizer=word_offsets)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import asyncio
+import unittest
+from src.clients import openai_client, async_openai_pool, POOL_SHARD_SIZE
+
+class TestClients(unittest.TestCase):
+
+    def test_client_is_shared_per_configuration(self):
+        first = openai_client(api_key="test", base_url="http://127.0.0.1:9/v1", timeout=5, max_retries=2)
+        second = openai_client(api_key="test", base_url="http://127.0.0.1:9/v1", timeout=5, max_retries=2)
+        other = openai_client(api_key="test", base_url="http://127.0.0.1:9/v1", timeout=5, max_retries=0)
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(first.max_retries, 2)
+        self.assertEqual(first.timeout.read, 5)
+
+    def test_async_pool_adds_shards_only_under_load(self):
+        client = openai_client(api_key="test", base_url="http://127.0.0.1:9/v1")
+        pool = async_openai_pool(client, max_connections=2 * POOL_SHARD_SIZE)
+        self.assertIs(pool, async_openai_pool(client, max_connections=2 * POOL_SHARD_SIZE))
+
+        async def hold(count, release):
+            held = []
+
+            async def use():
+                async with pool.slot() as async_client:
+                    held.append(async_client)
+                    await release.wait()
+
+            tasks = [asyncio.ensure_future(use()) for _ in range(count)]
+            await asyncio.sleep(0.01)
+            shards = len(set(map(id, held)))
+            release.set()
+            await asyncio.gather(*tasks)
+            return shards
+
+        self.assertEqual(asyncio.run(hold(POOL_SHARD_SIZE, asyncio.Event())), 1)
+        self.assertEqual(asyncio.run(hold(POOL_SHARD_SIZE + 1, asyncio.Event())), 2)
+
+if __name__ == '__main__':
+    unittest.main()
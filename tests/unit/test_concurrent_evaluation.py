@@ -0,0 +1,110 @@
+import asyncio
+import os
+import time
+import unittest
+from unittest.mock import patch, Mock
+from openai import OpenAI
+from src.concurrent_evaluation import ConcurrentEvaluator, AsyncConcurrentEvaluator
+from tests.unit.fake_openai import FakeChatCompletionsServer
+
+PROMPT_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'prompts', 'generic-evaluation-prompt.txt')
+
+class TestConcurrentEvaluator(unittest.TestCase):
+
+    def _evaluation(self, server):
+        from evaluation import Evaluation
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test"}):
+            evaluation = Evaluation(reranker=Mock())
+        evaluation.generator.client = OpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+        with open(PROMPT_PATH) as file:
+            prompt = file.read()
+        return lambda query, passage: evaluation.evaluate(prompt, query, passage, timeout=5)
+
+    def test_checks_run_concurrently_and_keep_ranked_order(self):
+        passages = ["The escrow amount is $1,000,000.", "Governing law is Delaware.", "Escrow release happens after 18 months.", "Notices must be in writing."]
+        with FakeChatCompletionsServer(delay=0.2) as server:
+            evaluator = ConcurrentEvaluator(self._evaluation(server), max_concurrency=4, timeout=5)
+
+            start = time.perf_counter()
+            results = evaluator.classify("How much is the escrow amount?", passages)
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(results, ['true', 'false', 'true', 'false'])
+        self.assertEqual(server.max_in_flight, 4)
+        self.assertLess(elapsed, 0.6)
+
+    def test_concurrency_limit_is_respected(self):
+        passages = [f"Escrow clause {i}" for i in range(6)]
+        with FakeChatCompletionsServer(delay=0.05) as server:
+            evaluator = ConcurrentEvaluator(self._evaluation(server), max_concurrency=2, timeout=5)
+            results = evaluator.classify("escrow?", passages)
+
+        self.assertEqual(results, ['true'] * 6)
+        self.assertLessEqual(server.max_in_flight, 2)
+
+    def test_slow_check_times_out_as_false(self):
+        passages = ["Escrow clause that is slow", "Escrow clause that is fast"]
+        with FakeChatCompletionsServer(slow_keyword="slow", slow_delay=1.0) as server:
+            evaluator = ConcurrentEvaluator(self._evaluation(server), max_concurrency=2, timeout=0.3)
+            results = evaluator.classify("escrow?", passages)
+
+        self.assertEqual(results, ['false', 'true'])
+
+    def test_stops_early_once_enough_passages_are_true(self):
+        passages = ["Escrow one", "Escrow two", "Escrow three", "Escrow four"]
+        with FakeChatCompletionsServer(delay=0.1) as server:
+            evaluator = ConcurrentEvaluator(self._evaluation(server), max_concurrency=2, timeout=5)
+            results = evaluator.classify("escrow?", passages, stop_after=2)
+
+        self.assertEqual(results, ['true', 'true', None, None])
+        self.assertLess(server.requests, len(passages))
+
+class TestAsyncConcurrentEvaluator(TestConcurrentEvaluator):
+
+    def _evaluation(self, server):
+        from evaluation import Evaluation
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test"}):
+            evaluation = Evaluation(reranker=Mock())
+        evaluation.generator.client = OpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+        with open(PROMPT_PATH) as file:
+            prompt = file.read()
+        return lambda query, passage: evaluation.aevaluate(prompt, query, passage, timeout=5)
+
+    def _classify(self, server, passages, max_concurrency, timeout, stop_after=None):
+        evaluator = AsyncConcurrentEvaluator(self._evaluation(server), max_concurrency=max_concurrency, timeout=timeout)
+        return asyncio.run(evaluator.classify("escrow?", passages, stop_after=stop_after))
+
+    def test_checks_run_concurrently_and_keep_ranked_order(self):
+        passages = ["The escrow amount is $1,000,000.", "Governing law is Delaware.", "Escrow release happens after 18 months.", "Notices must be in writing."]
+        with FakeChatCompletionsServer(delay=0.2) as server:
+            start = time.perf_counter()
+            results = self._classify(server, passages, max_concurrency=4, timeout=5)
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(results, ['true', 'false', 'true', 'false'])
+        self.assertEqual(server.max_in_flight, 4)
+        self.assertLess(elapsed, 0.6)
+
+    def test_concurrency_limit_is_respected(self):
+        with FakeChatCompletionsServer(delay=0.05) as server:
+            results = self._classify(server, [f"Escrow clause {i}" for i in range(6)], max_concurrency=2, timeout=5)
+
+        self.assertEqual(results, ['true'] * 6)
+        self.assertLessEqual(server.max_in_flight, 2)
+
+    def test_slow_check_times_out_as_false(self):
+        with FakeChatCompletionsServer(slow_keyword="slow", slow_delay=1.0) as server:
+            results = self._classify(server, ["Escrow clause that is slow", "Escrow clause that is fast"], max_concurrency=2, timeout=0.3)
+
+        self.assertEqual(results, ['false', 'true'])
+
+    def test_stops_early_once_enough_passages_are_true(self):
+        passages = ["Escrow one", "Escrow two", "Escrow three", "Escrow four"]
+        with FakeChatCompletionsServer(delay=0.1) as server:
+            results = self._classify(server, passages, max_concurrency=2, timeout=5, stop_after=2)
+
+        self.assertEqual(results, ['true', 'true', None, None])
+        self.assertLess(server.requests, len(passages))
+
+if __name__ == '__main__':
+    unittest.main()
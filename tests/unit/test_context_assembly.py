@@ -0,0 +1,77 @@
+import unittest
+from langchain_core.documents import Document
+from src.context_assembly import ContextAssembler, MinHasher, SEPARATOR
+
+class WordTokenizer:
+    """One token per whitespace separated word, so budgets are easy to reason about."""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return ' '.join(tokens)
+
+class TestMinHasher(unittest.TestCase):
+
+    def test_similarity_tracks_shared_shingles(self):
+        hasher = MinHasher(num_perm=128)
+        base = "the buyer shall deposit the escrow amount with the escrow agent within five business days of signing"
+
+        same = hasher.similarity(hasher.signature(base), hasher.signature(base.upper()))
+        near = hasher.similarity(hasher.signature(base), hasher.signature(base + " of this agreement"))
+        other = hasher.similarity(hasher.signature(base), hasher.signature("the seller indemnifies the buyer against third party tax claims"))
+
+        self.assertEqual(same, 1.0)
+        self.assertGreater(near, 0.6)
+        self.assertLess(other, 0.2)
+
+class TestContextAssembler(unittest.TestCase):
+
+    def setUp(self):
+        self.assembler = ContextAssembler(max_tokens=50, min_overlap=10, tokenizer=WordTokenizer())
+
+    def test_nested_context_is_normalized_and_deduplicated(self):
+        escrow = "The escrow amount is   $1,000,000 and is held by the escrow agent until closing of the transaction."
+        context = [[escrow], [Document(page_content=escrow.replace("transaction", "deal"))],
+                   ["amount is $1,000,000"], [" \n "], ["Taxes are paid by the seller."]]
+
+        passages = self.assembler.assemble(context)
+
+        self.assertEqual(passages, ["The escrow amount is $1,000,000 and is held by the escrow agent until closing of the transaction.",
+                                    "Taxes are paid by the seller."])
+
+    def test_overlapping_chunks_are_merged_at_the_better_rank(self):
+        first = "Section 4. The purchase price shall be adjusted for working capital"
+        second = "adjusted for working capital at closing as set out in Exhibit B."
+
+        passages = self.assembler.assemble([["Unrelated governing law clause."], [second], [first]])
+
+        self.assertEqual(passages, ["Unrelated governing law clause.",
+                                    "Section 4. The purchase price shall be adjusted for working capital at closing as set out in Exhibit B."])
+
+    def test_consecutive_chunks_of_a_source_are_merged(self):
+        context = [Document(page_content="Clause 7 covers termination.", metadata={'source': 'lease', 'chunk': 8}),
+                   Document(page_content="Notice must be given in writing.", metadata={'source': 'lease', 'chunk': 9}),
+                   Document(page_content="Rent is due monthly.", metadata={'source': 'other', 'chunk': 10})]
+
+        passages = self.assembler.assemble(context)
+
+        self.assertEqual(passages, ["Clause 7 covers termination. Notice must be given in writing.", "Rent is due monthly."])
+
+    def test_packing_keeps_the_best_passages_within_the_budget(self):
+        assembler = ContextAssembler(max_tokens=12, tokenizer=WordTokenizer())
+        context = [["one two three four five six"], ["seven eight nine ten eleven twelve thirteen"], ["alpha beta gamma"]]
+
+        passages = assembler.assemble(context)
+
+        self.assertEqual(passages, ["one two three four five six", "alpha beta gamma"])
+        self.assertLessEqual(len(WordTokenizer().encode(SEPARATOR.join(passages))), 12)
+
+    def test_a_passage_larger_than_the_budget_is_truncated(self):
+        assembler = ContextAssembler(max_tokens=3, tokenizer=WordTokenizer())
+
+        self.assertEqual(assembler.assemble([["a b c d e"]]), ["a b c"])
+        self.assertEqual(assembler.assemble([]), [])
+
+if __name__ == '__main__':
+    unittest.main()
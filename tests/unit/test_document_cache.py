@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+from src.document_cache import DocumentCache
+
+class TestDocumentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = DocumentCache(cache_dir=os.path.join(self.tmp.name, 'cache'))
+        self.pdf_path = os.path.join(self.tmp.name, 'contract.pdf')
+        with open(self.pdf_path, 'wb') as file:
+            file.write(b'%PDF-1.4 contract bytes')
+        self.loader_factory = Mock()
+        self.loader_factory.return_value.load.return_value = [Mock(page_content="Escrow\n\nThe escrow amount is $1,000,000.")]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_second_load_does_not_parse(self):
+        first = self.cache.load(self.pdf_path, self.loader_factory)
+        second = self.cache.load(self.pdf_path, self.loader_factory)
+
+        self.assertEqual(self.loader_factory.call_count, 1)
+        self.assertEqual(second.pages, first.pages)
+        self.assertEqual(second.paragraphs, ["Escrow", "The escrow amount is $1,000,000."])
+
+    def test_changed_file_is_parsed_again(self):
+        self.cache.load(self.pdf_path, self.loader_factory)
+        with open(self.pdf_path, 'wb') as file:
+            file.write(b'%PDF-1.4 revised contract bytes')
+
+        self.cache.load(self.pdf_path, self.loader_factory)
+
+        self.assertEqual(self.loader_factory.call_count, 2)
+
+    def test_loader_settings_are_part_of_the_key(self):
+        self.assertNotEqual(self.cache.key(self.pdf_path, {'mode': 'single'}), self.cache.key(self.pdf_path, {'mode': 'elements'}))
+
+    def test_chunks_round_trip(self):
+        document = self.cache.load(self.pdf_path, self.loader_factory)
+        settings = {'chunk_size': 350}
+        self.assertIsNone(document.chunks(settings))
+
+        document.store_chunks(["chunk one", "chunk two ünïcode", ""], settings)
+
+        reloaded = self.cache.get(self.pdf_path)
+        self.assertEqual(reloaded.chunks(settings), ["chunk one", "chunk two ünïcode", ""])
+        self.assertIsNone(reloaded.chunks({'chunk_size': 500}))
+
+    def test_chunk_metadata_round_trip(self):
+        document = self.cache.load(self.pdf_path, self.loader_factory)
+        settings = {'chunker': 'structure'}
+        document.store_chunks(["chunk one"], settings, [{'page': 2, 'section': '4.1'}])
+
+        reloaded = self.cache.get(self.pdf_path)
+        self.assertEqual(reloaded.chunk_metadata(settings), [{'page': 2, 'section': '4.1'}])
+        self.assertIsNone(reloaded.chunk_metadata({'chunk_size': 350}))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        other_path = os.path.join(self.tmp.name, 'other.pdf')
+        with open(other_path, 'wb') as file:
+            file.write(b'%PDF-1.4 other contract')
+        self.cache.load(self.pdf_path, self.loader_factory)
+        self.cache.max_bytes = self.cache.size()
+
+        self.cache.load(other_path, self.loader_factory)
+
+        self.assertIsNone(self.cache.get(self.pdf_path))
+        self.assertIsNotNone(self.cache.get(other_path))
+
+if __name__ == '__main__':
+    unittest.main()
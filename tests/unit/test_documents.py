@@ -0,0 +1,150 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock
+from src.documents import DocumentRegistry, IngestionQueue, DocumentNotFound, DocumentNotReady, QUEUED, READY, FAILED
+from src.jobs import JobQueue
+
+class TestDocumentRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'documents.json')
+        self.registry = DocumentRegistry(self.path, os.path.join(self.tmp.name, 'uploads'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_same_content_is_registered_once_per_tenant(self):
+        first, created = self.registry.register('lease.pdf', b'%PDF lease')
+        again, created_again = self.registry.register('copy.pdf', b'%PDF lease')
+        other, _ = self.registry.register('lease.pdf', b'%PDF lease', tenant='acme')
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(first['doc_id'], again['doc_id'])
+        self.assertNotEqual(first['doc_id'], other['doc_id'])
+        self.assertEqual(first['index_name'], f"Doc{first['doc_id']}")
+        with open(first['path'], 'rb') as file:
+            self.assertEqual(file.read(), b'%PDF lease')
+
+    def test_tenants_only_see_their_own_and_shared_documents(self):
+        shared, _ = self.registry.register('shared.pdf', b'shared')
+        private, _ = self.registry.register('private.pdf', b'private', tenant='acme')
+
+        self.assertIsNotNone(self.registry.get(shared['doc_id'], tenant='globex'))
+        self.assertIsNone(self.registry.get(private['doc_id'], tenant='globex'))
+        self.assertIsNotNone(self.registry.get(private['doc_id'], tenant='acme'))
+        self.assertEqual([record['doc_id'] for record in self.registry.records(tenant='globex')], [shared['doc_id']])
+
+    def test_route_requires_a_ready_document(self):
+        record, _ = self.registry.register('lease.pdf', b'lease')
+
+        with self.assertRaises(DocumentNotReady):
+            self.registry.route(record['doc_id'])
+        self.registry.set_status(record['doc_id'], READY)
+        self.assertEqual(self.registry.route(record['doc_id'])['path'], record['path'])
+        with self.assertRaises(DocumentNotFound):
+            self.registry.route('missing')
+
+    def test_records_survive_a_restart(self):
+        record, _ = self.registry.register('lease.pdf', b'lease')
+        self.registry.set_status(record['doc_id'], READY)
+
+        reloaded = DocumentRegistry(self.path, self.registry.upload_dir)
+
+        self.assertEqual(reloaded.find(record['doc_id'])['status'], READY)
+        self.assertEqual(reloaded.by_path(record['path'])['doc_id'], record['doc_id'])
+
+class TestIngestionQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.registry = DocumentRegistry(os.path.join(self.tmp.name, 'documents.json'), os.path.join(self.tmp.name, 'uploads'))
+        self.jobs = JobQueue(os.path.join(self.tmp.name, 'jobs.sqlite3'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_documents_become_ready_or_failed_in_the_background(self):
+        ingested = []
+
+        def ingest(record, job):
+            if record['file_name'] == 'broken.pdf':
+                raise ValueError("No text could be extracted")
+            job.progress('embedding', 3, 3)
+            ingested.append((record['doc_id'], threading.current_thread().name))
+            return {'chunks': 3}
+
+        queue = IngestionQueue(self.registry, ingest, self.jobs)
+        good, _ = self.registry.register('good.pdf', b'good')
+        broken, _ = self.registry.register('broken.pdf', b'broken')
+        job = queue.submit(good['doc_id'])
+        queue.submit(broken['doc_id'])
+        self.assertTrue(queue.join(timeout=10))
+
+        self.assertEqual(self.registry.find(good['doc_id'])['status'], READY)
+        self.assertEqual(self.registry.find(good['doc_id'])['job_id'], job['job_id'])
+        self.assertEqual(self.registry.find(broken['doc_id'])['status'], FAILED)
+        self.assertEqual(self.registry.find(broken['doc_id'])['error'], "No text could be extracted")
+        self.assertTrue(ingested[0][1].startswith('jobs'))
+        finished = self.jobs.find(job['job_id'])
+        self.assertEqual((finished['status'], finished['stage'], finished['done'], finished['result']), ('succeeded', 'embedding', 3, {'chunks': 3}))
+
+    def test_failed_upload_can_be_registered_again(self):
+        record, _ = self.registry.register('lease.pdf', b'lease')
+        self.registry.set_status(record['doc_id'], FAILED, error="boom")
+
+        again, created = self.registry.register('lease.pdf', b'lease')
+
+        self.assertTrue(created)
+        self.assertEqual(again['status'], QUEUED)
+
+    def test_resume_requeues_unfinished_documents_of_every_tenant(self):
+        queued, _ = self.registry.register('a.pdf', b'a', tenant='acme')
+        interrupted, _ = self.registry.register('b.pdf', b'b')
+        done, _ = self.registry.register('c.pdf', b'c')
+        self.registry.set_status(interrupted['doc_id'], 'ingesting')
+        self.registry.set_status(done['doc_id'], READY)
+        ingested = []
+
+        queue = IngestionQueue(self.registry, lambda record, job: ingested.append(record['doc_id']), self.jobs)
+        self.assertEqual(queue.resume(), 2)
+        self.assertTrue(queue.join(timeout=10))
+
+        self.assertEqual(sorted(ingested), sorted([queued['doc_id'], interrupted['doc_id']]))
+
+class TestDocumentRouting(unittest.TestCase):
+
+    def setUp(self):
+        from src.async_app import create_async_app
+        # async_app imports its siblings by bare name, so its registry must come from that module too
+        from documents import DocumentRegistry
+        self.tmp = tempfile.TemporaryDirectory()
+        self.registry = DocumentRegistry(os.path.join(self.tmp.name, 'documents.json'), os.path.join(self.tmp.name, 'uploads'))
+        self.pipelines = Mock()
+        self.app = create_async_app(pipelines=self.pipelines, answer_cache=None, contract_path='contract.pdf', eval_path='eval.txt',
+                                    model_name='gpt-3.5-turbo', documents=self.registry)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def get(self, path, **params):
+        async def request():
+            response = await self.app.test_client().get(path, query_string=params, headers={'X-Tenant-ID': 'acme'})
+            return response.status_code, await response.get_json()
+        return asyncio.run(request())
+
+    def test_unknown_and_unready_documents_are_rejected(self):
+        record, _ = self.registry.register('lease.pdf', b'lease', tenant='acme')
+
+        self.assertEqual(self.get('/process_text', text='escrow?', doc_id='missing')[0], 404)
+        status, body = self.get('/process_text', text='escrow?', doc_id=record['doc_id'])
+        self.assertEqual((status, body['status']), (409, QUEUED))
+        self.assertEqual(self.get(f"/documents/{record['doc_id']}")[1]['file_name'], 'lease.pdf')
+        self.pipelines.get.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
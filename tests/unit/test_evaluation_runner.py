@@ -0,0 +1,122 @@
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+import unittest
+from src.answer_cache import MemoryBackend
+from src.evaluation_runner import EvaluationRunner, RateLimiter, read_dataset, read_checkpoint, write_parquet
+
+class TestReadDataset(unittest.TestCase):
+
+    def test_jsonl_and_csv(self):
+        with tempfile.TemporaryDirectory() as directory:
+            jsonl = os.path.join(directory, 'set.jsonl')
+            with open(jsonl, 'w') as file:
+                file.write(json.dumps({'id': 7, 'question': 'Escrow?', 'ground_truths': ['$1,000,000']}) + "\n\n")
+            csv_path = os.path.join(directory, 'set.csv')
+            with open(csv_path, 'w') as file:
+                file.write("question,ground_truth\nBonus?,No\n")
+
+            self.assertEqual(read_dataset(jsonl), [{'id': '7', 'question': 'Escrow?', 'ground_truths': ['$1,000,000']}])
+            [example] = read_dataset(csv_path)
+            self.assertEqual((example['question'], example['ground_truths'], len(example['id'])), ('Bonus?', ['No'], 16))
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_calls_beyond_the_burst_wait_for_the_rate(self):
+        now, waits = [0.0], []
+        limiter = RateLimiter(rate=2.0, burst=2, clock=lambda: now[0], sleep=waits.append)
+
+        for _ in range(4):
+            limiter.acquire()
+        now[0] = 10.0
+        limiter.acquire()
+
+        self.assertEqual(waits, [0.5, 1.0])
+
+class TestEvaluationRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.checkpoint = os.path.join(self.tmp.name, 'run.checkpoint.jsonl')
+        self.examples = [{'id': str(i), 'question': f"q{i}", 'ground_truths': [f"t{i}"]} for i in range(5)]
+        self.calls = {'length': 0, 'recall': 0}
+        self.lock = threading.Lock()
+        self.fail_recall = {'q3'}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def answer(self, question):
+        return f"answer to {question}", [f"context of {question}"]
+
+    def length(self, question, answer, contexts, ground_truths):
+        with self.lock:
+            self.calls['length'] += 1
+        return len(answer)
+
+    def recall(self, question, answer, contexts, ground_truths):
+        with self.lock:
+            self.calls['recall'] += 1
+        if question in self.fail_recall:
+            raise RuntimeError("rate limited")
+        return 1.0
+
+    def runner(self, cache):
+        return EvaluationRunner(self.answer, {'length': self.length, 'recall': self.recall}, max_concurrency=3,
+                                cache=cache, checkpoint_path=self.checkpoint)
+
+    def test_failed_examples_are_resumed_and_metrics_come_from_the_cache(self):
+        cache = MemoryBackend()
+        rows = self.runner(cache).run(self.examples)
+
+        self.assertEqual(len(rows), 5)
+        failed = [row for row in rows if row['error'] is not None]
+        self.assertEqual([(row['id'], row['length'], row['recall'], row['error']) for row in failed],
+                         [('3', len("answer to q3"), None, "recall: rate limited")])
+        self.assertEqual(self.calls, {'length': 5, 'recall': 5})
+
+        self.fail_recall = set()
+        progress = []
+        resumed = self.runner(cache)
+        rows = resumed.run(self.examples, progress=lambda done, total: progress.append((done, total)))
+
+        self.assertEqual([(row['id'], row['recall'], row['error']) for row in rows], [('3', 1.0, None)])
+        self.assertEqual(self.calls, {'length': 5, 'recall': 6})
+        self.assertEqual(resumed.counts, {'answered': 1, 'metric_calls': 1, 'cached': 1})
+        self.assertEqual(progress, [(5, 5)])
+        self.assertEqual(resumed.finished_ids(), {str(i) for i in range(5)})
+
+    def test_answer_errors_skip_the_metrics(self):
+        def answer(question):
+            raise TimeoutError("no answer")
+
+        rows = EvaluationRunner(answer, {'length': self.length}).run(self.examples[:1])
+
+        self.assertEqual(rows[0]['error'], "answer: no answer")
+        self.assertEqual(self.calls['length'], 0)
+
+    def test_a_line_cut_off_by_an_interruption_is_ignored(self):
+        with open(self.checkpoint, 'w') as file:
+            file.write(json.dumps({'id': '0', 'error': None}) + "\n" + '{"id": "1", "err')
+
+        self.assertEqual([row['id'] for row in read_checkpoint(self.checkpoint)], ['0'])
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), "pyarrow is not installed")
+    def test_parquet_holds_the_latest_row_of_every_example(self):
+        import pyarrow.parquet as pq
+        cache = MemoryBackend()
+        self.runner(cache).run(self.examples)
+        self.fail_recall = set()
+        self.runner(cache).run(self.examples)
+        output = os.path.join(self.tmp.name, 'run.parquet')
+
+        summary = write_parquet(self.checkpoint, output, ['length', 'recall'], batch_size=2)
+
+        table = pq.read_table(output)
+        self.assertEqual((table.num_rows, summary['rows'], summary['errors'], summary['means']['recall']), (5, 5, 0, 1.0))
+        self.assertEqual(sorted(table.column('id').to_pylist()), [str(i) for i in range(5)])
+
+if __name__ == '__main__':
+    unittest.main()
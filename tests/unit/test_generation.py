@@ -4,7 +4,7 @@ from src.generation import Generation  # Replace 'your_module' with the actual m
 
 class TestGeneration(unittest.TestCase):
 
-    @patch("src.generation.OpenAI")
+    @patch("src.generation.openai_client")
     def setUp(self, mock_openai):
         self.generation = Generation(model_name="gpt-4-turbo-preview")
 
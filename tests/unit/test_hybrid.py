@@ -0,0 +1,76 @@
+import threading
+import unittest
+from langchain_core.documents import Document
+from src.hybrid import HybridRetriever, reciprocal_rank_fusion, where_filter
+
+class TestHybridRetriever(unittest.TestCase):
+
+    def test_rrf_rewards_items_found_by_both_sources(self):
+        fused = reciprocal_rank_fusion({
+            'lexical': ["Escrow Amount is $1,000,000.", "Closing date."],
+            'vector': [Document(page_content="Governing law."), Document(page_content="escrow  amount is $1,000,000.")],
+        })
+
+        self.assertEqual([sources for _, _, sources in fused][0], ['lexical', 'vector'])
+        self.assertEqual(fused[0][0], "Escrow Amount is $1,000,000.")
+        self.assertEqual(len(fused), 3)
+
+    def test_weights_change_the_order(self):
+        rankings = {'lexical': ["a"], 'vector': ["b"]}
+
+        self.assertEqual(reciprocal_rank_fusion(rankings, weights={'vector': 2.0})[0][0], "b")
+
+    def test_searches_run_in_parallel_and_are_capped(self):
+        barrier = threading.Barrier(2, timeout=2)
+
+        def lexical(query):
+            barrier.wait()
+            return [f"keyword {i}" for i in range(5)]
+
+        def vector(query, k):
+            barrier.wait()
+            return [Document(page_content=f"vector {i}") for i in range(k)]
+
+        hybrid = HybridRetriever(lexical, vector, vector_k=4, max_candidates=6)
+        candidates = hybrid.search("escrow")
+
+        self.assertEqual(len(candidates), 6)
+        self.assertEqual(candidates[:2], ["keyword 0", Document(page_content="vector 0")])
+
+    def test_concurrent_queries_do_not_queue_behind_each_other(self):
+        # Four queries, each with a lexical and a vector search, all in flight at once
+        barrier = threading.Barrier(8, timeout=2)
+
+        def search(*args):
+            barrier.wait()
+            return []
+
+        hybrid = HybridRetriever(search, search)
+        threads = [threading.Thread(target=hybrid.search, args=("escrow",)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertFalse(barrier.broken)
+
+    def test_filters_only_run_the_vector_search(self):
+        calls = []
+
+        def vector(query, k, filters=None):
+            calls.append(filters)
+            return [Document(page_content="2.1 Purchase Price.", metadata={'section': '2.1'})]
+
+        hybrid = HybridRetriever(lambda query: ["keyword"], vector)
+
+        self.assertEqual(hybrid.gather("price", {'section': '2.1'})['lexical'], [])
+        self.assertEqual(hybrid.search("price"), ["keyword", Document(page_content="2.1 Purchase Price.", metadata={'section': '2.1'})])
+        self.assertEqual(calls, [{'section': '2.1'}, None])
+
+    def test_where_filter_requires_every_value(self):
+        self.assertIsNone(where_filter({}))
+        self.assertEqual(where_filter({'section': '2.1'}), {'path': ['section'], 'operator': 'Equal', 'valueText': '2.1'})
+        self.assertEqual(where_filter({'section': '2.1', 'page': 3})['operands'][1], {'path': ['page'], 'operator': 'Equal', 'valueInt': 3})
+
+if __name__ == '__main__':
+    unittest.main()
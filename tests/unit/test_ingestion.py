@@ -0,0 +1,205 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+import numpy as np
+from src.embedding_store import EmbeddingStore, open_store
+
+class FakeBatch:
+    """Weaviate batch that rejects the objects whose text is in reject and reports results to the callback."""
+
+    def __init__(self, store, reject=()):
+        self.store = store
+        self.reject = set(reject)
+        self.options = {}
+
+    def configure(self, **kwargs):
+        self.options = kwargs
+
+    def __enter__(self):
+        self.results = []
+        return self
+
+    def __exit__(self, *exc):
+        if self.options.get('callback'):
+            self.options['callback'](self.results)
+        return False
+
+    def add_data_object(self, data_object, class_name, uuid, vector):
+        if data_object['text'] in self.reject:
+            self.results.append({'id': uuid, 'result': {'errors': {'error': [{'message': "invalid vector"}]}}})
+            return
+        self.store[uuid] = (class_name, data_object, vector)
+        self.results.append({'id': uuid, 'result': {}})
+
+class FakeEmbeddings:
+
+    def __init__(self, fail_on_call=None):
+        self.calls = 0
+        self.fail_on_call = fail_on_call
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError("rate limited")
+        return [[float(len(text)), 1.0] for text in texts]
+
+class TestIngestionPipeline(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch("ingestion.Logger")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        from ingestion import IngestionPipeline
+        self.IngestionPipeline = IngestionPipeline
+        self.store = {}
+        self.client = MagicMock()
+        self.client.batch = FakeBatch(self.store)
+        self.client.schema.exists.return_value = False
+        self.chunks = [("RaptorContractdocx", "contract.pdf", i, f"chunk {i}") for i in range(10)]
+
+    def test_writes_all_chunks_in_batches(self):
+        embeddings = FakeEmbeddings()
+        pipeline = self.IngestionPipeline(self.client, embeddings, batch_size=4, embedding_concurrency=2)
+
+        stats = pipeline.write(iter(self.chunks))
+
+        self.assertEqual(stats['chunks'], 10)
+        self.assertEqual(len(self.store), 10)
+        self.assertEqual(embeddings.calls, 3)
+        self.client.schema.create_class.assert_called_once()
+        self.assertGreater(stats['chunks_per_second'], 0)
+
+    def test_resumes_from_checkpoint_after_failure(self):
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, 'checkpoint.jsonl')
+            failing = self.IngestionPipeline(self.client, FakeEmbeddings(fail_on_call=2), batch_size=4, embedding_concurrency=1, checkpoint_path=checkpoint)
+            with self.assertRaises(RuntimeError):
+                failing.write(iter(self.chunks))
+
+            embeddings = FakeEmbeddings()
+            stats = self.IngestionPipeline(self.client, embeddings, batch_size=4, checkpoint_path=checkpoint).write(iter(self.chunks))
+
+        self.assertEqual(stats['skipped'], 4)
+        self.assertEqual(stats['chunks'], 6)
+        self.assertEqual(embeddings.calls, 2)
+        self.assertEqual(len(self.store), 10)
+
+    def test_sync_only_embeds_changed_chunks_and_deletes_removed_ones(self):
+        with tempfile.TemporaryDirectory() as directory:
+            def pipeline(embeddings):
+                return self.IngestionPipeline(self.client, embeddings, batch_size=4,
+                                              embedding_store=EmbeddingStore("fake-model", directory),
+                                              manifest_path=os.path.join(directory, 'manifest.json'))
+
+            original = [f"clause {i}" for i in range(8)]
+            first = pipeline(FakeEmbeddings()).sync("RaptorContractdocx", "contract.pdf", original)
+
+            revised = original[:6] + ["clause 6 (amended)"]
+            embeddings = FakeEmbeddings()
+            second = pipeline(embeddings).sync("RaptorContractdocx", "contract.pdf", revised)
+
+        self.assertEqual((first['chunks'], first['embedded']), (8, 8))
+        self.assertEqual((second['chunks'], second['embedded'], second['unchanged'], second['deleted']), (1, 1, 6, 2))
+        self.assertEqual(embeddings.calls, 1)
+        self.assertEqual(self.client.data_object.delete.call_count, 2)
+
+    def test_sync_stores_chunk_properties(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pipeline = self.IngestionPipeline(self.client, FakeEmbeddings(), manifest_path=os.path.join(directory, 'manifest.json'))
+            pipeline.sync("RaptorContractdocx", "contract.pdf", ["clause 1", "clause 2"],
+                          metadatas=[{'page': 1, 'section': '1.1'}, {'page': 2, 'section': '1.2'}])
+
+        properties = sorted((data['text'], data['page'], data['section']) for _, data, _ in self.store.values())
+        self.assertEqual(properties, [("clause 1", 1, '1.1'), ("clause 2", 2, '1.2')])
+
+    def test_rejected_chunks_are_neither_checkpointed_nor_recorded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            def pipeline():
+                return self.IngestionPipeline(self.client, FakeEmbeddings(), batch_size=2,
+                                              checkpoint_path=os.path.join(directory, 'checkpoint.jsonl'),
+                                              manifest_path=os.path.join(directory, 'manifest.json'))
+
+            self.client.batch = FakeBatch(self.store, reject=["clause 1"])
+            with self.assertRaises(RuntimeError):
+                pipeline().sync("Contract", "contract.pdf", ["clause 0", "clause 1", "clause 2"])
+
+            self.client.batch = FakeBatch(self.store)
+            retry = pipeline().sync("Contract", "contract.pdf", ["clause 0", "clause 1", "clause 2"])
+
+        self.assertEqual((retry['chunks'], retry['unchanged'], retry['failed']), (1, 2, 0))
+        self.assertEqual(sorted(data['text'] for _, data, _ in self.store.values()), ["clause 0", "clause 1", "clause 2"])
+
+    def test_concurrent_syncs_keep_each_others_manifest_entries(self):
+        with tempfile.TemporaryDirectory() as directory:
+            manifest_path = os.path.join(directory, 'manifest.json')
+            other = self.IngestionPipeline(self.client, FakeEmbeddings(), manifest_path=manifest_path)
+
+            class InterleavedEmbeddings(FakeEmbeddings):
+                def embed_documents(self, texts):
+                    # Another job syncs its document while this one is embedding
+                    other.sync("Other", "other.pdf", ["other clause"])
+                    return super().embed_documents(texts)
+
+            self.IngestionPipeline(self.client, InterleavedEmbeddings(), manifest_path=manifest_path).sync("Contract", "contract.pdf", ["clause"])
+
+            with open(manifest_path) as file:
+                manifest = json.load(file)
+
+        self.assertEqual(sorted(manifest), ["Contract", "Other"])
+
+    def test_first_sync_deletes_objects_without_a_source(self):
+        legacy = [{'id': f"legacy-{i}", 'properties': {'text': f"clause {i}"}} for i in range(3)]
+        synced = [{'id': "synced", 'properties': {'text': "clause 0", 'source': "other.pdf"}}]
+        pages = {None: legacy[:2], "legacy-1": legacy[2:] + synced, "synced": []}
+        self.client.schema.exists.return_value = True
+        self.client.data_object.get.side_effect = lambda class_name, limit, after: {'objects': pages[after]}
+
+        with tempfile.TemporaryDirectory() as directory:
+            def pipeline():
+                return self.IngestionPipeline(self.client, FakeEmbeddings(), batch_size=2,
+                                              manifest_path=os.path.join(directory, 'manifest.json'))
+
+            first = pipeline().sync("RaptorContractdocx", "contract.pdf", ["clause 0", "clause 1", "clause 2"])
+            second = pipeline().sync("RaptorContractdocx", "contract.pdf", ["clause 0", "clause 1", "clause 2"])
+
+        deleted = sorted(call.kwargs['uuid'] for call in self.client.data_object.delete.call_args_list)
+        self.assertEqual(deleted, ["legacy-0", "legacy-1", "legacy-2"])
+        self.assertEqual((first['legacy_deleted'], first['chunks']), (3, 3))
+        self.assertEqual((second['legacy_deleted'], second['unchanged']), (0, 3))
+
+class TestEmbeddingStore(unittest.TestCase):
+
+    def test_vectors_persist_and_are_reused(self):
+        with tempfile.TemporaryDirectory() as directory:
+            embeddings = FakeEmbeddings()
+            store = EmbeddingStore("fake-model", directory)
+            vectors, embedded = store.embed(["a", "bb", "a"], embeddings.embed_documents)
+
+            reopened = EmbeddingStore("fake-model", directory)
+            again, embedded_again = reopened.embed(["bb", "ccc"], embeddings.embed_documents)
+            other_model = EmbeddingStore("other-model", directory)
+
+            self.assertEqual(embedded, 2)
+            self.assertEqual(embedded_again, 1)
+            self.assertEqual(len(reopened), 3)
+            np.testing.assert_array_equal(again[0], vectors[1])
+            self.assertEqual(again[1].dtype, np.float32)
+            self.assertEqual(other_model.get_many(["a"]), [None])
+
+    def test_instances_sharing_a_directory_see_each_others_rows(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = EmbeddingStore("fake-model", directory)
+            second = EmbeddingStore("fake-model", directory)
+            second.put_many(["a"], [[1.0, 1.0]])
+            first.put_many(["bb", "a"], [[2.0, 1.0], [9.0, 9.0]])
+
+            vectors = first.get_many(["a", "bb"]) + second.get_many(["bb"])
+
+            self.assertEqual([vector.tolist() for vector in vectors], [[1.0, 1.0], [2.0, 1.0], [2.0, 1.0]])
+            self.assertEqual(os.path.getsize(os.path.join(second.directory, 'keys.bin')), 2 * 32)
+            self.assertIs(open_store("fake-model", directory), open_store("fake-model", directory))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from src.jobs import JobQueue, QUEUED, RUNNING, SUCCEEDED, FAILED
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'jobs.sqlite3')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_results_failures_and_progress_are_recorded(self):
+        jobs = JobQueue(self.path)
+
+        def handler(job):
+            if job.payload['n'] < 0:
+                raise ValueError("negative")
+            job.progress('counting', job.payload['n'], job.payload['n'])
+            return {'square': job.payload['n'] ** 2}
+
+        jobs.register('square', handler)
+        good = jobs.submit('square', {'n': 3}, tenant='acme')
+        bad = jobs.submit('square', {'n': -1})
+        self.assertTrue(jobs.join(timeout=10))
+
+        good = jobs.get(good['job_id'], tenant='acme')
+        self.assertEqual((good['status'], good['result'], good['stage'], good['done'], good['attempts']), (SUCCEEDED, {'square': 9}, 'counting', 3, 1))
+        self.assertEqual((jobs.find(bad['job_id'])['status'], jobs.find(bad['job_id'])['error']), (FAILED, "negative"))
+        self.assertIsNone(jobs.get(good['job_id'], tenant='globex'))
+        self.assertEqual(jobs.stats()[SUCCEEDED], 1)
+
+    def test_unknown_kinds_are_rejected(self):
+        with self.assertRaises(ValueError):
+            JobQueue(self.path).submit('missing', {})
+
+    def test_resource_limits_hold_across_workers(self):
+        jobs = JobQueue(self.path, workers=4, limits={'parse': 1, 'embed': 2})
+        lock = threading.Lock()
+        active = {'parse': 0, 'embed': 0}
+        peak = {'parse': 0, 'embed': 0}
+
+        def use(resource):
+            with lock:
+                active[resource] += 1
+                peak[resource] = max(peak[resource], active[resource])
+            time.sleep(0.02)
+            with lock:
+                active[resource] -= 1
+
+        def handler(job):
+            for resource in ('parse', 'embed'):
+                with job.resource(resource):
+                    use(resource)
+
+        jobs.register('ingest', handler)
+        for _ in range(6):
+            jobs.submit('ingest', {})
+        self.assertTrue(jobs.join(timeout=10))
+
+        self.assertEqual(peak['parse'], 1)
+        self.assertLessEqual(peak['embed'], 2)
+        self.assertEqual(jobs.stats()[SUCCEEDED], 6)
+
+    def test_queued_and_interrupted_jobs_survive_a_restart(self):
+        crashed = JobQueue(self.path, workers=0)
+        crashed.register('ingest', lambda job: None)
+        interrupted = crashed.submit('ingest', {'doc_id': 'a'})
+        waiting = crashed.submit('ingest', {'doc_id': 'b'})
+        with crashed._condition:
+            crashed._claim()
+        self.assertEqual(crashed.find(interrupted['job_id'])['status'], RUNNING)
+        crashed.close()
+
+        ran = []
+        restarted = JobQueue(self.path, workers=1)
+        restarted.register('ingest', lambda job: ran.append(job.payload['doc_id']))
+        self.assertEqual(restarted.recover(), 2)
+        self.assertTrue(restarted.join(timeout=10))
+
+        self.assertEqual(ran, ['a', 'b'])
+        self.assertEqual(restarted.find(interrupted['job_id'])['attempts'], 2)
+        self.assertEqual(restarted.find(waiting['job_id'])['status'], SUCCEEDED)
+
+    def test_jobs_interrupted_too_often_are_failed(self):
+        crashed = JobQueue(self.path, workers=0, max_attempts=1)
+        crashed.register('ingest', lambda job: None)
+        job = crashed.submit('ingest', {})
+        with crashed._condition:
+            crashed._claim()
+        crashed.close()
+
+        restarted = JobQueue(self.path, workers=1, max_attempts=1)
+        restarted.register('ingest', lambda job: None)
+
+        self.assertEqual(restarted.recover(), 0)
+        self.assertEqual(restarted.find(job['job_id'])['status'], FAILED)
+        self.assertEqual(restarted.jobs(status=QUEUED), [])
+
+    def test_queues_sharing_a_database_run_every_job_once(self):
+        release = threading.Event()
+        runs = []
+        lock = threading.Lock()
+
+        def handler(name):
+            def run(job):
+                with lock:
+                    runs.append((name, job.payload['n']))
+                release.wait(10)
+            return run
+
+        first = JobQueue(self.path, workers=2)
+        first.register('ingest', handler('first'))
+        for n in range(4):
+            first.submit('ingest', {'n': n})
+        while len(runs) < 2:
+            time.sleep(0.01)
+
+        # A second process starting up (e.g. the reloader's child) must not restart the jobs the first one runs
+        second = JobQueue(self.path, workers=2)
+        second.register('ingest', handler('second'))
+        self.assertEqual(second.recover(), 2)
+        release.set()
+        self.assertTrue(first.join(timeout=10))
+        self.assertTrue(second.join(timeout=10))
+
+        self.assertEqual(sorted(n for _, n in runs), [0, 1, 2, 3])
+        self.assertEqual(first.stats()[SUCCEEDED], 4)
+
+    def test_jobs_of_a_dead_process_are_recovered(self):
+        crashed = JobQueue(self.path, workers=0)
+        crashed.register('ingest', lambda job: None)
+        job = crashed.submit('ingest', {})
+        with crashed._condition:
+            crashed._claim()
+        # pid 0x7fffffff does not exist
+        crashed._update(job['job_id'], owner='2147483647:dead')
+
+        restarted = JobQueue(self.path, workers=1)
+        restarted.register('ingest', lambda job: None)
+
+        self.assertEqual(restarted.recover(), 1)
+        self.assertTrue(restarted.join(timeout=10))
+        self.assertEqual(restarted.find(job['job_id'])['status'], SUCCEEDED)
+
+if __name__ == '__main__':
+    unittest.main()
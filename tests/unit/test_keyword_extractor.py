@@ -0,0 +1,39 @@
+import unittest
+from src.keyword_index import KeywordIndex
+from src.keyword_extractor import LocalKeywordExtractor
+
+PARAGRAPHS = [
+    "“Escrow Amount” means $1,000,000 to be deposited with the Escrow Agent.",
+    "The Escrow Agent shall release the escrow after eighteen months.",
+    "The Sellers shall have no liability for breach of representations, except in the case of fraud.",
+    "The Buyer shall pay the Purchase Price at Closing.",
+    "The Buyer shall deliver the Closing certificate.",
+]
+
+class TestLocalKeywordExtractor(unittest.TestCase):
+
+    def setUp(self):
+        self.extractor = LocalKeywordExtractor(KeywordIndex(PARAGRAPHS))
+
+    def test_prefers_phrase_present_in_document(self):
+        keyword, confidence = self.extractor.extract("How much is the escrow amount?")
+
+        self.assertEqual(keyword, "escrow amount")
+        self.assertGreater(confidence, 0.5)
+
+    def test_specific_terms_beat_common_terms(self):
+        keyword, _ = self.extractor.extract("When does the Buyer pay the purchase price?")
+
+        self.assertEqual(keyword, "purchase price")
+
+    def test_no_document_terms_means_no_keyword(self):
+        self.assertEqual(self.extractor.extract("What is the indemnification cap?"), (None, 0.0))
+
+    def test_common_term_has_lower_confidence(self):
+        _, rare = self.extractor.extract("What about fraud?")
+        _, common = self.extractor.extract("What about the buyer?")
+
+        self.assertGreater(rare, common)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from src.keyword_index import KeywordIndex, tokenize
+
+PARAGRAPHS = [
+    "1. Definitions",
+    "“Escrow Amount” means $1,000,000.",
+    "The Escrow Agent shall hold the Escrow Amount in escrow until the release date.",
+    "The Buyer shall pay the Closing Bonus Amount.",
+    "Amount escrow, reversed order.",
+]
+
+class TestKeywordIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = KeywordIndex(PARAGRAPHS)
+
+    def test_tokenize_case_folds_and_drops_punctuation(self):
+        self.assertEqual(tokenize("“Escrow Amount” means $1,000,000."), ["escrow", "amount", "means", "1", "000", "000"])
+
+    def test_keyword_lookup_is_case_insensitive_and_ranked(self):
+        self.assertEqual(self.index.search("ESCROW."), [2, 4, 1])
+
+    def test_phrase_lookup_requires_consecutive_tokens(self):
+        self.assertEqual(sorted(self.index.search("escrow amount")), [1, 2])
+
+    def test_unknown_keyword_matches_nothing(self):
+        self.assertEqual(self.index.search("indemnification"), [])
+        self.assertEqual(self.index.search("?!"), [])
+
+    def test_matching_paragraphs_returns_texts(self):
+        self.assertEqual(self.index.matching_paragraphs("buyer"), ["The Buyer shall pay the Closing Bonus Amount."])
+        self.assertEqual(len(self.index.matching_paragraphs("escrow", limit=2)), 2)
+
+    def test_rare_terms_weigh_more(self):
+        self.assertGreater(self.index.idf("buyer"), self.index.idf("escrow"))
+
+if __name__ == '__main__':
+    unittest.main()
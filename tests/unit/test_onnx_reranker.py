@@ -0,0 +1,85 @@
+import importlib.util
+import os
+import unittest
+from types import SimpleNamespace
+import numpy as np
+from src.onnx_reranker import ONNXCrossEncoder, onnx_dir, INT8_FILE
+from src.reranker import Reranker, DEFAULT_MODEL
+
+PAIRS = [
+    ["What is the escrow amount?", "The escrow amount is $1,000,000 and is held by the escrow agent."],
+    ["What is the escrow amount?", "The Sellers have no liability for breach of representations except in the case of fraud."],
+    ["Who pays the closing bonus?", "The Company shall pay the Employees Closing Bonus Amount at Closing."],
+    ["Who pays the closing bonus?", "This Agreement is governed by the laws of the State of Delaware."],
+    ["When can the agreement be terminated?", "Either party may terminate this Agreement on thirty days written notice."],
+    ["When can the agreement be terminated?", "The purchase price shall be adjusted for working capital at closing."],
+]
+
+class WordTokenizer:
+    """Pads [query words, passage words] to the longest pair, like a Hugging Face tokenizer with return_tensors='np'."""
+
+    def __call__(self, queries, passages, padding, truncation, max_length, return_tensors):
+        lengths = [min(len(query.split()) + len(passage.split()), max_length) for query, passage in zip(queries, passages)]
+        width = max(lengths)
+        mask = np.array([[1] * length + [0] * (width - length) for length in lengths])
+        return {'input_ids': mask * 7, 'attention_mask': mask, 'token_type_ids': np.zeros_like(mask)}
+
+class FakeSession:
+    """Scores a pair by its number of tokens; only takes the inputs it declares."""
+
+    def __init__(self):
+        self.feeds = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name='input_ids'), SimpleNamespace(name='attention_mask')]
+
+    def run(self, outputs, feed):
+        self.feeds.append(feed)
+        return [feed['attention_mask'].sum(axis=1, keepdims=True).astype(np.float32)]
+
+class TestONNXCrossEncoder(unittest.TestCase):
+
+    def test_batches_feed_the_declared_inputs_and_return_one_logit_per_pair(self):
+        session = FakeSession()
+        model = ONNXCrossEncoder('unused', session=session, tokenizer=WordTokenizer(), max_length=12)
+
+        scores = model.predict(PAIRS[:3], batch_size=2)
+
+        self.assertEqual(scores.tolist(), [12.0, 12.0, 12.0])
+        self.assertEqual([sorted(feed) for feed in session.feeds], [['attention_mask', 'input_ids']] * 2)
+        self.assertTrue(all(feed['input_ids'].dtype == np.int64 for feed in session.feeds))
+        self.assertEqual(model.predict([]).shape, (0,))
+
+    def test_reranker_uses_it_like_a_cross_encoder(self):
+        model = ONNXCrossEncoder('unused', session=FakeSession(), tokenizer=WordTokenizer())
+        reranker = Reranker(model=model, batch_size=4)
+
+        passages = [passage for _, passage in PAIRS[:2]]
+        self.assertEqual(reranker.score(PAIRS[0][0], passages).tolist(), [17.0, 20.0])
+
+    def test_export_directory_follows_the_model_name(self):
+        self.assertTrue(onnx_dir('cross-encoder/ms-marco-MiniLM-L-6-v2', root='/tmp/onnx').endswith('cross-encoder--ms-marco-MiniLM-L-6-v2'))
+
+@unittest.skipUnless(importlib.util.find_spec('onnxruntime') and os.path.exists(os.path.join(onnx_dir(DEFAULT_MODEL), INT8_FILE)),
+                     "needs onnxruntime and an export: cd src && python onnx_reranker.py")
+class TestParityWithPyTorch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            from sentence_transformers import CrossEncoder
+            cls.torch_scores = np.asarray(CrossEncoder(DEFAULT_MODEL).predict(PAIRS), dtype=np.float64)
+        except OSError as e:
+            raise unittest.SkipTest(f"{DEFAULT_MODEL} cannot be loaded: {e}")
+        cls.onnx_scores = ONNXCrossEncoder(onnx_dir(DEFAULT_MODEL)).predict(PAIRS, batch_size=4).astype(np.float64)
+
+    def test_int8_scores_track_the_pytorch_scores(self):
+        self.assertGreater(np.corrcoef(self.torch_scores, self.onnx_scores)[0, 1], 0.99)
+        self.assertLess(np.max(np.abs(self.torch_scores - self.onnx_scores)), 0.5)
+
+    def test_int8_keeps_the_best_passage_of_every_question(self):
+        for start in range(0, len(PAIRS), 2):
+            self.assertEqual(np.argmax(self.torch_scores[start:start + 2]), np.argmax(self.onnx_scores[start:start + 2]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import threading
+import time
+import unittest
+from src.pipeline import Pipeline, PipelineRegistry
+
+class TestPipelineRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.builds = []
+
+        def factory(file_path, eval_path, model_name):
+            self.builds.append((file_path, eval_path, model_name))
+            time.sleep(0.05)
+            return Pipeline(retriever=object(), generation=object())
+
+        self.registry = PipelineRegistry(factory)
+
+    def test_builds_once_per_key(self):
+        first = self.registry.get("contract.pdf", "eval.txt", "gpt-3.5-turbo")
+        second = self.registry.get("contract.pdf", "eval.txt", "gpt-3.5-turbo")
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.builds), 1)
+
+    def test_different_models_get_different_pipelines(self):
+        first = self.registry.get("contract.pdf", "eval.txt", "gpt-3.5-turbo")
+        second = self.registry.get("contract.pdf", "eval.txt", "gpt-4")
+
+        self.assertIsNot(first, second)
+        self.assertEqual(len(self.builds), 2)
+
+    def test_concurrent_cold_lookups_share_one_build(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.registry.get("contract.pdf", "eval.txt", "gpt-3.5-turbo"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.builds), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_stats_reports_cold_and_warm_paths(self):
+        self.registry.get("contract.pdf", "eval.txt", "gpt-3.5-turbo")
+        self.registry.get("contract.pdf", "eval.txt", "gpt-3.5-turbo")
+
+        stats = self.registry.stats()
+
+        self.assertEqual(stats['pipelines'], 1)
+        self.assertEqual(stats['cold']['count'], 1)
+        self.assertEqual(stats['warm']['count'], 1)
+        self.assertGreater(stats['cold']['mean_seconds'], stats['warm']['mean_seconds'])
+
+    def test_least_recently_used_pipeline_is_evicted(self):
+        registry = PipelineRegistry(lambda file_path, eval_path, model_name: Pipeline(retriever=file_path, generation=None), max_pipelines=2)
+        registry.get("a.pdf", "eval.txt", "gpt-3.5-turbo")
+        registry.get("b.pdf", "eval.txt", "gpt-3.5-turbo")
+        registry.get("a.pdf", "eval.txt", "gpt-3.5-turbo")
+        registry.get("c.pdf", "eval.txt", "gpt-3.5-turbo")
+
+        registry.get("a.pdf", "eval.txt", "gpt-3.5-turbo")
+        stats = registry.stats()
+
+        self.assertEqual((stats['pipelines'], stats['evictions']), (2, 1))
+        self.assertEqual(stats['cold']['count'], 3)
+        registry.get("b.pdf", "eval.txt", "gpt-3.5-turbo")
+        self.assertEqual(registry.stats()['cold']['count'], 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from src.prompt_registry import PromptRegistry, PromptTemplate, get_registry
+
+class TestPromptTemplate(unittest.TestCase):
+
+    def test_render_fills_placeholders_and_keeps_json_braces(self):
+        template = PromptTemplate('answer', 'Example: {\n "assistant": "Google"\n}\ncontext: {context}\nquestion: {question}')
+
+        rendered = template.render(context="Escrow is $1,000,000.", question="How much is the escrow?")
+
+        self.assertEqual(rendered, 'Example: {\n "assistant": "Google"\n}\ncontext: Escrow is $1,000,000.\nquestion: How much is the escrow?')
+        self.assertEqual(template.placeholders, {'context', 'question'})
+
+    def test_values_are_not_rescanned_and_missing_values_are_kept(self):
+        template = PromptTemplate('eval', 'Context: {Context} Question: {Question}')
+
+        self.assertEqual(template.render(Context="literal {Question}"), 'Context: literal {Question} Question: {Question}')
+
+    def test_format_matches_str_format_for_keyword_prompt(self):
+        text = 'Suppose you wanted to ask the following question: {query}. Give me a single word.'
+        self.assertEqual(PromptTemplate('keywords', text).format(query="escrow?"), text.format(query="escrow?"))
+
+class TestPromptRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'greeting.txt')
+        with open(self.path, 'w') as file:
+            file.write('Hello {name}')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def rewrite(self, text):
+        with open(self.path, 'w') as file:
+            file.write(text)
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_templates_are_loaded_once_without_hot_reload(self):
+        registry = PromptRegistry(self.tmp.name)
+        self.rewrite('Bye {name}')
+
+        self.assertIs(registry.get('greeting'), registry.get('greeting.txt'))
+        self.assertEqual(registry.render('greeting', name='Ada'), 'Hello Ada')
+
+    def test_hot_reload_recompiles_changed_files(self):
+        registry = PromptRegistry(self.tmp.name, hot_reload=True)
+        self.assertEqual(registry.render('greeting', name='Ada'), 'Hello Ada')
+
+        self.rewrite('Bye {name}')
+
+        self.assertEqual(registry.render('greeting', name='Ada'), 'Bye Ada')
+
+    def test_shared_registry_holds_the_repo_prompts(self):
+        registry = get_registry()
+        self.assertEqual(registry.get('generic-evaluation-prompt').placeholders, {'Context', 'Question'})
+        self.assertEqual(registry.get('generate-answer').placeholders, {'context', 'question'})
+        self.assertEqual(registry.get('keywords').placeholders, {'query'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+from src.reranker import Reranker, top_k
+
+class FakeCrossEncoder:
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.calls.append(pairs)
+        return np.array([float(len(passage)) for _, passage in pairs])
+
+class TestReranker(unittest.TestCase):
+
+    def setUp(self):
+        self.model = FakeCrossEncoder()
+        self.reranker = Reranker(model=self.model, batch_size=2, cache_size=3)
+
+    def test_top_k_matches_full_sort(self):
+        scores = np.array([0.3, -1.0, 2.5, 0.9, 2.0])
+
+        self.assertEqual(top_k(scores, 3).tolist(), [2, 4, 3])
+        self.assertEqual(top_k(scores, 10).tolist(), list(np.argsort(scores)[::-1]))
+        self.assertEqual(top_k(scores, 0).tolist(), [])
+
+    def test_duplicates_are_scored_once(self):
+        scores = self.reranker.score("escrow", ["aa", "a", "aa", "aaa"])
+
+        self.assertEqual(scores.tolist(), [2.0, 1.0, 2.0, 3.0])
+        self.assertEqual(self.reranker.pairs_scored, 3)
+        self.assertEqual([len(batch) for batch in self.model.calls], [2, 1])
+
+    def test_cached_pairs_are_not_rescored(self):
+        self.reranker.score("escrow", ["aa", "a"])
+        self.reranker.score("escrow", ["a", "aaaa"])
+
+        self.assertEqual(self.reranker.pairs_scored, 3)
+
+    def test_cache_evicts_least_recently_used(self):
+        self.reranker.score("escrow", ["a", "aa", "aaa"])
+        self.reranker.score("escrow", ["a"])
+        self.reranker.score("escrow", ["aaaa"])
+        self.reranker.score("escrow", ["a", "aa"])
+
+        # "aa" was the least recently used entry when "aaaa" was added
+        self.assertEqual(self.reranker.pairs_scored, 5)
+
+    def test_thread_pool_gives_same_scores(self):
+        threaded = Reranker(model=FakeCrossEncoder(), batch_size=1, num_workers=4)
+        passages = ["a" * n for n in range(1, 9)]
+
+        self.assertEqual(threaded.rank("escrow", passages, 3), [7, 6, 5])
+
+if __name__ == '__main__':
+    unittest.main()
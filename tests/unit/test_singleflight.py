@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+import unittest
+from src.singleflight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.flights = SingleFlight()
+
+    def wait_for_callers(self, count):
+        while self.flights.stats()['coalesced'] < count:
+            time.sleep(0.001)
+
+    def test_concurrent_calls_with_one_key_run_once(self):
+        release = threading.Event()
+        calls = []
+
+        def compute(value):
+            calls.append(value)
+            release.wait(5)
+            return value * 2
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.flights.do('escrow', compute, 21))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        self.wait_for_callers(3)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual((calls, results), ([21], [42] * 4))
+        self.assertEqual(self.flights.do('escrow', compute, 1), 2)
+        self.assertEqual(self.flights.stats(), {'executed': 2, 'coalesced': 3})
+
+    def test_every_caller_receives_the_exception(self):
+        release = threading.Event()
+
+        def fail():
+            release.wait(5)
+            raise TimeoutError("evaluation timed out")
+
+        errors = []
+
+        def call():
+            try:
+                self.flights.do('key', fail)
+            except TimeoutError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=call) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        self.wait_for_callers(1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(errors, ["evaluation timed out"] * 2)
+
+    def test_async_callers_share_a_task_that_survives_one_cancellation(self):
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'true'
+
+        async def main():
+            first = asyncio.ensure_future(self.flights.ado(('query', 'passage'), compute))
+            second = asyncio.ensure_future(self.flights.ado(('query', 'passage'), compute))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second, await asyncio.gather(first, return_exceptions=True)
+
+        result, (cancelled,) = asyncio.run(main())
+
+        self.assertEqual((result, len(calls)), ('true', 1))
+        self.assertIsInstance(cancelled, asyncio.CancelledError)
+
+    def test_async_call_is_cancelled_once_every_caller_is(self):
+        finished = []
+
+        async def compute():
+            await asyncio.sleep(1)
+            finished.append(1)
+
+        async def main():
+            callers = [asyncio.ensure_future(self.flights.ado('key', compute)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            for caller in callers:
+                caller.cancel()
+            await asyncio.gather(*callers, return_exceptions=True)
+            await asyncio.sleep(0.01)
+            return self.flights._tasks
+
+        self.assertEqual(asyncio.run(main()), {})
+        self.assertEqual(finished, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import Mock
+from src.streaming import format_event, stream_answer, astream_answer
+
+def parse(events):
+    parsed = []
+    for event in events:
+        name, data = event.strip().split("\n")
+        parsed.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return parsed
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.retriever = Mock()
+        self.document = Mock(page_content="Escrow is $1,000,000.")
+
+        def retrieve_query(question, progress):
+            progress('keyword_match', {'matches': 2})
+            progress('evaluation', {'checked': 2, 'relevant': 2})
+            return [["The escrow amount is $1,000,000."], [self.document]]
+
+        self.retriever.retrieve_query.side_effect = retrieve_query
+        self.generation = Mock()
+        self.generation.assemble.return_value = ["The escrow amount is $1,000,000.", "Escrow is $1,000,000."]
+        self.generation.stream_answer.return_value = iter(["The escrow", " amount is", " $1,000,000."])
+
+    def test_format_event(self):
+        self.assertEqual(format_event('token', {'token': 'a'}), 'event: token\ndata: {"token": "a"}\n\n')
+
+    def test_events_are_emitted_in_pipeline_order(self):
+        events = parse(stream_answer(self.retriever, self.generation, "How much is the escrow amount?"))
+
+        self.assertEqual([name for name, _ in events], ['status', 'progress', 'progress', 'context', 'token', 'token', 'token', 'done'])
+        self.assertEqual(events[3][1]['passages'], ["The escrow amount is $1,000,000.", "Escrow is $1,000,000."])
+        self.assertEqual(events[-1][1]['result'], "The escrow amount is $1,000,000.")
+        self.generation.stream_answer.assert_called_once_with(
+            context="The escrow amount is $1,000,000.\n\nEscrow is $1,000,000.", question="How much is the escrow amount?")
+
+    def test_first_event_is_sent_before_retrieval(self):
+        events = stream_answer(self.retriever, self.generation, "How much is the escrow amount?")
+
+        first = next(events)
+
+        self.assertIn('event: status', first)
+        self.retriever.retrieve_query.assert_not_called()
+
+    def test_retrieval_error_is_streamed(self):
+        self.retriever.retrieve_query.side_effect = RuntimeError("weaviate unavailable")
+
+        events = parse(stream_answer(self.retriever, self.generation, "question"))
+
+        self.assertEqual(events[-1], ('error', {'error': "An error occurred: weaviate unavailable"}))
+        self.generation.stream_answer.assert_not_called()
+
+class TestAsyncStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.retriever = Mock()
+        self.generation = Mock()
+        self.generation.assemble.return_value = ["The escrow amount is $1,000,000."]
+
+        async def aretrieve_query(question, progress):
+            progress('keyword_match', {'matches': 1})
+            await asyncio.sleep(0)
+            progress('evaluation', {'checked': 1, 'relevant': 1})
+            return [["The escrow amount is $1,000,000."]]
+
+        async def astream_answer(context, question):
+            for token in ["The escrow", " is $1,000,000."]:
+                yield token
+
+        self.retriever.aretrieve_query = aretrieve_query
+        self.generation.astream_answer = astream_answer
+
+    def collect(self, question):
+        async def run():
+            return [event async for event in astream_answer(self.retriever, self.generation, question)]
+        return parse(asyncio.run(run()))
+
+    def test_events_match_the_sync_stream(self):
+        events = self.collect("How much is the escrow amount?")
+
+        self.assertEqual([name for name, _ in events], ['status', 'progress', 'progress', 'context', 'token', 'token', 'done'])
+        self.assertEqual(events[3][1]['passages'], ["The escrow amount is $1,000,000."])
+        self.assertEqual(events[-1][1]['result'], "The escrow is $1,000,000.")
+
+    def test_retrieval_error_is_streamed(self):
+        async def failing(question, progress):
+            raise RuntimeError("weaviate unavailable")
+        self.retriever.aretrieve_query = failing
+
+        events = self.collect("question")
+
+        self.assertEqual(events[-1], ('error', {'error': "An error occurred: weaviate unavailable"}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from src.sufficiency import SufficiencyClassifier, calibrate, read_examples
+
+class TestSufficiencyClassifier(unittest.TestCase):
+
+    def setUp(self):
+        self.classifier = SufficiencyClassifier(low=-2.0, high=3.0)
+
+    def test_only_uncertain_scores_need_the_llm(self):
+        self.assertEqual([self.classifier.classify(score) for score in (5.0, 3.0, 0.5, -2.0, -6.0)],
+                         ['true', 'true', None, 'false', 'false'])
+
+    def test_resolve_sends_only_uncertain_candidates_to_the_fallback(self):
+        calls = []
+
+        def fallback(indices, stop_after):
+            calls.append((indices, stop_after))
+            return ['true' for _ in indices]
+
+        results = self.classifier.resolve([4.0, 1.0, -5.0, 0.0], fallback)
+
+        self.assertEqual(results, ['true', 'true', 'false', 'true'])
+        self.assertEqual(calls, [([1, 3], None)])
+
+    def test_resolve_skips_the_fallback_once_stop_after_is_met_locally(self):
+        fallback = lambda indices, stop_after: self.fail("LLM should not be called")
+
+        self.assertEqual(self.classifier.resolve([4.0, 3.5, 0.0], fallback, stop_after=2), ['true', 'true', None])
+
+    def test_aresolve_matches_resolve(self):
+        async def fallback(indices, stop_after):
+            return ['false' for _ in indices]
+
+        results = asyncio.run(self.classifier.aresolve([4.0, 1.0], fallback, stop_after=3))
+
+        self.assertEqual(results, ['true', 'false'])
+
+    def test_thresholds_must_leave_an_uncertain_band(self):
+        with self.assertRaises(ValueError):
+            SufficiencyClassifier(low=2.0, high=1.0)
+
+    def test_save_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'nested', 'sufficiency.json')
+            SufficiencyClassifier(-1.0, None, 'cross-encoder/x', {'coverage': 0.5}).save(path)
+
+            loaded = SufficiencyClassifier.load(path)
+
+        self.assertEqual((loaded.low, loaded.high, loaded.model_name, loaded.stats), (-1.0, None, 'cross-encoder/x', {'coverage': 0.5}))
+
+class TestCalibrate(unittest.TestCase):
+
+    def test_fits_thresholds_around_the_mixed_band(self):
+        scores = [-8, -7, -6, -5, -4, -3, 0, 0.5, 1, 1.5, 4, 5, 6, 7, 8, 9]
+        labels = [False] * 6 + [True, False, True, False] + [True] * 6
+
+        classifier = calibrate(scores, labels, target_precision=0.95, min_support=3)
+
+        self.assertEqual((classifier.low, classifier.high), (-3.0, 4.0))
+        self.assertEqual(classifier.stats['coverage'], 12 / 16)
+        self.assertEqual(classifier.stats['accuracy_when_decided'], 1.0)
+
+    def test_side_without_enough_support_stays_with_the_llm(self):
+        classifier = calibrate([1, 2, 3, 4], [False, True, False, True], target_precision=0.9, min_support=2)
+
+        self.assertEqual((classifier.low, classifier.high), (None, None))
+        self.assertEqual(classifier.stats['coverage'], 0.0)
+
+    def test_read_examples_accepts_jsonl_and_csv(self):
+        with tempfile.TemporaryDirectory() as directory:
+            jsonl = os.path.join(directory, 'examples.jsonl')
+            with open(jsonl, 'w') as file:
+                file.write(json.dumps({'question': 'q', 'passage': 'p', 'label': True}) + "\n")
+            csv_path = os.path.join(directory, 'examples.csv')
+            with open(csv_path, 'w') as file:
+                file.write("question,passage,label\nq,p,false\n")
+
+            self.assertEqual(read_examples(jsonl), [('q', 'p', True)])
+            self.assertEqual(read_examples(csv_path), [('q', 'p', False)])
+
+if __name__ == '__main__':
+    unittest.main()
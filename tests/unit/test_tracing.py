@@ -0,0 +1,87 @@
+import json
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from src.tracing import MetricsRegistry, Span, trace, span, record_usage, propagate, save_trace, current_span
+
+class TestSpans(unittest.TestCase):
+
+    def test_stages_nest_under_the_request_trace_with_counts_and_tokens(self):
+        with trace('process_text') as request_trace:
+            with span('retrieval') as retrieval:
+                with span('rerank', candidates=20):
+                    pass
+                retrieval.set(relevant=2)
+            with span('generation'):
+                record_usage(SimpleNamespace(usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30)))
+
+        result = request_trace.to_dict()
+        self.assertEqual([child['name'] for child in result['children']], ['retrieval', 'generation'])
+        self.assertEqual(result['children'][0]['children'][0]['attributes'], {'candidates': 20})
+        self.assertEqual(result['children'][0]['attributes'], {'relevant': 2})
+        self.assertEqual((result['prompt_tokens'], result['completion_tokens']), (120, 30))
+        self.assertGreaterEqual(result['duration_ms'], result['children'][0]['duration_ms'])
+        self.assertIsNone(current_span())
+        json.dumps(result)
+
+    def test_spans_in_worker_threads_join_the_callers_trace(self):
+        def evaluate(tokens):
+            with span('evaluation'):
+                record_usage(SimpleNamespace(usage=SimpleNamespace(prompt_tokens=tokens, completion_tokens=1)))
+
+        with ThreadPoolExecutor(max_workers=3) as executor, trace('request') as request_trace:
+            run = propagate(evaluate)
+            list(executor.map(run, [10, 20, 30]))
+
+        self.assertEqual(len(request_trace.children), 3)
+        self.assertEqual(request_trace.total_tokens(), (60, 3))
+
+    def test_failed_stage_is_marked_and_usage_outside_spans_is_ignored(self):
+        record_usage(SimpleNamespace(usage=SimpleNamespace(prompt_tokens=5, completion_tokens=5)))
+
+        with trace('request') as request_trace:
+            with self.assertRaises(ValueError):
+                with span('vector_search'):
+                    raise ValueError("index missing")
+
+        self.assertEqual(request_trace.to_dict()['children'][0]['error'], 'ValueError')
+
+    def test_save_trace_writes_json_only_with_a_directory(self):
+        with trace('request') as request_trace:
+            pass
+        with tempfile.TemporaryDirectory() as directory:
+            save_trace(request_trace, directory)
+            with open(os.path.join(directory, f"{request_trace.trace_id}.json")) as file:
+                self.assertEqual(json.load(file)['name'], 'request')
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def finished(self, name, duration, **attributes):
+        stage = Span(name, attributes)
+        stage.duration = duration
+        return stage
+
+    def test_render_exposes_histograms_and_counters(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.observe(self.finished('rerank', 0.05, candidates=20))
+        registry.observe(self.finished('rerank', 0.5, candidates=10))
+        evaluation = self.finished('evaluation', 2.0, mode='llm')
+        evaluation.add_usage(SimpleNamespace(prompt_tokens=300, completion_tokens=1))
+        evaluation.error = 'Timeout'
+        registry.observe(evaluation)
+
+        lines = registry.render().splitlines()
+
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="rerank",le="0.1"} 1', lines)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="rerank",le="1.0"} 2', lines)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="evaluation",le="+Inf"} 1', lines)
+        self.assertIn('rag_stage_duration_seconds_count{stage="rerank"} 2', lines)
+        self.assertIn('rag_stage_items_total{stage="rerank",field="candidates"} 30', lines)
+        self.assertIn('rag_stage_tokens_total{stage="evaluation",kind="prompt"} 300', lines)
+        self.assertIn('rag_stage_errors_total{stage="evaluation"} 1', lines)
+        self.assertFalse(any('field="mode"' in line for line in lines))
+
+if __name__ == '__main__':
+    unittest.main()
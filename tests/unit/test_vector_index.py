@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.database import Database
+from src.embedding_store import EmbeddingStore
+from src.hybrid import where_filter
+from src.vector_index import LocalVectorIndex
+
+class FakeEmbeddings:
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+class TestLocalVectorIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, 'index')
+        rng = np.random.default_rng(0)
+        self.matrix = rng.normal(size=(600, 16)).astype(np.float32)
+        self.texts = [f"passage {i}" for i in range(len(self.matrix))]
+        self.embeddings = FakeEmbeddings(dict(zip(self.texts, self.matrix.tolist())))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def exact_neighbours(self, query, k):
+        unit = self.matrix / np.linalg.norm(self.matrix, axis=1, keepdims=True)
+        return list(np.argsort(-(unit @ (query / np.linalg.norm(query))))[:k])
+
+    def test_exact_search_returns_nearest_documents(self):
+        index = LocalVectorIndex(self.directory, self.embeddings)
+        index.add_texts(self.texts, [{'chunk': i} for i in range(len(self.texts))])
+
+        results = index.similarity_search("passage 42", k=3)
+
+        self.assertEqual(results[0].page_content, "passage 42")
+        self.assertEqual(results[0].metadata, {'chunk': 42})
+        self.assertEqual([doc.metadata['chunk'] for doc in results], self.exact_neighbours(self.matrix[42], 3))
+
+    def test_hnsw_search_recalls_exact_neighbours(self):
+        index = LocalVectorIndex(self.directory, self.embeddings, exact_threshold=100, m=8, ef_construction=64, ef_search=64)
+        index.add_texts(self.texts)
+
+        rng = np.random.default_rng(1)
+        recall = []
+        for query in rng.normal(size=(20, 16)):
+            expected = set(self.exact_neighbours(query, 10))
+            found = {self.texts.index(doc.page_content) for doc in index.similarity_search_by_vector(query, k=10)}
+            recall.append(len(expected & found) / 10)
+        self.assertGreaterEqual(np.mean(recall), 0.9)
+
+    def test_saved_index_loads_lazily_with_same_results(self):
+        for threshold in (20000, 100):
+            directory = os.path.join(self.tmp.name, str(threshold))
+            index = LocalVectorIndex.from_texts(self.texts, self.embeddings, directory=directory, exact_threshold=threshold)
+            expected = [doc.page_content for doc in index.similarity_search("passage 7", k=5)]
+
+            reopened = LocalVectorIndex(directory, self.embeddings, exact_threshold=threshold)
+            self.assertFalse(reopened._loaded)
+            self.assertEqual([doc.page_content for doc in reopened.similarity_search("passage 7", k=5)], expected)
+            self.assertIsInstance(reopened._vectors, np.memmap)
+
+    def test_add_to_reopened_index_extends_it(self):
+        LocalVectorIndex.from_texts(self.texts[:300], self.embeddings, directory=self.directory, exact_threshold=100)
+
+        index = LocalVectorIndex(self.directory, self.embeddings, exact_threshold=100)
+        index.add_texts(self.texts[300:])
+        index.save()
+
+        reopened = LocalVectorIndex(self.directory, self.embeddings, exact_threshold=100)
+        self.assertEqual(len(reopened), 600)
+        self.assertEqual(reopened.similarity_search("passage 450", k=1)[0].page_content, "passage 450")
+
+    def test_where_filter_restricts_the_search_to_matching_metadata(self):
+        index = LocalVectorIndex(self.directory, self.embeddings, exact_threshold=100, m=8)
+        index.add_texts(self.texts[:300], [{'page': i // 10, 'section': str(i % 3)} for i in range(300)])
+
+        hits = index.similarity_search("passage 45", k=5, where_filter=where_filter({'page': 4, 'section': '0'}))
+
+        self.assertEqual([hit.page_content for hit in hits][:1], ["passage 45"])
+        self.assertEqual({(hit.metadata['page'], hit.metadata['section']) for hit in hits}, {(4, '0')})
+        self.assertEqual(len(hits), 3)
+        self.assertEqual(index.similarity_search("passage 45", k=5, where_filter=where_filter({'page': 99})), [])
+
+    def test_empty_index_returns_nothing(self):
+        index = LocalVectorIndex(self.directory, self.embeddings)
+        self.assertEqual(index.similarity_search("passage 1"), [])
+
+    def test_reupload_removes_missing_chunks_and_stores_document_positions(self):
+        database = Database(None, self.embeddings, 'contract.pdf', backend='local', index_dir=self.directory)
+        store = EmbeddingStore("fake-model", os.path.join(self.tmp.name, 'embeddings'))
+        database.upload_to_local_index(self.texts[:5], store)
+
+        revised = [self.texts[0], self.texts[2], self.texts[3], self.texts[5]]
+        stats = database.upload_to_local_index(revised, store)
+
+        reopened = LocalVectorIndex(os.path.join(self.directory, 'contract'), self.embeddings)
+        self.assertEqual(stats, {'chunks': 1, 'embedded': 1, 'unchanged': 3, 'deleted': 2})
+        self.assertEqual(reopened.texts, revised)
+        self.assertEqual([metadata['chunk'] for metadata in reopened.metadatas], [0, 1, 2, 3])
+        self.assertEqual(database.upload_to_local_index(revised, store)['chunks'], 0)
+        self.assertEqual(self.embeddings.calls, 2)
+
+if __name__ == '__main__':
+    unittest.main()
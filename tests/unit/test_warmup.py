@@ -0,0 +1,38 @@
+import threading
+import unittest
+from src.warmup import Warmup
+
+class TestWarmup(unittest.TestCase):
+
+    def test_ready_once_every_step_succeeded(self):
+        release = threading.Event()
+        calls = []
+        warmup = Warmup({'model': lambda: calls.append('model'), 'pipeline': release.wait})
+
+        self.assertEqual(warmup.status()['steps']['model']['status'], 'pending')
+        threads = warmup.start()
+        self.assertIs(warmup.start(), threads)
+        self.assertFalse(warmup.join(timeout=0.05))
+        self.assertFalse(warmup.ready)
+
+        release.set()
+        self.assertTrue(warmup.join(timeout=5))
+        self.assertTrue(warmup.ready)
+        self.assertEqual(calls, ['model'])
+        self.assertEqual(warmup.status()['steps']['pipeline']['status'], 'ready')
+
+    def test_a_failed_step_is_reported_and_keeps_it_unready(self):
+        def connect():
+            raise ConnectionError("weaviate unreachable")
+
+        warmup = Warmup({'vector_store': connect, 'model': lambda: None})
+        warmup.start()
+        warmup.join(timeout=5)
+
+        status = warmup.status()
+        self.assertFalse(status['ready'])
+        self.assertEqual(status['steps']['vector_store']['error'], "ConnectionError: weaviate unreachable")
+        self.assertEqual(status['steps']['model']['status'], 'ready')
+
+if __name__ == '__main__':
+    unittest.main()